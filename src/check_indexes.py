@@ -0,0 +1,32 @@
+import os
+import sys
+import dotenv
+from common.utils import configure_database
+from common import logging_config, config_reader
+from models import index_checker
+
+
+def main():
+    dir_of_src = os.path.abspath(os.path.dirname(__file__))
+    app_base_dir = os.path.dirname(dir_of_src)
+
+    logger = logging_config.configure_logging(f"{app_base_dir}/logs/citadel-idp-check-indexes.log")
+    app_env = os.environ.get("APP_ENV", "local")
+    logger.info("Checking planned mongodb indexes for env '%s'", app_env)
+
+    dotenv.load_dotenv(app_base_dir + "/config-files/" + app_env + "/.env")
+    config_reader.read_config(app_env, app_base_dir)
+    configure_database()
+
+    findings = index_checker.check_planned_indexes()
+    for finding in findings:
+        logger.error(finding)
+
+    if findings:
+        sys.exit(1)
+
+    logger.info("All planned queries are served by their indexes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Rate limiting of the form recognizer analyses, per endpoint and model.
+
+Every analysis takes a token from a token bucket refilled at the configured transactions per second, so bursts of
+claimed input blobs are spread over the quota instead of being answered with 429. The analyses in flight are
+capped by an AIMD limit: every completed analysis raises the limit by 1/limit, up to max_concurrency, and every
+429 halves it and pauses new analyses for the Retry-After of the response. Throttled analyses are retried instead
+of failing the input blob.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from azure.core.exceptions import HttpResponseError
+
+from common import constants
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+# (endpoint, model id) -> rate limiter of the model on the endpoint.
+_rate_limiters: dict[tuple[str, str], "AnalysisRateLimiter"] = {}
+
+
+class AnalysisRateLimiter(object):
+    """
+    AnalysisRateLimiter paces the analyses of one model on one form recognizer endpoint. Safe to share between
+    threads, and between coroutines of one event loop with run_async.
+    """
+
+    def __init__(
+        self,
+        transactions_per_second: float,
+        max_concurrency: int,
+        max_throttled_retries: int = constants.FORM_RECOGNIZER_MAX_THROTTLED_RETRIES,
+    ):
+        self.transactions_per_second = transactions_per_second
+        self.max_concurrency = max_concurrency
+        self.max_throttled_retries = max_throttled_retries
+
+        self._condition = threading.Condition()
+        self._tokens = float(transactions_per_second)
+        self._tokens_refilled_at = time.monotonic()
+        self._concurrency_limit = float(max_concurrency)
+        self._in_flight_count = 0
+        # monotonic time before which no analysis starts, set by Retry-After.
+        self._paused_until = 0.0
+
+    @property
+    def concurrency_limit(self) -> int:
+        with self._condition:
+            return int(self._concurrency_limit)
+
+    def run(self, analysis: Callable[[], T]) -> T:
+        """
+        run calls analysis once a token and a concurrency slot are free, and retries it while it is throttled.
+
+        Args:
+            analysis (Callable[[], T]): starts the analysis and waits for its result.
+
+        Raises:
+            Exception: Raised if the analysis fails, HttpResponseError if it is still throttled after
+                max_throttled_retries.
+
+        Returns:
+            T: the result of the analysis.
+        """
+        for attempt in range(self.max_throttled_retries + 1):
+            self.acquire()
+            try:
+                result = analysis()
+            except Exception as error:
+                if not self.release_failed(error, attempt):
+                    raise
+                continue
+
+            self.release()
+            return result
+
+    async def run_async(self, analysis: Callable[[], Awaitable[T]]) -> T:
+        """
+        run_async is the asyncio flavour of run, waiting for a token or a slot never blocks the event loop.
+        """
+        for attempt in range(self.max_throttled_retries + 1):
+            wait_seconds = self.try_acquire()
+            while wait_seconds:
+                await asyncio.sleep(wait_seconds)
+                wait_seconds = self.try_acquire()
+
+            try:
+                result = await analysis()
+            except Exception as error:
+                if not self.release_failed(error, attempt):
+                    raise
+                continue
+
+            self.release()
+            return result
+
+    def acquire(self):
+        """
+        acquire waits until a token and a concurrency slot are free, and takes them.
+        """
+        with self._condition:
+            wait_seconds = self._try_acquire()
+            while wait_seconds:
+                self._condition.wait(wait_seconds)
+                wait_seconds = self._try_acquire()
+
+    def try_acquire(self) -> float:
+        """
+        try_acquire takes a token and a concurrency slot if both are free.
+
+        Returns:
+            float: 0 if they were taken, otherwise the seconds to wait before trying again.
+        """
+        with self._condition:
+            return self._try_acquire()
+
+    def release(self):
+        """
+        release frees the slot of a completed analysis and raises the concurrency limit additively.
+        """
+        with self._condition:
+            self._in_flight_count -= 1
+            self._concurrency_limit = min(
+                self._concurrency_limit + 1 / self._concurrency_limit, float(self.max_concurrency)
+            )
+            self._condition.notify_all()
+
+    def release_failed(self, error: Exception, attempt: int) -> bool:
+        """
+        release_failed frees the slot of a failed analysis. A 429 halves the concurrency limit and pauses the
+        analyses for its Retry-After, or the time to refill one token if it has none.
+
+        Returns:
+            bool: True if the analysis was throttled and may be retried.
+        """
+        with self._condition:
+            self._in_flight_count -= 1
+            self._condition.notify_all()
+
+            if not isinstance(error, HttpResponseError) or error.status_code != 429:
+                return False
+
+            retry_after_seconds = get_retry_after_seconds(error, 1 / self.transactions_per_second)
+            self._concurrency_limit = max(self._concurrency_limit / 2, 1.0)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after_seconds)
+            concurrency_limit = int(self._concurrency_limit)
+
+        logging.warning(
+            "Form recognizer throttled the analysis (attempt %s), retrying after %.2f seconds with concurrency %s.",
+            attempt + 1,
+            retry_after_seconds,
+            concurrency_limit,
+        )
+        return attempt < self.max_throttled_retries
+
+    def _try_acquire(self) -> float:
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+
+        self._tokens = min(
+            self._tokens + (now - self._tokens_refilled_at) * self.transactions_per_second,
+            float(self.transactions_per_second),
+        )
+        self._tokens_refilled_at = now
+
+        if self._in_flight_count >= int(self._concurrency_limit):
+            # woken up by release, the timeout only bounds the wait of run_async.
+            return constants.FORM_RECOGNIZER_SLOT_POLL_INTERVAL_IN_SECONDS
+
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.transactions_per_second
+
+        self._tokens -= 1
+        self._in_flight_count += 1
+        return 0
+
+
+def get_retry_after_seconds(error: HttpResponseError, default: float) -> float:
+    """
+    get_retry_after_seconds reads the Retry-After (seconds) or retry-after-ms header of a throttled response.
+    """
+    headers = error.response.headers if error.response is not None else {}
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("Retry-After"):
+            return float(headers["Retry-After"])
+    except ValueError:
+        logging.debug("Ignoring Retry-After that is not a number of seconds.")
+
+    return default
+
+
+def get_rate_limiter(
+    endpoint: str, model_id: str, transactions_per_second: float, max_concurrency: int
+) -> AnalysisRateLimiter:
+    """
+    get_rate_limiter returns the shared rate limiter of the model on the endpoint. The limiter is rebuilt when its
+    transactions per second or max concurrency change.
+    """
+    with _lock:
+        rate_limiter = _rate_limiters.get((endpoint, model_id))
+        if (
+            rate_limiter is None
+            or rate_limiter.transactions_per_second != transactions_per_second
+            or rate_limiter.max_concurrency != max_concurrency
+        ):
+            logging.info(
+                "Limiting form recognizer model '%s' on '%s' to %s transactions per second and %s concurrent analyses.",
+                model_id,
+                endpoint,
+                transactions_per_second,
+                max_concurrency,
+            )
+            rate_limiter = AnalysisRateLimiter(transactions_per_second, max_concurrency)
+            _rate_limiters[(endpoint, model_id)] = rate_limiter
+
+        return rate_limiter
@@ -0,0 +1,182 @@
+"""
+Process wide registry of the azure sdk clients.
+
+Clients are built once and shared by every job and worker thread, so their http transport and connection pool
+are reused instead of paying a new session and TLS handshake per call. Container existence checks are cached
+for constants.CONTAINER_EXISTS_CACHE_TTL_IN_SECONDS. Form recognizer clients are cached per endpoint and key, and
+retry with AnalysisRetryPolicy.
+
+A client that is rebuilt or dropped is not closed right away, calls still running on it finish first. The session
+of its transport is closed once nothing uses the transport anymore.
+"""
+import logging
+import threading
+import time
+import weakref
+
+import requests
+from azure.ai.formrecognizer import DocumentAnalysisClient
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.policies import AsyncRetryPolicy, RetryPolicy
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient, ContainerClient
+
+from common import constants
+from common.custom_exceptions import ContainerMissingException
+
+_lock = threading.Lock()
+_blob_service_client: BlobServiceClient = None
+_blob_service_client_connection_string: str = None
+
+# container name -> monotonic time until which the container is known to exist.
+_existing_containers: dict[str, float] = {}
+
+# (endpoint, key) -> form recognizer client
+_document_analysis_clients: dict[tuple[str, str], DocumentAnalysisClient] = {}
+
+
+class _AnalysisRetryMixin(object):
+    def is_retry(self, settings, response) -> bool:
+        # a throttled analyze request is retried by the analysis rate limiter, which paces the analyses of the model.
+        if response.http_request.method.upper() == "POST" and response.http_response.status_code == 429:
+            return False
+
+        return super().is_retry(settings, response)
+
+
+class AnalysisRetryPolicy(_AnalysisRetryMixin, RetryPolicy):
+    """
+    AnalysisRetryPolicy is the sdk retry policy of the form recognizer clients. It keeps the retries of 408 and
+    5xx, but leaves a 429 of the analyze request to AnalysisRateLimiter.
+    """
+
+
+class AsyncAnalysisRetryPolicy(_AnalysisRetryMixin, AsyncRetryPolicy):
+    """
+    AsyncAnalysisRetryPolicy is the AnalysisRetryPolicy of the aio form recognizer clients.
+    """
+
+
+def _build_transport() -> RequestsTransport:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=constants.AZURE_HTTP_CONNECTION_POOL_SIZE,
+        pool_maxsize=constants.AZURE_HTTP_CONNECTION_POOL_SIZE,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    transport = RequestsTransport(session=session, session_owner=False)
+    # the clients sharing the transport, e.g. container clients, keep it alive until their last call finished.
+    weakref.finalize(transport, session.close)
+    return transport
+
+
+def get_blob_service_client(connection_string: str) -> BlobServiceClient:
+    """
+    get_blob_service_client returns the shared BlobServiceClient for the connection string.
+
+    The client is rebuilt, and the container existence cache dropped, when the connection string changes.
+    Calls already running on the previous client are left to finish on it, its session is closed after them.
+
+    Args:
+        connection_string (str): normalized azure storage connection string.
+
+    Returns:
+        BlobServiceClient: the shared blob service client.
+    """
+    global _blob_service_client, _blob_service_client_connection_string
+
+    with _lock:
+        if _blob_service_client is None or _blob_service_client_connection_string != connection_string:
+            if _blob_service_client is not None:
+                logging.info("Azure storage connection string changed, rebuilding the blob service client.")
+
+            _blob_service_client = BlobServiceClient.from_connection_string(
+                connection_string, transport=_build_transport()
+            )
+            _blob_service_client_connection_string = connection_string
+            _existing_containers.clear()
+
+        return _blob_service_client
+
+
+def get_container_client(container_name: str, connection_string: str) -> ContainerClient:
+    """
+    get_container_client returns a container client on the shared BlobServiceClient.
+
+    Args:
+        container_name (str): name of container for which you need container client.
+        connection_string (str): normalized azure storage connection string.
+
+    Raises:
+        ContainerMissingException: raised when container dosen't exists
+
+    Returns:
+        ContainerClient: container client
+    """
+    container_client = get_blob_service_client(connection_string).get_container_client(container_name)
+
+    if not container_exists(container_client):
+        raise ContainerMissingException(f"Container '{container_name}' does not exist.")
+
+    return container_client
+
+
+def container_exists(container_client: ContainerClient) -> bool:
+    """
+    container_exists checks if the container exists, positive answers are cached for a while.
+
+    Args:
+        container_client (ContainerClient): client of the container to check.
+
+    Returns:
+        bool: True if the container exists.
+    """
+    now = time.monotonic()
+    if _existing_containers.get(container_client.container_name, 0) > now:
+        return True
+
+    if not container_client.exists():
+        _existing_containers.pop(container_client.container_name, None)
+        return False
+
+    _existing_containers[container_client.container_name] = now + constants.CONTAINER_EXISTS_CACHE_TTL_IN_SECONDS
+    return True
+
+
+def get_document_analysis_client(endpoint: str, key: str) -> DocumentAnalysisClient:
+    """
+    get_document_analysis_client returns the shared form recognizer client for the endpoint and key.
+
+    Args:
+        endpoint (str): form recognizer endpoint.
+        key (str): form recognizer key.
+
+    Returns:
+        DocumentAnalysisClient: the shared document analysis client.
+    """
+    document_analysis_client = _document_analysis_clients.get((endpoint, key))
+    if document_analysis_client is not None:
+        return document_analysis_client
+
+    with _lock:
+        if (endpoint, key) not in _document_analysis_clients:
+            logging.info("Creating form recognizer client for endpoint '%s'.", endpoint)
+            _document_analysis_clients[(endpoint, key)] = DocumentAnalysisClient(
+                endpoint,
+                credential=AzureKeyCredential(key),
+                transport=_build_transport(),
+                retry_policy=AnalysisRetryPolicy(),
+            )
+
+        return _document_analysis_clients[(endpoint, key)]
+
+
+def drop_document_analysis_client(endpoint: str, key: str):
+    """
+    drop_document_analysis_client forgets the form recognizer client of an endpoint and key that is no longer
+    configured. Analyses already running on it are left to finish, its session is closed after them.
+    """
+    with _lock:
+        if _document_analysis_clients.pop((endpoint, key), None) is not None:
+            logging.info("Dropped form recognizer client for endpoint '%s'.", endpoint)
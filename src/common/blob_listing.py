@@ -0,0 +1,149 @@
+"""
+Prefix scoped, paged blob listings.
+
+Company folders are found with a hierarchical walk_blobs listing, which returns one prefix per folder instead of
+every blob below it. Each company is then listed only below its Validation-Successful folder, page by page, so the
+cost of a listing follows the blobs waiting there and not the history kept in the other folders.
+
+The pages of the companies are interleaved, so one company with a large backlog does not fill a listing on its own.
+"""
+import logging
+import math
+import threading
+from collections import deque
+from typing import Iterator
+
+from azure.storage.blob import BlobPrefix, BlobProperties, ContainerClient
+
+from common import constants
+
+
+class BlobPrefixLister(object):
+    """
+    BlobPrefixLister streams the blobs of the Validation-Successful folder of every company.
+
+    The companies are listed round-robin, one page each in turn, with pages of at most max_blobs divided by the
+    number of companies, and every listing starts with the company after the last one listed before. A listing
+    stops at the first page boundary after max_blobs blobs. The continuation token of every prefix is remembered,
+    so the next listing resumes where the last one stopped, and a prefix listed to its end starts over from its
+    first page. Safe to share between threads.
+
+    A resumed listing does not see new blobs that sort before the continuation token until the prefix is listed to
+    its end. A consumer that moves the listed blobs out of the folder calls forget_continuation_tokens once they
+    are moved, so the next listing starts at the first page, which then holds the blobs still waiting.
+    """
+
+    def __init__(self, page_size: int = constants.DEFAULT_LISTING_PAGE_SIZE):
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        # prefix -> continuation token of the next page.
+        self._continuation_tokens: dict[str, str] = {}
+        self._last_listed_company_prefix: str = None
+
+    def iter_company_prefixes(self, container_client: ContainerClient) -> Iterator[str]:
+        """
+        iter_company_prefixes yields the company folders, e.g. "Company-A/", without listing their blobs.
+        """
+        for item in container_client.walk_blobs(name_starts_with=constants.COMPANY_ROOT_FOLDER_PREFIX, delimiter="/"):
+            if isinstance(item, BlobPrefix):
+                yield item.name
+
+    def iter_validation_successful_blobs(
+        self, container_client: ContainerClient, max_blobs: int = None, company_prefixes: list[str] = None
+    ) -> Iterator[BlobProperties]:
+        """
+        iter_validation_successful_blobs yields the blobs of the Validation-Successful folders, with their metadata.
+
+        Args:
+            container_client (ContainerClient): client of the container.
+            max_blobs (int, optional): stop at the first page boundary after this many blobs.
+            company_prefixes (list[str], optional): the company folders when already listed by the caller.
+
+        Yields:
+            BlobProperties: properties of the blobs waiting for processing.
+        """
+        listed_count = 0
+        if company_prefixes is None:
+            company_prefixes = list(self.iter_company_prefixes(container_client))
+        company_prefixes = self.get_company_prefixes_in_turn(company_prefixes)
+
+        page_size = self.page_size
+        if max_blobs is not None and company_prefixes:
+            page_size = max(min(page_size, math.ceil(max_blobs / len(company_prefixes))), 1)
+
+        company_pages = deque(
+            (
+                company_prefix,
+                self.iter_pages(
+                    container_client,
+                    f"{company_prefix.rstrip('/')}{constants.VALIDATION_SUCCESSFUL_SUBFOLDER}/",
+                    page_size,
+                ),
+            )
+            for company_prefix in company_prefixes
+        )
+
+        while company_pages:
+            company_prefix, pages = company_pages.popleft()
+            page = next(pages, None)
+            if page is None:
+                continue
+
+            with self._lock:
+                self._last_listed_company_prefix = company_prefix
+
+            for blob_properties in page:
+                listed_count += 1
+                yield blob_properties
+
+            company_pages.append((company_prefix, pages))
+
+            if max_blobs is not None and listed_count >= max_blobs:
+                return
+
+    def get_company_prefixes_in_turn(self, company_prefixes: list[str]) -> list[str]:
+        """
+        get_company_prefixes_in_turn returns the company folders, starting after the last company listed.
+        """
+        with self._lock:
+            last_listed_company_prefix = self._last_listed_company_prefix
+
+        if last_listed_company_prefix in company_prefixes:
+            start = company_prefixes.index(last_listed_company_prefix) + 1
+            company_prefixes = company_prefixes[start:] + company_prefixes[:start]
+
+        return company_prefixes
+
+    def forget_continuation_tokens(self):
+        """
+        forget_continuation_tokens makes the next listing of every prefix start at its first page.
+        """
+        with self._lock:
+            self._continuation_tokens.clear()
+
+    def iter_pages(
+        self, container_client: ContainerClient, prefix: str, page_size: int = None
+    ) -> Iterator[list[BlobProperties]]:
+        """
+        iter_pages yields the pages of a prefix, starting at the remembered continuation token.
+        """
+        with self._lock:
+            continuation_token = self._continuation_tokens.get(prefix)
+
+        if continuation_token is not None:
+            logging.debug("Resuming listing of '%s'.", prefix)
+
+        pages = container_client.list_blobs(
+            name_starts_with=prefix, include=["metadata"], results_per_page=page_size or self.page_size
+        ).by_page(continuation_token=continuation_token)
+
+        for page in pages:
+            page_blobs = list(page)
+
+            with self._lock:
+                if pages.continuation_token:
+                    self._continuation_tokens[prefix] = pages.continuation_token
+                else:
+                    self._continuation_tokens.pop(prefix, None)
+
+            yield page_blobs
@@ -0,0 +1,266 @@
+"""
+Blob move subsystem, a move is a server side copy followed by the delete of the source blob.
+
+Small blobs of known size are copied with a synchronous copy, every other copy is started asynchronously
+and its status is polled with exponential backoff. The source blob is only deleted once the copy is
+confirmed, deletes of a batch of moves are sent through the blob batch api. Copies that do not complete in time
+are aborted.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from azure.core.exceptions import HttpResponseError
+from azure.storage.blob import BlobClient, BlobServiceClient, BlobSasPermissions, generate_blob_sas
+from azure.storage.blob.aio import BlobClient as AsyncBlobClient, BlobServiceClient as AsyncBlobServiceClient
+
+from common import constants
+from common.custom_exceptions import BlobMoveException
+
+# the blob batch api accepts at most 256 sub requests per batch.
+MAX_BATCH_DELETE_SIZE = 256
+
+
+def move_blob(
+    blob_service_client: BlobServiceClient,
+    source_blob_path: str,
+    destination_blob_path: str,
+    content_length: int = None,
+    container_name: str = constants.DEFAULT_BLOB_CONTAINER,
+) -> float:
+    """
+    move_blob copies the source blob to the destination path and deletes the source once the copy completed.
+
+    Args:
+        blob_service_client (BlobServiceClient): client of the storage account.
+        source_blob_path (str): path of the blob to move.
+        destination_blob_path (str): path the blob is moved to.
+        content_length (int, optional): size of the blob in bytes, enables the synchronous copy of small blobs.
+        container_name (str, optional): container of the blob.
+
+    Raises:
+        BlobMoveException: Raised if the copy failed or did not complete in time, the source is kept.
+
+    Returns:
+        float: the move latency in seconds.
+    """
+    start_time = time.monotonic()
+
+    source_blob_client = blob_service_client.get_blob_client(container=container_name, blob=source_blob_path)
+    copy_blob(blob_service_client, source_blob_client, destination_blob_path, content_length, container_name)
+    source_blob_client.delete_blob()
+
+    move_latency = time.monotonic() - start_time
+    logging.info("Moved blob '%s' to '%s' in %.3f seconds.", source_blob_path, destination_blob_path, move_latency)
+
+    return move_latency
+
+
+def move_blobs(
+    blob_service_client: BlobServiceClient,
+    moves: list[tuple[str, str, int]],
+    container_name: str = constants.DEFAULT_BLOB_CONTAINER,
+) -> dict[str, float]:
+    """
+    move_blobs moves a batch of blobs, the sources of the completed copies are deleted with batch deletes.
+
+    Args:
+        blob_service_client (BlobServiceClient): client of the storage account.
+        moves (list[tuple[str, str, int]]): (source path, destination path, content length or None) per blob.
+        container_name (str, optional): container of the blobs.
+
+    Returns:
+        dict[str, float]: move latency in seconds for every source path that was moved, failed moves are left out.
+    """
+    copied_blobs: dict[str, float] = {}
+
+    for source_blob_path, destination_blob_path, content_length in moves:
+        start_time = time.monotonic()
+        source_blob_client = blob_service_client.get_blob_client(container=container_name, blob=source_blob_path)
+        try:
+            copy_blob(blob_service_client, source_blob_client, destination_blob_path, content_length, container_name)
+            copied_blobs[source_blob_path] = start_time
+        except Exception:
+            logging.exception("Could not move blob '%s' to '%s'.", source_blob_path, destination_blob_path)
+
+    deleted_blobs = delete_blobs(blob_service_client, list(copied_blobs), container_name)
+
+    move_latencies = {}
+    for source_blob_path in deleted_blobs:
+        move_latencies[source_blob_path] = time.monotonic() - copied_blobs[source_blob_path]
+        logging.info("Moved blob '%s' in %.3f seconds.", source_blob_path, move_latencies[source_blob_path])
+
+    return move_latencies
+
+
+def copy_blob(
+    blob_service_client: BlobServiceClient,
+    source_blob_client: BlobClient,
+    destination_blob_path: str,
+    content_length: int = None,
+    container_name: str = constants.DEFAULT_BLOB_CONTAINER,
+):
+    """
+    copy_blob copies the source blob to the destination path and returns once the copy completed.
+
+    Raises:
+        BlobMoveException: Raised if the copy failed or did not complete in time.
+    """
+    destination_blob_client = blob_service_client.get_blob_client(container=container_name, blob=destination_blob_path)
+    account_key = getattr(blob_service_client.credential, "account_key", None)
+
+    if (
+        content_length is not None
+        and content_length <= constants.SYNC_COPY_MAX_BLOB_SIZE_IN_BYTES
+        and account_key is not None
+    ):
+        # a synchronous copy reads the source itself, it needs a sas even inside the same account.
+        sas_token = generate_blob_sas(
+            source_blob_client.account_name,
+            container_name,
+            source_blob_client.blob_name,
+            account_key=account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.utcnow() + timedelta(minutes=5),
+        )
+        copy_properties = destination_blob_client.start_copy_from_url(
+            f"{source_blob_client.url}?{sas_token}", requires_sync=True
+        )
+    else:
+        copy_properties = destination_blob_client.start_copy_from_url(source_blob_client.url)
+
+    wait_for_copy(destination_blob_client, copy_properties.get("copy_status"))
+
+
+def wait_for_copy(destination_blob_client: BlobClient, copy_status: str):
+    """
+    wait_for_copy polls the copy status of the destination blob with exponential backoff, the copy is aborted if
+    it does not complete within constants.BLOB_COPY_TIMEOUT_IN_SECONDS.
+
+    Raises:
+        BlobMoveException: Raised if the copy failed, was aborted or did not complete in time.
+    """
+    for poll_delay in get_copy_poll_delays():
+        if copy_status != "pending":
+            break
+
+        time.sleep(poll_delay)
+        copy_status = destination_blob_client.get_blob_properties().copy.status
+
+    if copy_status == "pending":
+        try:
+            destination_blob_client.abort_copy(destination_blob_client.get_blob_properties().copy.id)
+        except HttpResponseError as hre:
+            # the copy completed or failed while it was aborted.
+            raise BlobMoveException(f"Could not abort the copy to '{destination_blob_client.blob_name}'.") from hre
+
+    raise_for_copy_status(destination_blob_client.blob_name, copy_status)
+
+
+async def move_blob_async(
+    blob_service_client: AsyncBlobServiceClient,
+    source_blob_path: str,
+    destination_blob_path: str,
+    container_name: str = constants.DEFAULT_BLOB_CONTAINER,
+):
+    """
+    move_blob_async is move_blob for the aio BlobServiceClient, the copy is always started asynchronously.
+
+    Raises:
+        BlobMoveException: Raised if the copy failed or did not complete in time, the source is kept.
+    """
+    source_blob_client = blob_service_client.get_blob_client(container=container_name, blob=source_blob_path)
+    destination_blob_client = blob_service_client.get_blob_client(container=container_name, blob=destination_blob_path)
+
+    copy_properties = await destination_blob_client.start_copy_from_url(source_blob_client.url)
+    await wait_for_copy_async(destination_blob_client, copy_properties.get("copy_status"))
+
+    await source_blob_client.delete_blob()
+
+
+async def wait_for_copy_async(destination_blob_client: AsyncBlobClient, copy_status: str):
+    """
+    wait_for_copy_async is wait_for_copy for the aio BlobClient.
+
+    Raises:
+        BlobMoveException: Raised if the copy failed, was aborted or did not complete in time.
+    """
+    for poll_delay in get_copy_poll_delays():
+        if copy_status != "pending":
+            break
+
+        await asyncio.sleep(poll_delay)
+        copy_status = (await destination_blob_client.get_blob_properties()).copy.status
+
+    if copy_status == "pending":
+        try:
+            await destination_blob_client.abort_copy((await destination_blob_client.get_blob_properties()).copy.id)
+        except HttpResponseError as hre:
+            # the copy completed or failed while it was aborted.
+            raise BlobMoveException(f"Could not abort the copy to '{destination_blob_client.blob_name}'.") from hre
+
+    raise_for_copy_status(destination_blob_client.blob_name, copy_status)
+
+
+def get_copy_poll_delays():
+    """
+    get_copy_poll_delays yields the delays between the polls of a copy status, doubling up to
+    constants.BLOB_COPY_POLL_MAX_DELAY_IN_SECONDS, until constants.BLOB_COPY_TIMEOUT_IN_SECONDS is over.
+    """
+    poll_delay = constants.BLOB_COPY_POLL_INITIAL_DELAY_IN_SECONDS
+    deadline = time.monotonic() + constants.BLOB_COPY_TIMEOUT_IN_SECONDS
+
+    while time.monotonic() <= deadline:
+        yield poll_delay
+        poll_delay = min(poll_delay * 2, constants.BLOB_COPY_POLL_MAX_DELAY_IN_SECONDS)
+
+
+def raise_for_copy_status(destination_blob_path: str, copy_status: str):
+    """
+    raise_for_copy_status raises unless the copy to the destination blob completed.
+
+    Raises:
+        BlobMoveException: Raised if the copy is still pending or ended with another status than success.
+    """
+    if copy_status == "pending":
+        raise BlobMoveException(f"Copy to '{destination_blob_path}' did not complete in time.")
+
+    if copy_status != "success":
+        raise BlobMoveException(f"Copy to '{destination_blob_path}' ended with status '{copy_status}'.")
+
+
+def delete_blobs(
+    blob_service_client: BlobServiceClient,
+    blob_paths: list[str],
+    container_name: str = constants.DEFAULT_BLOB_CONTAINER,
+) -> list[str]:
+    """
+    delete_blobs deletes the blobs through the blob batch api, falling back to one delete per blob if the
+    batch is rejected.
+
+    Returns:
+        list[str]: paths of the blobs that were deleted.
+    """
+    container_client = blob_service_client.get_container_client(container_name)
+    deleted_blobs = []
+
+    for batch_start in range(0, len(blob_paths), MAX_BATCH_DELETE_SIZE):
+        batch = blob_paths[batch_start : batch_start + MAX_BATCH_DELETE_SIZE]
+        try:
+            responses = container_client.delete_blobs(*batch, raise_on_any_failure=False)
+            for blob_path, response in zip(batch, responses):
+                if 200 <= response.status_code < 300:
+                    deleted_blobs.append(blob_path)
+                else:
+                    logging.error("Could not delete blob '%s', status %s.", blob_path, response.status_code)
+        except Exception:
+            logging.warning("Batch delete rejected, deleting %s blobs one by one.", len(batch), exc_info=True)
+            for blob_path in batch:
+                try:
+                    container_client.delete_blob(blob_path)
+                    deleted_blobs.append(blob_path)
+                except Exception:
+                    logging.exception("Could not delete blob '%s'.", blob_path)
+
+    return deleted_blobs
@@ -1,11 +1,20 @@
 import configparser
 import os
-import pathlib
 import logging
 
-from common import utils, constants, custom_exceptions
+import dotenv
+
+from common import custom_exceptions
+from common.settings import Settings
 
 config_data = None
+# snapshot of config_data, replaced as a whole when a config is read.
+settings: Settings = None
+# env and app_base_dir of the config read last, for the hot reload.
+config_env: str = None
+config_app_base_dir: str = None
+# config file path -> (mtime in ns, size) when it was read last, None if the file did not exist.
+_config_file_stamps: dict[str, tuple[int, int]] = {}
 
 
 class ExtendedEnvInterpolation(configparser.ExtendedInterpolation):
@@ -18,13 +27,21 @@ class ExtendedEnvInterpolation(configparser.ExtendedInterpolation):
 
 
 def read_config(env, app_base_dir):
-    global config_data
+    """
+    read_config reads the config of env and swaps in its validated settings. config_data and settings are only
+    replaced once the new config is valid.
+
+    Raises:
+        MissingConfigException: Raised if there is no config file for env or the config is invalid.
+    """
+    global config_data, settings, config_env, config_app_base_dir, _config_file_stamps
     config = configparser.ConfigParser(interpolation=ExtendedEnvInterpolation())
-    config_file_path = app_base_dir + "/config-files/" + env + "/citadel-idp-backend-config.ini"
+    config_file_path, _ = get_config_file_paths(env, app_base_dir)
+    # stamped before reading, an edit made while reading is picked up by the next reload.
+    _config_file_stamps = get_config_file_stamps(env, app_base_dir)
     if os.path.exists(config_file_path):
         logging.info("Reading app config from - %s", config_file_path)
         config.read(config_file_path)
-        config_data = config
     else:
         logging.error(
             "No config file found for env '%s' in the default config folder. Was looking for file '%s'",
@@ -34,4 +51,61 @@ def read_config(env, app_base_dir):
         raise custom_exceptions.MissingConfigException()
 
     # add app_base_dir to config data
-    config_data.set("Main", "app_base_dir", app_base_dir)
+    config.set("Main", "app_base_dir", app_base_dir)
+
+    # validate the config once at startup, hot paths read the attributes of the snapshot.
+    new_settings = Settings.from_config(config)
+
+    config_data = config
+    settings = new_settings
+    config_env = env
+    config_app_base_dir = app_base_dir
+    logging.info("Indexed %s document types.", len(new_settings.document_types))
+
+    return new_settings
+
+
+def reload_config_if_changed() -> Settings:
+    """
+    reload_config_if_changed reads the config again if its ini file or .env file changed since it was read last.
+    The variables of the .env file override the environment variables loaded before.
+
+    Raises:
+        MissingConfigException: Raised if the changed config is invalid, the previous settings stay in use until
+        the files change again.
+
+    Returns:
+        Settings: the new settings, None if the config files did not change.
+    """
+    if config_env is None or get_config_file_stamps(config_env, config_app_base_dir) == _config_file_stamps:
+        return None
+
+    _, dot_env_file_path = get_config_file_paths(config_env, config_app_base_dir)
+    if os.path.exists(dot_env_file_path):
+        dotenv.load_dotenv(dot_env_file_path, override=True)
+
+    logging.info("Config files of env '%s' changed, reloading the config.", config_env)
+
+    return read_config(config_env, config_app_base_dir)
+
+
+def get_config_file_paths(env: str, app_base_dir: str) -> tuple[str, str]:
+    """
+    get_config_file_paths returns the paths of the ini file and the .env file of env.
+    """
+    config_folder = app_base_dir + "/config-files/" + env
+
+    return config_folder + "/citadel-idp-backend-config.ini", config_folder + "/.env"
+
+
+def get_config_file_stamps(env: str, app_base_dir: str) -> dict[str, tuple[int, int]]:
+    stamps = {}
+
+    for config_file_path in get_config_file_paths(env, app_base_dir):
+        try:
+            stat_result = os.stat(config_file_path)
+            stamps[config_file_path] = (stat_result.st_mtime_ns, stat_result.st_size)
+        except FileNotFoundError:
+            stamps[config_file_path] = None
+
+    return stamps
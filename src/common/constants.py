@@ -12,3 +12,40 @@ FAILED_SUBFOLDER = "/Failed"
 DEFAULT_BLOB_CONTAINER = "aarkglobal"
 DEFAULT_JSON_OUTPUT_CONTAINER = "bloboutputcontainer"
 MONGODB_CONN_ALIAS = "citadel-backend"
+DEFAULT_ANALYSIS_CONCURRENCY = 4
+DEFAULT_ASYNC_ANALYSIS_CONCURRENCY = 100
+PIPELINE_MODE_SYNC = "sync"
+PIPELINE_MODE_ASYNC = "async"
+AZURE_HTTP_CONNECTION_POOL_SIZE = 32
+CONTAINER_EXISTS_CACHE_TTL_IN_SECONDS = 300
+SYNC_COPY_MAX_BLOB_SIZE_IN_BYTES = 64 * 1024 * 1024
+BLOB_COPY_POLL_INITIAL_DELAY_IN_SECONDS = 0.05
+BLOB_COPY_POLL_MAX_DELAY_IN_SECONDS = 2
+BLOB_COPY_TIMEOUT_IN_SECONDS = 300
+UNIT_OF_WORK_AUTO_FLUSH_SIZE = 100
+DEFAULT_QUEUE_BATCH_SIZE = 50
+DEFAULT_QUEUE_LEASE_SECONDS = 600
+DEFAULT_JOB_MAX_IDLE_POLL_INTERVAL_IN_SECONDS = 60
+JOB_TRIGGER_MODE_POLL = "poll"
+JOB_TRIGGER_MODE_CHANGE_STREAM = "change-stream"
+DEFAULT_JOB_SAFETY_POLL_INTERVAL_IN_SECONDS = 300
+RESULT_JSON_BLOCK_SIZE_IN_BYTES = 4 * 1024 * 1024
+RESULT_JSON_CODEC_IDENTITY = "identity"
+RESULT_JSON_CODEC_GZIP = "gzip"
+RESULT_JSON_CODEC_ZSTD = "zstd"
+DEFAULT_ANALYSIS_RESULT_CACHE_LOCAL_SIZE = 1024
+SAS_EXPIRY_MARGIN_IN_SECONDS = 3600
+SAS_MAX_EXPIRY_IN_SECONDS = 24 * 60 * 60
+DEFAULT_LISTING_PAGE_SIZE = 100
+DEFAULT_COMPANY_WEIGHT = 1
+DEFAULT_FORM_RECOGNIZER_TPS = 15
+DEFAULT_FORM_RECOGNIZER_MAX_CONCURRENCY = 15
+FORM_RECOGNIZER_MAX_THROTTLED_RETRIES = 5
+FORM_RECOGNIZER_SLOT_POLL_INTERVAL_IN_SECONDS = 0.05
+DEFAULT_PROCESSING_MAX_ATTEMPTS = 5
+RETRY_INITIAL_DELAY_IN_SECONDS = 30
+RETRY_MAX_DELAY_IN_SECONDS = 15 * 60
+DEFAULT_STALE_IN_PROGRESS_IN_SECONDS = 30 * 60
+DEFAULT_RECOVERY_BATCH_SIZE = 100
+DEFAULT_PREPARE_CONCURRENCY = 2
+DEFAULT_FINALIZE_CONCURRENCY = 2
@@ -50,3 +50,9 @@ class NoInputBlobsForProcessingException(CitadelIDPBackendException):
     """
     Exception to be raised when no documents are found in db for exception.
     """
+
+
+class BlobMoveException(CitadelIDPBackendException):
+    """
+    Exception to be raised when a blob copy fails or does not complete, the source blob is kept.
+    """
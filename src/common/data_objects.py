@@ -2,7 +2,7 @@
 All data objects declared here.
 """
 
-from common import config_reader, utils
+from common import utils
 from common.custom_exceptions import CitadelIDPBackendException
 
 
@@ -72,6 +72,9 @@ class InputBlob(object):
 
     metadata: str = None
 
+    # snapshot of the azure blob properties, carried along the moves instead of fetching them at every stage.
+    blob_properties = None
+
     # --------------------------------------------------------------------------------
 
     def __init__(
@@ -94,7 +97,7 @@ class InputBlob(object):
 
         # if no custom form_recognizer_endpoint provided, use the main one in config.
         if form_recognizer_endpoint is None:
-            self.form_recognizer_endpoint = config_reader.config_data.get("Main", "form-recognizer-endpoint")
+            self.form_recognizer_endpoint = utils.get_settings().form_recognizer_endpoint
         else:
             self.form_recognizer_endpoint = form_recognizer_endpoint
 
@@ -0,0 +1,45 @@
+"""
+Lookup of the form recognizer model of a document type.
+
+The Form-Recognizer-Document-Types section of config is read once into a case-folded dict, so a lookup is a few
+dict hits instead of an interpolated read of every option. Document types may have several segments, e.g.
+vendor-invoice, the longest configured document type ending the file name wins: 1001-vendor-invoice.pdf maps to
+vendor-invoice if it is configured, and to invoice otherwise. The index is part of the settings built when the config
+is read.
+"""
+DOCUMENT_TYPES_SECTION = "Form-Recognizer-Document-Types"
+
+
+class DocumentTypeIndex(object):
+    """
+    DocumentTypeIndex maps the document types to their form recognizer model, case insensitive.
+    """
+
+    def __init__(self, document_type_models: dict[str, str]):
+        self._models = {document_type.casefold(): model for document_type, model in document_type_models.items()}
+        self._max_segment_count = max((document_type.count("-") + 1 for document_type in self._models), default=1)
+
+    def __len__(self):
+        return len(self._models)
+
+    def lookup(self, name_part: str) -> tuple[str, str]:
+        """
+        lookup finds the longest configured document type at the end of a file name without extension.
+
+        Args:
+            name_part (str): file name without extension, e.g. 1001-vendor-invoice.
+
+        Returns:
+            tuple(str): the document type as written in the file name and its form recognizer model, None if no
+            configured document type follows a hyphen at the end of the name.
+        """
+        segments = name_part.rsplit("-", self._max_segment_count)
+
+        # the first segment is never part of the document type, e.g. 1001.
+        for segment_count in range(len(segments) - 1, 0, -1):
+            document_type = "-".join(segments[-segment_count:])
+            model = self._models.get(document_type.casefold())
+            if model is not None:
+                return document_type, model
+
+        return None
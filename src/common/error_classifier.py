@@ -0,0 +1,80 @@
+"""
+Classification of processing errors into transient and permanent ones.
+
+Transient errors, e.g. network failures, throttling, service unavailable responses of azure and lost mongodb
+connections, are expected to go away when the input blob is processed again later. Every other error is permanent.
+"""
+import random
+from datetime import timedelta
+
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, PyMongoError, WTimeoutError
+
+from common import constants
+from common.custom_exceptions import BlobMoveException
+
+TRANSIENT_HTTP_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+TRANSIENT_ERROR_TYPES = (
+    # the source blob of a failed or unfinished copy is kept, the move can be done again.
+    BlobMoveException,
+    ServiceRequestError,
+    ServiceResponseError,
+    ConnectionFailure,
+    ExecutionTimeout,
+    WTimeoutError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    is_transient_error tells if processing that failed with error may succeed when tried again. The errors an
+    error was explicitly raised from, raise ... from ..., are classified as well. An error raised while handling
+    another one is not, e.g. a permanent error raised in an except block of a transient one stays permanent.
+
+    Args:
+        error (BaseException): the error raised while processing.
+
+    Returns:
+        bool: True if the error is transient.
+    """
+    seen_errors = set()
+
+    while error is not None and id(error) not in seen_errors:
+        seen_errors.add(id(error))
+
+        if isinstance(error, TRANSIENT_ERROR_TYPES):
+            return True
+
+        if isinstance(error, HttpResponseError) and error.status_code in TRANSIENT_HTTP_STATUS_CODES:
+            return True
+
+        if isinstance(error, PyMongoError) and (
+            error.has_error_label("RetryableWriteError") or error.has_error_label("TransientTransactionError")
+        ):
+            return True
+
+        error = error.__cause__
+
+    return False
+
+
+def get_retry_delay(processing_attempts: int) -> timedelta:
+    """
+    get_retry_delay returns a random delay before the next processing attempt, with exponential backoff capped at
+    constants.RETRY_MAX_DELAY_IN_SECONDS and jitter, so retries of the same outage are spread out.
+
+    Args:
+        processing_attempts (int): processing attempts of the input blob that failed so far.
+
+    Returns:
+        timedelta: how long to wait before processing the input blob again.
+    """
+    max_delay_in_seconds = min(
+        constants.RETRY_INITIAL_DELAY_IN_SECONDS * 2 ** max(processing_attempts - 1, 0),
+        constants.RETRY_MAX_DELAY_IN_SECONDS,
+    )
+
+    return timedelta(seconds=random.uniform(constants.RETRY_INITIAL_DELAY_IN_SECONDS / 2, max_delay_in_seconds))
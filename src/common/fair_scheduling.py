@@ -0,0 +1,142 @@
+"""
+Fair scheduling of the work of several companies over one worker pool.
+
+Work items are handed out with weighted deficit round-robin: every turn of a company adds its weight to its deficit,
+and the company is served while its deficit lasts, so a company with weight 3 gets three items for every item of a
+company with weight 1 and a company with a large backlog never starves the others. A per-company cap bounds the
+items of one company in flight at a time.
+"""
+import logging
+import threading
+from collections import deque
+from typing import Callable, Hashable
+
+from common import constants
+
+
+class CompanyFairQueue(object):
+    """
+    CompanyFairQueue hands out the work items of several companies with weighted deficit round-robin.
+
+    Items are taken by a single producer thread with take, and released with release from any thread once they
+    are processed. take blocks while every company with work left has max_in_flight_per_company items in flight,
+    a company at its cap is only found to have no work left once one of its items is released.
+    """
+
+    def __init__(
+        self,
+        company_weights: dict[str, int] = None,
+        default_weight: int = constants.DEFAULT_COMPANY_WEIGHT,
+        max_in_flight_per_company: int = None,
+    ):
+        self.company_weights = company_weights or {}
+        self.default_weight = default_weight
+        self.max_in_flight_per_company = max_in_flight_per_company
+
+        self._condition = threading.Condition()
+        # companies with work left, the company at the head is served next.
+        self._companies: deque = deque()
+        self._next_items: dict[Hashable, Callable] = {}
+        self._deficits: dict[Hashable, float] = {}
+        self._in_flight_counts: dict[Hashable, int] = {}
+        # id of an item in flight -> its company.
+        self._item_companies: dict[int, Hashable] = {}
+
+    def add_company(self, company_key: Hashable, next_item: Callable[[], object]):
+        """
+        add_company adds the work of a company.
+
+        Args:
+            company_key (Hashable): identifies the company, str(company_key) is looked up in company_weights.
+            next_item (Callable[[], object]): returns the next item of the company, None once it has no work left.
+        """
+        self._companies.append(company_key)
+        self._next_items[company_key] = next_item
+        self._deficits[company_key] = 0
+        with self._condition:
+            self._in_flight_counts.setdefault(company_key, 0)
+
+    def get_weight(self, company_key: Hashable) -> int:
+        return self.company_weights.get(str(company_key), self.default_weight)
+
+    def take(self):
+        """
+        take returns the next item, waiting while every company with work left is at its cap.
+
+        Returns:
+            the next item, None once no company has work left.
+        """
+        capped_company_count = 0
+
+        while self._companies:
+            if capped_company_count >= len(self._companies):
+                # every company is at its cap, wait for one of their items to complete.
+                with self._condition:
+                    self._condition.wait_for(lambda: any(map(self._has_capacity, self._companies)))
+                capped_company_count = 0
+
+            company_key = self._companies[0]
+
+            with self._condition:
+                has_capacity = self._has_capacity(company_key)
+
+            if not has_capacity:
+                # the company keeps its deficit and is served once it is below its cap again.
+                self._companies.rotate(-1)
+                capped_company_count += 1
+                continue
+
+            capped_company_count = 0
+
+            if self._deficits[company_key] < 1:
+                self._deficits[company_key] += self.get_weight(company_key)
+
+            item = self._next_items[company_key]()
+
+            if item is None:
+                logging.debug("Company %s has no work left.", company_key)
+                self._companies.popleft()
+                del self._next_items[company_key]
+                del self._deficits[company_key]
+                continue
+
+            self._deficits[company_key] -= 1
+            if self._deficits[company_key] < 1:
+                self._companies.rotate(-1)
+
+            with self._condition:
+                self._in_flight_counts[company_key] += 1
+                self._item_companies[id(item)] = company_key
+
+            return item
+
+        return None
+
+    def __iter__(self):
+        return iter(self.take, None)
+
+    def release(self, item):
+        """
+        release marks an item taken from the queue as processed, items not taken from the queue are ignored.
+        """
+        with self._condition:
+            company_key = self._item_companies.pop(id(item), None)
+            if company_key is None:
+                return
+
+            self._in_flight_counts[company_key] -= 1
+            self._condition.notify_all()
+
+    def get_in_flight_counts(self) -> dict:
+        with self._condition:
+            return {
+                company_key: in_flight_count
+                for company_key, in_flight_count in self._in_flight_counts.items()
+                if in_flight_count
+            }
+
+    def _has_capacity(self, company_key: Hashable) -> bool:
+        return (
+            self.max_in_flight_per_company is None
+            or self._in_flight_counts[company_key] < self.max_in_flight_per_company
+        )
@@ -0,0 +1,209 @@
+"""
+Streams form recognizer results as json into block blobs.
+
+The result json is serialized element by element and uploaded as staged blocks, so the peak memory of an
+upload is one block plus one page, paragraph or table of the result, however large the document is.
+Results can be compressed on the fly with gzip or zstd, the codec is sent as Content-Encoding and recorded
+in ResultJsonMetaData.json_result_codec so read_result_json can decode it.
+"""
+import base64
+import json
+import zlib
+from typing import Iterable, Iterator
+
+from azure.core.serialization import AzureJSONEncoder
+from azure.storage.blob import BlobBlock, BlobClient, BlobServiceClient, ContentSettings
+from azure.storage.blob.aio import BlobClient as AsyncBlobClient
+
+from common import constants
+
+# file extension of the result blobs per codec.
+RESULT_JSON_FILE_EXTENSIONS = {
+    constants.RESULT_JSON_CODEC_IDENTITY: ".json",
+    constants.RESULT_JSON_CODEC_GZIP: ".json.gz",
+    constants.RESULT_JSON_CODEC_ZSTD: ".json.zst",
+}
+
+# leading bytes of gzip and zstd frames.
+GZIP_MAGIC_BYTES = b"\x1f\x8b"
+ZSTD_MAGIC_BYTES = b"\x28\xb5\x2f\xfd"
+
+# AnalyzeResult.to_dict keys, in the order they are serialized by the sdk.
+ANALYZE_RESULT_SCALAR_FIELDS = ("api_version", "model_id", "content")
+ANALYZE_RESULT_LIST_FIELDS = ("languages", "pages", "paragraphs", "tables", "key_value_pairs", "styles", "documents")
+
+
+def iter_result_json(input_file_name: str, result) -> Iterator[str]:
+    """
+    iter_result_json yields the result json of an analyzed input blob in chunks. The joined chunks are equal
+    to json.dumps of {"input_file_name": ..., "recognizer_result_data": [result.to_dict()]}.
+
+    Args:
+        input_file_name (str): name of the analyzed file.
+        result (AnalyzeResult): form recognizer result.
+
+    Yields:
+        str: json chunks.
+    """
+    encoder = AzureJSONEncoder()
+
+    yield f'{{"input_file_name": {encoder.encode(input_file_name)}, "recognizer_result_data": [{{'
+
+    for index, field_name in enumerate(ANALYZE_RESULT_SCALAR_FIELDS):
+        separator = ", " if index else ""
+        yield f"{separator}{encoder.encode(field_name)}: {encoder.encode(getattr(result, field_name))}"
+
+    for field_name in ANALYZE_RESULT_LIST_FIELDS:
+        yield f", {encoder.encode(field_name)}: ["
+        for index, element in enumerate(getattr(result, field_name) or []):
+            if index:
+                yield ", "
+            yield from encoder.iterencode(element.to_dict())
+        yield "]"
+
+    yield "}]}"
+
+
+def get_result_json_content_settings(codec: str) -> ContentSettings:
+    """
+    get_result_json_content_settings returns the json content type with the Content-Encoding of the codec.
+    """
+    content_encoding = None if codec == constants.RESULT_JSON_CODEC_IDENTITY else codec
+    return ContentSettings(content_type="application/json", content_encoding=content_encoding)
+
+
+def get_compressor(codec: str):
+    """
+    get_compressor returns a streaming compressor with compress(bytes) and flush() for the codec,
+    None for identity.
+    """
+    if codec == constants.RESULT_JSON_CODEC_GZIP:
+        # wbits 31 writes the gzip header and trailer.
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    if codec == constants.RESULT_JSON_CODEC_ZSTD:
+        import zstandard
+
+        return zstandard.ZstdCompressor().compressobj()
+
+    return None
+
+
+def iter_encoded(chunks: Iterable, codec: str) -> Iterator[bytes]:
+    """
+    iter_encoded encodes str or bytes chunks with the codec while they are streamed.
+    """
+    compressor = get_compressor(codec)
+
+    for chunk in chunks:
+        data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        if compressor is None:
+            yield data
+        else:
+            compressed_data = compressor.compress(data)
+            if compressed_data:
+                yield compressed_data
+
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def decode_result_json(data: bytes, codec: str) -> bytes:
+    """
+    decode_result_json decodes the content of a result blob written with the codec. Content already decoded by
+    the http transport, based on the Content-Encoding header, is returned as is.
+    """
+    if codec == constants.RESULT_JSON_CODEC_GZIP and data.startswith(GZIP_MAGIC_BYTES):
+        return zlib.decompress(data, 47)
+
+    if codec == constants.RESULT_JSON_CODEC_ZSTD and data.startswith(ZSTD_MAGIC_BYTES):
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    return data
+
+
+def read_result_json(blob_service_client: BlobServiceClient, json_output) -> dict:
+    """
+    read_result_json downloads and decodes a result json.
+
+    Args:
+        blob_service_client (BlobServiceClient): client of the storage account.
+        json_output (ResultJsonMetaData): location and codec of the result json.
+
+    Returns:
+        dict: the result json.
+    """
+    blob_client = blob_service_client.get_blob_client(
+        container=json_output.json_result_container_name, blob=json_output.json_result_blob_path
+    )
+    data = blob_client.download_blob().readall()
+
+    return json.loads(decode_result_json(data, json_output.json_result_codec or constants.RESULT_JSON_CODEC_IDENTITY))
+
+
+def iter_blocks(chunks: Iterable, block_size: int = constants.RESULT_JSON_BLOCK_SIZE_IN_BYTES) -> Iterator[bytes]:
+    """
+    iter_blocks regroups str or bytes chunks into blocks of block_size bytes, the last block may be smaller.
+    """
+    buffer = bytearray()
+
+    for chunk in chunks:
+        buffer += chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        while len(buffer) >= block_size:
+            yield bytes(buffer[:block_size])
+            del buffer[:block_size]
+
+    if buffer:
+        yield bytes(buffer)
+
+
+def get_block_id(block_index: int) -> str:
+    # block ids of a blob need to have the same length.
+    return base64.b64encode(f"{block_index:08d}".encode("utf-8")).decode("utf-8")
+
+
+def upload_blocks(blob_client: BlobClient, chunks: Iterable, **commit_kwargs) -> int:
+    """
+    upload_blocks stages the chunks as blocks and commits them. An existing blob is replaced, e.g. the result
+    json a previous attempt of the same input blob uploaded before it failed.
+
+    Args:
+        blob_client (BlobClient): client of the destination blob.
+        chunks (Iterable): str or bytes chunks of the blob content.
+        commit_kwargs: passed to commit_block_list, e.g. content_settings.
+
+    Returns:
+        int: size of the uploaded blob in bytes.
+    """
+    block_list = []
+    uploaded_size = 0
+
+    for block_index, block in enumerate(iter_blocks(chunks)):
+        block_id = get_block_id(block_index)
+        blob_client.stage_block(block_id, block, length=len(block))
+        block_list.append(BlobBlock(block_id=block_id))
+        uploaded_size += len(block)
+
+    blob_client.commit_block_list(block_list, **commit_kwargs)
+
+    return uploaded_size
+
+
+async def upload_blocks_async(blob_client: AsyncBlobClient, chunks: Iterable, **commit_kwargs) -> int:
+    """
+    upload_blocks_async is upload_blocks for the aio blob clients.
+    """
+    block_list = []
+    uploaded_size = 0
+
+    for block_index, block in enumerate(iter_blocks(chunks)):
+        block_id = get_block_id(block_index)
+        await blob_client.stage_block(block_id, block, length=len(block))
+        block_list.append(BlobBlock(block_id=block_id))
+        uploaded_size += len(block)
+
+    await blob_client.commit_block_list(block_list, **commit_kwargs)
+
+    return uploaded_size
@@ -0,0 +1,202 @@
+"""
+Read only SAS urls for the blobs of a container.
+
+A BlobSasSigner is built once per blob service client and container: the account name, the container url on the
+real endpoint of the client (Azurite included) and the signing key are resolved up front, so signing a url is
+only the HMAC of its string to sign. Accounts without an account key sign with a cached user delegation key,
+AsyncBlobSasSigner requests it with the aio blob service client.
+"""
+import asyncio
+import threading
+import weakref
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+from azure.storage.blob import BlobSasPermissions, BlobServiceClient, generate_blob_sas
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+
+from common import constants
+
+_lock = threading.Lock()
+# (blob service client) -> (container name) -> signer, the signers go away with their blob service client.
+_signers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+class BlobSasSigner(object):
+    """
+    BlobSasSigner signs read only SAS urls for the blobs of one container.
+    """
+
+    def __init__(self, blob_service_client: BlobServiceClient, container_name: str = constants.DEFAULT_BLOB_CONTAINER):
+        # the signer is cached per blob service client, a strong reference would keep the client alive.
+        self._blob_service_client = weakref.ref(blob_service_client)
+        self.container_name = container_name
+        self.account_name = blob_service_client.account_name
+        self.container_url = f"{blob_service_client.url.rstrip('/')}/{quote(container_name)}"
+        self.account_key = getattr(blob_service_client.credential, "account_key", None)
+        self.permission = BlobSasPermissions(read=True)
+
+        self._lock = threading.Lock()
+        self._user_delegation_key = None
+        self._user_delegation_key_expiry: datetime = None
+
+    @property
+    def blob_service_client(self) -> BlobServiceClient:
+        return self._blob_service_client()
+
+    def get_sas_url(self, blob_path: str, expected_wait: timedelta = timedelta()) -> str:
+        """
+        get_sas_url signs a read only SAS url for the blob.
+
+        Args:
+            blob_path (str): path of the blob in the container.
+            expected_wait (timedelta, optional): how long the url may wait before it is used.
+
+        Returns:
+            str: the SAS url of the blob.
+        """
+        return self.get_sas_urls([blob_path], expected_wait)[blob_path]
+
+    def get_sas_urls(self, blob_paths: list[str], expected_wait: timedelta = timedelta()) -> dict[str, str]:
+        """
+        get_sas_urls signs read only SAS urls for a batch of blobs, all with the same expiry. The expiry covers
+        the expected wait plus constants.SAS_EXPIRY_MARGIN_IN_SECONDS, at most constants.SAS_MAX_EXPIRY_IN_SECONDS.
+
+        Args:
+            blob_paths (list[str]): paths of the blobs in the container.
+            expected_wait (timedelta, optional): how long the urls may wait before they are used.
+
+        Returns:
+            dict[str, str]: SAS url per blob path.
+        """
+        now, expiry = get_now_and_expiry(expected_wait)
+
+        return self.sign_sas_urls(blob_paths, expiry, self.get_signing_credential(now, expiry))
+
+    def sign_sas_urls(self, blob_paths: list[str], expiry: datetime, signing_credential: dict) -> dict[str, str]:
+        """
+        sign_sas_urls signs the SAS urls of the blobs with the generate_blob_sas keyword of signing_credential.
+        """
+        sas_urls = {}
+        for blob_path in blob_paths:
+            sas_token = generate_blob_sas(
+                self.account_name,
+                self.container_name,
+                blob_path,
+                permission=self.permission,
+                expiry=expiry,
+                **signing_credential,
+            )
+            sas_urls[blob_path] = f"{self.container_url}/{quote(blob_path, safe='/~')}?{sas_token}"
+
+        return sas_urls
+
+    def get_signing_credential(self, now: datetime, expiry: datetime) -> dict:
+        """
+        get_signing_credential returns the generate_blob_sas keyword for the account key, or for a user delegation
+        key that is valid until expiry. User delegation keys are requested for the longest SAS lifetime and reused.
+        """
+        if self.account_key is not None:
+            return {"account_key": self.account_key}
+
+        with self._lock:
+            if self.needs_user_delegation_key(expiry):
+                self._user_delegation_key_expiry = now + timedelta(seconds=constants.SAS_MAX_EXPIRY_IN_SECONDS)
+                self._user_delegation_key = self.blob_service_client.get_user_delegation_key(
+                    now - timedelta(minutes=5), self._user_delegation_key_expiry
+                )
+
+            return {"user_delegation_key": self._user_delegation_key}
+
+    def needs_user_delegation_key(self, expiry: datetime) -> bool:
+        """
+        needs_user_delegation_key returns True if there is no user delegation key yet, or it expires before expiry.
+        """
+        return self._user_delegation_key is None or self._user_delegation_key_expiry < expiry
+
+
+class AsyncBlobSasSigner(BlobSasSigner):
+    """
+    AsyncBlobSasSigner signs read only SAS urls for the blobs of one container with an aio blob service client,
+    the user delegation key is awaited.
+    """
+
+    def __init__(
+        self, blob_service_client: AsyncBlobServiceClient, container_name: str = constants.DEFAULT_BLOB_CONTAINER
+    ):
+        super().__init__(blob_service_client, container_name)
+        self._async_lock = asyncio.Lock()
+
+    async def get_sas_url(self, blob_path: str, expected_wait: timedelta = timedelta()) -> str:
+        """
+        get_sas_url signs a read only SAS url for the blob, see BlobSasSigner.get_sas_url.
+        """
+        return (await self.get_sas_urls([blob_path], expected_wait))[blob_path]
+
+    async def get_sas_urls(self, blob_paths: list[str], expected_wait: timedelta = timedelta()) -> dict[str, str]:
+        """
+        get_sas_urls signs read only SAS urls for a batch of blobs, see BlobSasSigner.get_sas_urls.
+        """
+        now, expiry = get_now_and_expiry(expected_wait)
+
+        return self.sign_sas_urls(blob_paths, expiry, await self.get_signing_credential(now, expiry))
+
+    async def get_signing_credential(self, now: datetime, expiry: datetime) -> dict:
+        """
+        get_signing_credential awaits the user delegation key, see BlobSasSigner.get_signing_credential.
+        """
+        if self.account_key is not None:
+            return {"account_key": self.account_key}
+
+        async with self._async_lock:
+            if self.needs_user_delegation_key(expiry):
+                user_delegation_key_expiry = now + timedelta(seconds=constants.SAS_MAX_EXPIRY_IN_SECONDS)
+                self._user_delegation_key = await self.blob_service_client.get_user_delegation_key(
+                    now - timedelta(minutes=5), user_delegation_key_expiry
+                )
+                self._user_delegation_key_expiry = user_delegation_key_expiry
+
+            return {"user_delegation_key": self._user_delegation_key}
+
+
+def get_now_and_expiry(expected_wait: timedelta) -> tuple[datetime, datetime]:
+    """
+    get_now_and_expiry returns now and the SAS expiry for urls that may wait expected_wait before they are used.
+    """
+    now = datetime.utcnow()
+    expiry = now + min(
+        expected_wait + timedelta(seconds=constants.SAS_EXPIRY_MARGIN_IN_SECONDS),
+        timedelta(seconds=constants.SAS_MAX_EXPIRY_IN_SECONDS),
+    )
+
+    return now, expiry
+
+
+def get_blob_sas_signer(
+    blob_service_client: BlobServiceClient, container_name: str = constants.DEFAULT_BLOB_CONTAINER
+) -> BlobSasSigner:
+    """
+    get_blob_sas_signer returns the signer of the container, shared as long as the blob service client lives.
+    """
+    return _get_cached_signer(BlobSasSigner, blob_service_client, container_name)
+
+
+def get_async_blob_sas_signer(
+    blob_service_client: AsyncBlobServiceClient, container_name: str = constants.DEFAULT_BLOB_CONTAINER
+) -> AsyncBlobSasSigner:
+    """
+    get_async_blob_sas_signer returns the signer of the container for an aio blob service client, shared as long
+    as the blob service client lives.
+    """
+    return _get_cached_signer(AsyncBlobSasSigner, blob_service_client, container_name)
+
+
+def _get_cached_signer(signer_class: type, blob_service_client, container_name: str):
+    with _lock:
+        container_signers = _signers.setdefault(blob_service_client, {})
+        signer = container_signers.get(container_name)
+        if type(signer) is not signer_class:
+            signer = signer_class(blob_service_client, container_name)
+            container_signers[container_name] = signer
+
+        return signer
@@ -0,0 +1,223 @@
+"""
+Immutable snapshot of the app config.
+
+config_reader.read_config validates the config once and builds a Settings from it, so a bad config fails at
+startup instead of in the middle of a batch. Hot paths read attributes of the snapshot instead of going through
+the interpolation of ConfigParser on every call. A new config is read into a new snapshot that replaces the old
+one as a whole, a reader holding the old snapshot keeps seeing consistent values.
+"""
+import configparser
+import importlib.util
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping
+
+from common import constants
+from common.custom_exceptions import MissingConfigException
+from common.document_types import DOCUMENT_TYPES_SECTION, DocumentTypeIndex
+
+MAIN_SECTION = "Main"
+
+# the positive integer options of the Main section, validated when the config is read.
+POSITIVE_INT_OPTIONS = (
+    "analysis-concurrency",
+    "async-analysis-concurrency",
+    "prepare-concurrency",
+    "finalize-concurrency",
+    "queue-batch-size",
+    "queue-lease-seconds",
+    "company-max-concurrency",
+    "processing-max-attempts",
+    "stale-in-progress-seconds",
+    "recovery-batch-size",
+    "job-max-idle-poll-interval-seconds",
+    "job-safety-poll-interval-seconds",
+    "analysis-result-cache-local-size",
+    "form-recognizer-tps",
+    "form-recognizer-max-concurrency",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """
+    Settings holds the validated values of the app config. Optional options that are not configured are None, or
+    missing from positive_ints, the getters of common.utils apply the defaults.
+    """
+
+    app_base_dir: str
+    env: str | None
+    use_azure_blob_storage: bool
+    # the secrets are kept out of the repr, settings may end up in logs.
+    azure_storage_account_connection_str: str | None = field(repr=False)
+    mongodb_connection_string: str | None = field(repr=False)
+    form_recognizer_endpoint: str
+    form_recognizer_key: str = field(repr=False)
+    pipeline_mode: str
+    result_json_codec: str
+    job_trigger_mode: str
+    analysis_result_cache: bool
+    positive_ints: Mapping[str, int]
+    company_weights: Mapping[str, int]
+    form_recognizer_model_tps: Mapping[str, int]
+    document_types: DocumentTypeIndex
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> "Settings":
+        """
+        from_config validates config and builds its snapshot.
+
+        Raises:
+            MissingConfigException: Raised if a required option is missing or an option has an invalid value.
+        """
+        document_type_models = {}
+        if config.has_section(DOCUMENT_TYPES_SECTION):
+            document_type_models = dict(config.items(DOCUMENT_TYPES_SECTION))
+
+        return cls(
+            app_base_dir=config.get(MAIN_SECTION, "app_base_dir"),
+            env=_get_optional(config, "env"),
+            use_azure_blob_storage=_get_boolean(config, "use-azure-blog-storage", True),
+            azure_storage_account_connection_str=_get_connection_string(config, "azure-storage-account-connection-str"),
+            mongodb_connection_string=_get_connection_string(config, "mongodb_connection_string"),
+            form_recognizer_endpoint=_get_required(config, "form-recognizer-endpoint"),
+            form_recognizer_key=_get_required(config, "form-recognizer-key"),
+            pipeline_mode=_get_pipeline_mode(config),
+            result_json_codec=_get_result_json_codec(config),
+            job_trigger_mode=_get_job_trigger_mode(config),
+            analysis_result_cache=_get_boolean(config, "analysis-result-cache", False),
+            positive_ints=MappingProxyType(
+                {
+                    option: _get_positive_int(config, option)
+                    for option in POSITIVE_INT_OPTIONS
+                    if config.has_option(MAIN_SECTION, option)
+                }
+            ),
+            company_weights=MappingProxyType(_get_positive_int_mapping(config, "company-weights", "company")),
+            form_recognizer_model_tps=MappingProxyType(
+                _get_positive_int_mapping(config, "form-recognizer-model-tps", "model id")
+            ),
+            document_types=DocumentTypeIndex(document_type_models),
+        )
+
+
+def _get_optional(config: configparser.ConfigParser, option: str) -> str | None:
+    if not config.has_option(MAIN_SECTION, option):
+        return None
+
+    return config.get(MAIN_SECTION, option)
+
+
+def _get_required(config: configparser.ConfigParser, option: str) -> str:
+    value = _get_optional(config, option)
+
+    if value is None:
+        raise MissingConfigException(f"Main.{option} is missing in config.")
+
+    if not value:
+        raise MissingConfigException(f"Main.{option} is present but has empty value.")
+
+    return value
+
+
+def _get_connection_string(config: configparser.ConfigParser, option: str) -> str | None:
+    """
+    _get_connection_string reads a connection string without its quotes, None if it is missing.
+    """
+    if not config.has_option(MAIN_SECTION, option):
+        return None
+
+    connection_string = _get_required(config, option)
+
+    if connection_string.startswith(("'", '"')) and connection_string.endswith(("'", '"')):
+        connection_string = connection_string.strip("'\"")
+
+    return connection_string
+
+
+def _get_boolean(config: configparser.ConfigParser, option: str, default: bool) -> bool:
+    if not config.has_option(MAIN_SECTION, option):
+        return default
+
+    try:
+        return config.getboolean(MAIN_SECTION, option)
+    except ValueError as ve:
+        raise MissingConfigException(f"Main.{option} needs to be a boolean.") from ve
+
+
+def _get_positive_int(config: configparser.ConfigParser, option: str) -> int:
+    try:
+        value = config.getint(MAIN_SECTION, option)
+    except ValueError as ve:
+        raise MissingConfigException(f"Main.{option} needs to be an integer.") from ve
+
+    if value < 1:
+        raise MissingConfigException(f"Main.{option} needs to be greater than zero.")
+
+    return value
+
+
+def _get_positive_int_mapping(config: configparser.ConfigParser, option: str, key_name: str) -> dict[str, int]:
+    """
+    _get_positive_int_mapping reads a comma separated list of <key>:<positive integer>, empty if the option is
+    missing.
+    """
+    mapping = {}
+
+    if not config.has_option(MAIN_SECTION, option):
+        return mapping
+
+    for entry in config.get(MAIN_SECTION, option).split(","):
+        if not entry.strip():
+            continue
+
+        key, _, value = entry.partition(":")
+        if not key.strip() or not value.strip().isdigit() or int(value) < 1:
+            raise MissingConfigException(
+                f"Main.{option} entry '{entry.strip()}' needs to be <{key_name}>:<positive integer>."
+            )
+
+        mapping[key.strip()] = int(value)
+
+    return mapping
+
+
+def _get_pipeline_mode(config: configparser.ConfigParser) -> str:
+    pipeline_mode = (_get_optional(config, "pipeline-mode") or constants.PIPELINE_MODE_SYNC).strip().lower()
+
+    if pipeline_mode not in (constants.PIPELINE_MODE_SYNC, constants.PIPELINE_MODE_ASYNC):
+        raise MissingConfigException(
+            f"Main.pipeline-mode needs to be '{constants.PIPELINE_MODE_SYNC}' or '{constants.PIPELINE_MODE_ASYNC}'."
+        )
+
+    return pipeline_mode
+
+
+def _get_result_json_codec(config: configparser.ConfigParser) -> str:
+    result_json_codec = (
+        (_get_optional(config, "result-json-codec") or constants.RESULT_JSON_CODEC_IDENTITY).strip().lower()
+    )
+
+    if result_json_codec not in (
+        constants.RESULT_JSON_CODEC_IDENTITY,
+        constants.RESULT_JSON_CODEC_GZIP,
+        constants.RESULT_JSON_CODEC_ZSTD,
+    ):
+        raise MissingConfigException("Main.result-json-codec needs to be 'identity', 'gzip' or 'zstd'.")
+
+    if result_json_codec == constants.RESULT_JSON_CODEC_ZSTD and importlib.util.find_spec("zstandard") is None:
+        raise MissingConfigException("Main.result-json-codec 'zstd' needs the zstandard package.")
+
+    return result_json_codec
+
+
+def _get_job_trigger_mode(config: configparser.ConfigParser) -> str:
+    job_trigger_mode = (_get_optional(config, "job-trigger-mode") or constants.JOB_TRIGGER_MODE_POLL).strip().lower()
+
+    if job_trigger_mode not in (constants.JOB_TRIGGER_MODE_POLL, constants.JOB_TRIGGER_MODE_CHANGE_STREAM):
+        raise MissingConfigException(
+            f"Main.job-trigger-mode needs to be '{constants.JOB_TRIGGER_MODE_POLL}' or "
+            f"'{constants.JOB_TRIGGER_MODE_CHANGE_STREAM}'."
+        )
+
+    return job_trigger_mode
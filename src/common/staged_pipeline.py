@@ -0,0 +1,106 @@
+"""
+Stages of work connected by bounded queues, each stage with its own worker threads.
+
+An item submitted to the pipeline goes through the handler of every stage in order, the value returned by one
+stage is the input of the next one. The bounded queues keep the cheap stages at most one queue ahead of the slow
+ones, and block submit once the first queue is full, so work is not taken on long before a worker is free.
+"""
+import logging
+import queue
+import threading
+from typing import Any, Callable, NamedTuple
+
+# tells a worker that no more items come into its stage.
+_STOP = object()
+
+
+class PipelineStage(NamedTuple):
+    """
+    PipelineStage names a stage, its handler and its number of worker threads. The handler returns the input of
+    the next stage, or None if the item leaves the pipeline at this stage.
+    """
+
+    name: str
+    handler: Callable[[Any], Any]
+    worker_count: int
+
+
+class StagedPipeline(object):
+    """
+    StagedPipeline runs items through its stages, use it as a context manager: the workers start on enter, and on
+    exit every submitted item is completed before the workers stop.
+
+    on_done is called once per submitted item, from a worker thread, with the item and the value returned by the
+    last stage, or None if the item left the pipeline earlier. A handler raising an exception is logged and its
+    item leaves the pipeline.
+    """
+
+    def __init__(
+        self, stages: list[PipelineStage], queue_size: int, on_done: Callable[[Any, Any], None] = lambda *_: None
+    ):
+        self.stages = stages
+        self.on_done = on_done
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._workers: list[list[threading.Thread]] = []
+
+    def __enter__(self):
+        for stage_index, stage in enumerate(self.stages):
+            self._workers.append(
+                [
+                    threading.Thread(target=self._run_worker, args=(stage_index,), name=f"{stage.name}-{number}")
+                    for number in range(stage.worker_count)
+                ]
+            )
+
+        for stage_workers in self._workers:
+            for worker in stage_workers:
+                worker.start()
+
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def submit(self, item):
+        """
+        submit queues the item for the first stage, waiting while the queue is full.
+        """
+        self._queues[0].put((item, item))
+
+    def close(self):
+        """
+        close waits for the submitted items to go through the pipeline and stops the workers, stage by stage.
+        """
+        for stage_queue, stage_workers in zip(self._queues, self._workers):
+            for _ in stage_workers:
+                stage_queue.put(_STOP)
+
+            for worker in stage_workers:
+                worker.join()
+
+    def _run_worker(self, stage_index: int):
+        stage = self.stages[stage_index]
+        is_last_stage = stage_index == len(self.stages) - 1
+
+        while True:
+            entry = self._queues[stage_index].get()
+            if entry is _STOP:
+                return
+
+            item, value = entry
+            try:
+                result = stage.handler(value)
+            except Exception:
+                logging.exception("Stage %s failed for %s.", stage.name, item)
+                result = None
+
+            if result is None or is_last_stage:
+                self._complete(item, result)
+            else:
+                self._queues[stage_index + 1].put((item, result))
+
+    def _complete(self, item, result):
+        try:
+            self.on_done(item, result)
+        except Exception:
+            logging.exception("Could not complete %s.", item)
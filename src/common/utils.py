@@ -1,15 +1,24 @@
+import copy
 import logging
 import os
 import base64
 import mongoengine as me
-from datetime import datetime, timedelta
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
-from common import config_reader, constants
+from datetime import datetime, timezone
+from azure.storage.blob import BlobProperties, BlobServiceClient
+from common import (
+    analysis_rate_limiter,
+    azure_clients,
+    blob_mover,
+    config_reader,
+    constants,
+    sas_signer,
+)
 from common.data_objects import Metadata
+from common.fair_scheduling import CompanyFairQueue
+from common.settings import POSITIVE_INT_OPTIONS, Settings
 from common.custom_exceptions import (
     MissingDocumentTypeException,
     MissingConfigException,
-    ContainerMissingException,
 )
 
 
@@ -17,24 +26,117 @@ def string_is_not_empty(input_str):
     return str is not None and len(input_str) > 0
 
 
+def get_settings() -> Settings:
+    """
+    get_settings returns the settings snapshot of the config read last.
+
+    Raises:
+        MissingConfigException: Raised if no config has been read yet.
+    """
+    settings = config_reader.settings
+    if settings is None:
+        raise MissingConfigException("Config has not been read, call config_reader.read_config first.")
+
+    return settings
+
+
 def is_env_local():
-    if config_reader.config_data.has_option("Main", "env"):
-        env = config_reader.config_data.get("Main", "env")
-    else:
-        env = "local"
+    env = get_settings().env or "local"
 
     return env.lower() == "local".lower()
 
 
 def is_env_prod():
-    if config_reader.config_data.has_option("Main", "env"):
-        env = config_reader.config_data.get("Main", "env")
-    else:
-        env = "prod"
+    env = get_settings().env or "prod"
 
     return env.lower() == "local".lower()
 
 
+def get_positive_int_config(option: str, default: int) -> int:
+    """
+    get_positive_int_config returns a positive integer option of the Main section of config, validated when the
+    config was read.
+
+    Args:
+        option (str): name of the option in the Main section, one of settings.POSITIVE_INT_OPTIONS.
+        default (int): value returned when the option is not configured.
+
+    Raises:
+        MissingConfigException: Raised if option is not one of settings.POSITIVE_INT_OPTIONS, it is never read
+        from config.
+
+    Returns:
+        int: the configured value or the default.
+    """
+    if option not in POSITIVE_INT_OPTIONS:
+        raise MissingConfigException(f"Main.{option} is not registered in settings.POSITIVE_INT_OPTIONS.")
+
+    return get_settings().positive_ints.get(option, default)
+
+
+def get_analysis_concurrency() -> int:
+    """
+    get_analysis_concurrency reads the number of input blobs that are analyzed in parallel.
+
+    Returns:
+        int: the analysis concurrency, defaults to constants.DEFAULT_ANALYSIS_CONCURRENCY when not configured.
+    """
+    return get_positive_int_config("analysis-concurrency", constants.DEFAULT_ANALYSIS_CONCURRENCY)
+
+
+def get_pipeline_mode() -> str:
+    """
+    get_pipeline_mode returns the engine used by the document processing flow, "sync" (the default) or "async".
+    """
+    return get_settings().pipeline_mode
+
+
+def get_result_json_codec() -> str:
+    """
+    get_result_json_codec returns the Content-Encoding used for the result json uploads, "identity" (the default),
+    "gzip" or "zstd".
+    """
+    return get_settings().result_json_codec
+
+
+def is_analysis_result_cache_enabled() -> bool:
+    """
+    is_analysis_result_cache_enabled tells if duplicate documents reuse the result json of an earlier analysis,
+    Main.analysis-result-cache, False if missing.
+    """
+    return get_settings().analysis_result_cache
+
+
+def get_job_trigger_mode() -> str:
+    """
+    get_job_trigger_mode returns how the document processing job learns about new input blobs, "poll" (the
+    default) or "change-stream".
+    """
+    return get_settings().job_trigger_mode
+
+
+def get_company_weights() -> dict[str, int]:
+    """
+    get_company_weights returns the scheduling weight of the companies from Main.company-weights, a comma separated
+    list of <company id>:<weight>, with the mongodb id of the company. blob_handler, which only sees the storage
+    listing, looks up the company folder name instead, e.g. Company-A.
+
+    Returns:
+        dict[str, int]: weight per company, companies not listed have constants.DEFAULT_COMPANY_WEIGHT.
+    """
+    return dict(get_settings().company_weights)
+
+
+def get_company_fair_queue() -> CompanyFairQueue:
+    """
+    get_company_fair_queue returns an empty CompanyFairQueue with the configured company weights, and
+    Main.company-max-concurrency as cap of the input blobs of one company processed at a time, no cap if missing.
+    """
+    max_in_flight_per_company = get_positive_int_config("company-max-concurrency", None)
+
+    return CompanyFairQueue(get_company_weights(), constants.DEFAULT_COMPANY_WEIGHT, max_in_flight_per_company)
+
+
 def get_document_type_from_file_name(file_path: str):
     """
     get_document_type_from_file_name Takes a filename or absolute path and extracts the
@@ -47,7 +149,9 @@ def get_document_type_from_file_name(file_path: str):
     file_path = "1001-receipt.jpg"
 
     Should extract "receipt" as the result. Using this value as key in config, finds the
-    corresponding form recognizer model for this file.
+    corresponding form recognizer model for this file. Document types of several segments are
+    supported, the longest one configured wins, e.g. "1001-vendor-invoice.pdf" is a "vendor-invoice"
+    if it is configured and an "invoice" otherwise.
 
     Args:
         file_path (str): the filename or path to extract the info from.
@@ -69,71 +173,124 @@ def get_document_type_from_file_name(file_path: str):
         logging.warning(msg)
         raise MissingDocumentTypeException(msg)
 
-    document_type = name_part[(index + 1) :]
-    found = False
-    if config_reader.config_data.has_section("Form-Recognizer-Document-Types"):
-        for key, value in config_reader.config_data.items("Form-Recognizer-Document-Types"):
-            if str(document_type).lower() == str(key).lower():
-                return document_type, value
+    document_type_and_model = get_settings().document_types.lookup(name_part)
 
-    if not found:
+    if document_type_and_model is None:
+        document_type = name_part[(index + 1) :]
         msg = f"Could not find form recognizer model for document type {document_type} inferred form file name path {file_path}."
         logging.error(msg)
         raise MissingDocumentTypeException(msg)
 
+    return document_type_and_model
+
 
 def get_blob_storage_connection_string() -> str:
     """
-    get_blob_storage_connection_string normalizes connection string
+    get_blob_storage_connection_string returns the connection string without its quotes
 
     Raises:
         MissingConfigException: Raised if azure-storage-account-connection-str is missing in config file
-        MissingConfigException: Raised if azure-storage-account-connection-str is empty in config file
 
     Returns:
         str : normalized connection string
     """
+    connection_string = get_settings().azure_storage_account_connection_str
 
-    if not config_reader.config_data.has_option("Main", "azure-storage-account-connection-str"):
+    if connection_string is None:
         raise MissingConfigException("Main.azure-storage-account-connection-str is missing in config.")
 
-    connection_string = config_reader.config_data.get("Main", "azure-storage-account-connection-str")
+    return connection_string
 
-    if not string_is_not_empty(connection_string):
-        raise MissingConfigException("Main.azure-storage-account-connection-str is present but has empty value.")
 
-    if connection_string.startswith(("'", '"')) and connection_string.endswith(("'", '"')):
-        connection_string = connection_string.strip("'\"")
+def get_mongodb_connection_string() -> str:
+    """
+    get_mongodb_connection_string returns the mongodb connection string without its quotes
 
-    return connection_string
+    Raises:
+        MissingConfigException: Raised if mongodb_connection_string is missing in config file
 
+    Returns:
+        str : normalized connection string
+    """
+    mongodb_connection_string = get_settings().mongodb_connection_string
 
-def configure_database():
-    if not config_reader.config_data.has_option("Main", "mongodb_connection_string"):
+    if mongodb_connection_string is None:
         raise MissingConfigException("Main.mongodb_connection_string is missing in config.")
 
-    mongodb_connection_string = config_reader.config_data.get("Main", "mongodb_connection_string")
+    return mongodb_connection_string
 
-    if not string_is_not_empty(mongodb_connection_string):
-        raise MissingConfigException("Main.mongodb_connection_string is present but has empty value.")
-
-    if mongodb_connection_string.startswith(("'", '"')) and mongodb_connection_string.endswith(("'", '"')):
-        mongodb_connection_string = mongodb_connection_string.strip("'\"")
 
+def configure_database():
     me.connect(
-        host=mongodb_connection_string,
+        host=get_mongodb_connection_string(),
         alias=constants.MONGODB_CONN_ALIAS,
     )
 
 
+def get_form_recognizer_endpoint_and_key() -> tuple[str, str]:
+    """
+    get_form_recognizer_endpoint_and_key returns the form recognizer endpoint and key, both are required when the
+    config is read.
+
+    Returns:
+        tuple(str): the form recognizer endpoint and key.
+    """
+    settings = get_settings()
+
+    return settings.form_recognizer_endpoint, settings.form_recognizer_key
+
+
 def get_azure_storage_blob_service_client():
     """
-    blob_service_client calls BobServiceClient
+    blob_service_client returns the process wide BobServiceClient
 
     Returns:
         BobServiceClient
     """
-    return BlobServiceClient.from_connection_string(get_blob_storage_connection_string())
+    return azure_clients.get_blob_service_client(get_blob_storage_connection_string())
+
+
+def get_document_analysis_client(form_recognizer_endpoint: str = None):
+    """
+    get_document_analysis_client returns the shared DocumentAnalysisClient.
+
+    Args:
+        form_recognizer_endpoint (str, optional): custom endpoint, Main.form-recognizer-endpoint if not provided.
+
+    Returns:
+        DocumentAnalysisClient
+    """
+    endpoint, key = get_form_recognizer_endpoint_and_key()
+    return azure_clients.get_document_analysis_client(form_recognizer_endpoint or endpoint, key)
+
+
+def get_analysis_rate_limiter(form_recognizer_model_id: str, form_recognizer_endpoint: str = None):
+    """
+    get_analysis_rate_limiter returns the shared rate limiter of the form recognizer model on the endpoint.
+
+    The model gets Main.form-recognizer-tps transactions per second, or its entry in Main.form-recognizer-model-tps,
+    a comma separated list of <model id>:<transactions per second>. Main.form-recognizer-max-concurrency caps its
+    analyses in flight.
+
+    Args:
+        form_recognizer_model_id (str): the form recognizer model of the analyses.
+        form_recognizer_endpoint (str, optional): custom endpoint, Main.form-recognizer-endpoint if not provided.
+
+    Returns:
+        AnalysisRateLimiter
+    """
+    settings = get_settings()
+    transactions_per_second = settings.form_recognizer_model_tps.get(
+        form_recognizer_model_id,
+        get_positive_int_config("form-recognizer-tps", constants.DEFAULT_FORM_RECOGNIZER_TPS),
+    )
+
+    return analysis_rate_limiter.get_rate_limiter(
+        form_recognizer_endpoint or settings.form_recognizer_endpoint,
+        form_recognizer_model_id,
+        transactions_per_second,
+        get_positive_int_config("form-recognizer-max-concurrency", constants.DEFAULT_FORM_RECOGNIZER_MAX_CONCURRENCY),
+    )
 
 
 def get_azure_container_client(container_name: str):
@@ -149,14 +306,10 @@ def get_azure_container_client(container_name: str):
     Returns:
         ContainerClient: container client
     """
-    container_client = get_azure_storage_blob_service_client().get_container_client(container_name)
-    if not container_client.exists():
-        raise ContainerMissingException(f"Container '{container_name}' does not exist.")
-    else:
-        return container_client
+    return azure_clients.get_container_client(container_name, get_blob_storage_connection_string())
 
 
-def move_blob(source_blob_path: str, source_folder: str, destination_folder: str):
+def move_blob(source_blob_path: str, source_folder: str, destination_folder: str, content_length: int = None):
     """
     Moves blob from source folder to destination folder.
 
@@ -164,71 +317,122 @@ def move_blob(source_blob_path: str, source_folder: str, destination_folder: str
         source_blob_path (str): path of blob in source folder
         source_folder (str): source folder name
         destination_folder (str): destination folder name.
+        content_length (int, optional): size of the blob in bytes, small blobs are copied synchronously.
     """
 
     destination_blob_path = source_blob_path.replace(source_folder, destination_folder)
 
-    source_blob_client = get_azure_container_client(constants.DEFAULT_BLOB_CONTAINER).get_blob_client(
-        blob=source_blob_path
-    )
-    destination_blob_client = get_azure_container_client(constants.DEFAULT_BLOB_CONTAINER).get_blob_client(
-        blob=destination_blob_path
-    )
+    # checks the container exists before moving the blob.
+    get_azure_container_client(constants.DEFAULT_BLOB_CONTAINER)
 
-    destination_blob_client.start_copy_from_url(source_blob_client.url)
-    source_blob_client.delete_blob()
+    blob_mover.move_blob(
+        get_azure_storage_blob_service_client(), source_blob_path, destination_blob_path, content_length
+    )
 
 
-def get_sas_url(blob_path: str, blob_service_client: BlobServiceClient):
+def get_sas_url(blob_path: str, blob_service_client: BlobServiceClient = None):
     """
     get_sas_url takes a blob_path and generates sas_url for that blob.
 
     Args:
         blob_path (str): path of blob.
+        blob_service_client (BlobServiceClient, optional): defaults to the shared blob service client.
 
     Returns:
         returs sas_url of the blob.
     """
-    account_name = blob_service_client.get_container_client(constants.DEFAULT_BLOB_CONTAINER).account_name
-    sas_token = generate_blob_sas(
-        account_name,
-        constants.DEFAULT_BLOB_CONTAINER,
-        blob_path,
-        account_key=blob_service_client.credential.account_key,
-        permission=BlobSasPermissions(read=True),
-        expiry=datetime.utcnow() + timedelta(hours=1),
-    )
+    if blob_service_client is None:
+        blob_service_client = get_azure_storage_blob_service_client()
+
+    return sas_signer.get_blob_sas_signer(blob_service_client).get_sas_url(blob_path)
 
-    # Constructing the full SAS URL for the blob
-    sas_url = f"https://{account_name}.blob.core.windows.net/{constants.DEFAULT_BLOB_CONTAINER}/{blob_path}?{sas_token}"
 
-    return sas_url
+def get_sas_urls(blob_paths: list[str], blob_service_client: BlobServiceClient = None) -> dict[str, str]:
+    """
+    get_sas_urls signs the sas_urls of a batch of blobs with one signing credential.
 
+    Args:
+        blob_paths (list[str]): paths of the blobs.
+        blob_service_client (BlobServiceClient, optional): defaults to the shared blob service client.
 
-def get_metadata(status: str, path: str) -> Metadata:
+    Returns:
+        dict[str, str]: sas_url per blob path.
+    """
+    if blob_service_client is None:
+        blob_service_client = get_azure_storage_blob_service_client()
+
+    return sas_signer.get_blob_sas_signer(blob_service_client).get_sas_urls(blob_paths)
+
+
+def get_metadata(status: str, path: str, blob_properties: BlobProperties = None) -> Metadata:
     """
     get_meta takes file status and its path and collects metadata properties of that blob.
 
+    Properties already known, e.g. from a list_blobs listing, are used as is, otherwise they are fetched with
+    one get_blob_properties call.
+
     Args:
         status (str): Blob status
         path (str): Path of blob
+        blob_properties (BlobProperties, optional): snapshot of the blob properties.
     Returns:
       str:  returns object of class Metadata
     """
-    blob_client = get_azure_container_client(constants.DEFAULT_BLOB_CONTAINER).get_blob_client(path)
-    properties = blob_client.get_blob_properties()
+    container_client = get_azure_container_client(constants.DEFAULT_BLOB_CONTAINER)
+    blob_client = container_client.get_blob_client(path)
+    if blob_properties is None:
+        blob_properties = blob_client.get_blob_properties()
+
+    return get_metadata_from_properties(status, blob_properties, blob_client.url, container_client.container_name)
 
+
+def get_metadata_from_properties(status: str, blob_properties: BlobProperties, url: str, container: str) -> Metadata:
+    """
+    get_metadata_from_properties converts a snapshot of blob properties to Metadata, without any azure call.
+    """
     metadata = Metadata()
 
+    content_md5 = blob_properties.content_settings.content_md5
     metadata.status = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}-{status}]"
-    metadata.name = properties.name
-    metadata.content_md5 = base64.b64encode(properties.content_settings.content_md5).decode("utf-8")
-    metadata.url = blob_client.url
-    metadata.blob_type = properties.blob_type
-    metadata.container = get_azure_container_client(constants.DEFAULT_BLOB_CONTAINER).container_name
-    metadata.content_length = properties.size
-    metadata.created = properties.creation_time.strftime("%Y-%m-%d %H:%M:%S")
-    metadata.last_modified = properties.last_modified.strftime("%Y-%m-%d %H:%M:%S")
-    metadata.content_type = properties.content_settings.content_type
+    metadata.name = blob_properties.name
+    metadata.content_md5 = base64.b64encode(content_md5).decode("utf-8") if content_md5 else None
+    metadata.url = url
+    metadata.blob_type = blob_properties.blob_type
+    metadata.container = container
+    metadata.content_length = blob_properties.size
+    metadata.created = blob_properties.creation_time.strftime("%Y-%m-%d %H:%M:%S")
+    metadata.last_modified = blob_properties.last_modified.strftime("%Y-%m-%d %H:%M:%S")
+    metadata.content_type = blob_properties.content_settings.content_type
 
     return metadata
+
+
+def get_moved_blob_properties(
+    blob_properties: BlobProperties, destination_blob_path: str, refresh: bool = False
+) -> BlobProperties:
+    """
+    get_moved_blob_properties returns the properties of a blob after it was moved to destination_blob_path.
+
+    A server side copy keeps the content, its md5, size and content settings, so the snapshot taken before the
+    move is carried over with the new name and the move time as creation and last modified time. The properties
+    are fetched again only if refresh is True or no snapshot is known.
+
+    Args:
+        blob_properties (BlobProperties): snapshot of the properties before the move, may be None.
+        destination_blob_path (str): path the blob was moved to.
+        refresh (bool, optional): fetch the properties of the moved blob.
+
+    Returns:
+        BlobProperties: properties of the moved blob.
+    """
+    if refresh or blob_properties is None:
+        container_client = get_azure_container_client(constants.DEFAULT_BLOB_CONTAINER)
+        return container_client.get_blob_client(destination_blob_path).get_blob_properties()
+
+    moved_at = datetime.now(timezone.utc)
+    moved_blob_properties = copy.copy(blob_properties)
+    moved_blob_properties.name = destination_blob_path
+    moved_blob_properties.creation_time = moved_at
+    moved_blob_properties.last_modified = moved_at
+
+    return moved_blob_properties
@@ -0,0 +1,17 @@
+import threading
+import logging
+from services.config_reload_service import reload_config
+
+SCHEDULE_INTERVAL_IN_SECONDS = 10
+JOB_NAME = "JOB-CONFIG-RELOAD"
+
+
+# function name needs to be job_task for automated picking.
+def job_task():
+    logging.debug("Start - %s, %s", threading.current_thread().name, JOB_NAME)
+
+    settings = reload_config()
+
+    logging.debug("Finish - %s, %s", threading.current_thread().name, JOB_NAME)
+
+    return settings
@@ -1,17 +1,90 @@
 import threading
 import logging
 from datetime import datetime
+from apscheduler.events import JobExecutionEvent
+from common import constants, utils
+from common.custom_exceptions import NoInputBlobsForProcessingException
+from jobs.job_scheduler_triggers import AdaptiveIntervalTrigger, JobRunOutcome
+from services.input_blob_change_stream import InputBlobChangeStreamWatcher
 from services.main_service import start_flow
 
 SCHEDULE_INTERVAL_IN_SECONDS = 4
 JOB_NAME = "JOB-DOCUMENT-PROCESSING"
 
 
+def get_job_trigger() -> AdaptiveIntervalTrigger:
+    """
+    get_job_trigger polls again right away while runs hit Main.queue-batch-size, every SCHEDULE_INTERVAL_IN_SECONDS
+    while there is some work, and backs off up to Main.job-max-idle-poll-interval-seconds while the queue is empty.
+    While the change stream watcher runs, the backoff goes up to Main.job-safety-poll-interval-seconds instead.
+    """
+    return AdaptiveIntervalTrigger(
+        classify_job_run,
+        min_interval_seconds=SCHEDULE_INTERVAL_IN_SECONDS,
+        max_interval_seconds=utils.get_positive_int_config(
+            "job-max-idle-poll-interval-seconds", constants.DEFAULT_JOB_MAX_IDLE_POLL_INTERVAL_IN_SECONDS
+        ),
+        event_driven_max_interval_seconds=utils.get_positive_int_config(
+            "job-safety-poll-interval-seconds", constants.DEFAULT_JOB_SAFETY_POLL_INTERVAL_IN_SECONDS
+        ),
+    )
+
+
+def start_job_watcher(job) -> InputBlobChangeStreamWatcher:
+    """
+    start_job_watcher runs the job as soon as an input blob is validated, if Main.job-trigger-mode is
+    change-stream. The job falls back to the polling of its adaptive trigger while the change stream is
+    unavailable.
+
+    Returns:
+        InputBlobChangeStreamWatcher: the started watcher, None in poll mode.
+    """
+    if utils.get_job_trigger_mode() != constants.JOB_TRIGGER_MODE_CHANGE_STREAM:
+        return None
+
+    def on_watching_changed(watching: bool):
+        job.trigger.set_event_driven(watching)
+        if not watching:
+            # input blobs validated while the stream was down are picked up by polling right away.
+            job.trigger.wake(job)
+
+    watcher = InputBlobChangeStreamWatcher(lambda: job.trigger.wake(job), on_watching_changed)
+    watcher.start()
+
+    return watcher
+
+
+def classify_job_run(event: JobExecutionEvent) -> JobRunOutcome:
+    """
+    classify_job_run maps a completed job_task run to its outcome.
+    """
+    if event.exception is not None:
+        cause = event.exception
+        while cause is not None:
+            if isinstance(cause, NoInputBlobsForProcessingException):
+                return JobRunOutcome.EMPTY
+            cause = cause.__cause__
+        return JobRunOutcome.FAILED
+
+    # input blobs scheduled for a retry or that failed are claimed but not returned as processed.
+    claimed_count = getattr(event.retval, "claimed_count", len(event.retval or []))
+
+    # runs outside of the processing hours do not claim anything.
+    if claimed_count == 0:
+        return JobRunOutcome.EMPTY
+
+    if claimed_count >= utils.get_positive_int_config("queue-batch-size", constants.DEFAULT_QUEUE_BATCH_SIZE):
+        return JobRunOutcome.BATCH_FULL
+
+    return JobRunOutcome.PARTIAL
+
+
 # function name needs to be job_task for automated picking.
-def job_task():
+def job_task() -> list:
     start_time = datetime.strptime("08:00:00", "%H:%M:%S")
     end_time = datetime.strptime("23:59:00", "%H:%M:%S")
     now = datetime.now().time()
+    processed_files_list = []
 
     logging.info(
         "Start - %s, %s - Current date and time : %s",
@@ -22,7 +95,7 @@ def job_task():
 
     if start_time.time() <= now <= end_time.time():
         logging.info("Running scheduled job...")
-        start_flow()
+        processed_files_list = start_flow()
         logging.info("Job is finished")
     else:
         print(f"Scheduled job only runs between {start_time.time()} and {end_time.time()}")
@@ -33,3 +106,5 @@ def job_task():
         JOB_NAME,
         now.strftime("%Y-%m-%d %H:%M:%S"),
     )
+
+    return processed_files_list
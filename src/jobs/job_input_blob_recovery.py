@@ -0,0 +1,29 @@
+import threading
+import logging
+from datetime import datetime
+from services.input_blob_recovery_service import recover_stale_in_progress_input_blobs
+
+SCHEDULE_INTERVAL_IN_SECONDS = 300
+JOB_NAME = "JOB-INPUT-BLOB-RECOVERY"
+
+
+# function name needs to be job_task for automated picking.
+def job_task() -> list:
+    now = datetime.now()
+    logging.info(
+        "Start - %s, %s - Current date and time : %s",
+        threading.current_thread().name,
+        JOB_NAME,
+        now.strftime("%Y-%m-%d %H:%M:%S"),
+    )
+
+    recovered_input_blobs = recover_stale_in_progress_input_blobs()
+
+    logging.info(
+        "Finish - %s, %s - Current date and time : %s",
+        threading.current_thread().name,
+        JOB_NAME,
+        now.strftime("%Y-%m-%d %H:%M:%S"),
+    )
+
+    return recovered_input_blobs
@@ -2,25 +2,53 @@ from importlib import import_module
 import os, logging
 from pathlib import Path
 
-from common import config_reader
+from common import utils
 from jobs import app_jobs_scheduler
+from jobs.job_scheduler_triggers import AdaptiveIntervalTrigger
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.background import BackgroundScheduler
 
 
+def adaptive_trigger_listener(event):
+    """
+    adaptive_trigger_listener reports submitted and completed runs to the adaptive trigger of their job, if it
+    has one.
+    """
+    job = app_jobs_scheduler.get_job(event.job_id)
+    if job is not None and isinstance(job.trigger, AdaptiveIntervalTrigger):
+        try:
+            if event.code == EVENT_JOB_SUBMITTED:
+                job.trigger.on_job_submitted(job, event)
+            else:
+                job.trigger.on_job_completed(job, event)
+        except Exception:
+            logging.exception("Could not reschedule job %s.", job.name)
+
+
 def collect_and_schedule_jobs() -> BackgroundScheduler:
-    app_base_dir = config_reader.config_data.get("Main", "app_base_dir")
+    app_base_dir = utils.get_settings().app_base_dir
     scheduled_jobs_folder = Path(app_base_dir + "/src/jobs").absolute()
 
     for job_file in os.scandir(scheduled_jobs_folder):
         if (
             not job_file.is_dir()
             and not job_file.name.startswith("__")
-            and not job_file.name.startswith("job_scheduler_factory")
+            and not job_file.name.startswith("job_scheduler_")
         ):
             module_name = job_file.name.replace(".py", "")
             module_path = f"jobs.{module_name}"
             module = import_module(f"{module_path}")
-            if hasattr(module, "job_task"):
+            if hasattr(module, "job_task") and hasattr(module, "get_job_trigger"):
+                # add the job to scheduler, the job decides itself when it runs next.
+                job = app_jobs_scheduler.add_job(
+                    module.job_task,
+                    trigger=module.get_job_trigger(),
+                    name=module.JOB_NAME,
+                    misfire_grace_time=600,
+                )
+                if hasattr(module, "start_job_watcher"):
+                    module.start_job_watcher(job)
+            elif hasattr(module, "job_task"):
                 # add the job to scheduler
                 app_jobs_scheduler.add_job(
                     module.job_task,
@@ -45,6 +73,10 @@ def collect_and_schedule_jobs() -> BackgroundScheduler:
             job.trigger,
         )
 
+    app_jobs_scheduler.add_listener(
+        adaptive_trigger_listener, EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR
+    )
+
     # start scheduler
     app_jobs_scheduler.start()
 
@@ -0,0 +1,230 @@
+"""
+Scheduler triggers for jobs whose polling rate follows the amount of pending work.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Callable
+
+from apscheduler.events import JobExecutionEvent, JobSubmissionEvent
+from apscheduler.triggers.base import BaseTrigger
+
+
+class JobRunOutcome(Enum):
+    BATCH_FULL = "BatchFull"
+    PARTIAL = "Partial"
+    EMPTY = "Empty"
+    FAILED = "Failed"
+
+
+class AdaptiveIntervalTrigger(BaseTrigger):
+    """
+    AdaptiveIntervalTrigger schedules the next run of a job once the current run completed, based on its outcome.
+
+    A run that hit its batch limit is followed right away, a run with some work after min_interval_seconds,
+    and runs that found nothing or failed back off exponentially up to max_interval_seconds. Runs therefore never
+    overlap or misfire, and an idle queue is polled at max_interval_seconds.
+
+    The scheduler only asks a trigger for the next fire time when a run starts, so the submission and the
+    completion of each run are reported by on_job_submitted and on_job_completed, registered by the job scheduler
+    factory as listener of the job events.
+
+    Event sources can ask for a run with request_run. While an event source is healthy (set_event_driven),
+    idle runs back off up to event_driven_max_interval_seconds instead, polling only as a safety net.
+    """
+
+    def __init__(
+        self,
+        classify_run: Callable[[JobExecutionEvent], JobRunOutcome],
+        min_interval_seconds: float,
+        max_interval_seconds: float,
+        backoff_factor: float = 2,
+        event_driven_max_interval_seconds: float = None,
+    ):
+        self.classify_run = classify_run
+        self.min_interval_seconds = min_interval_seconds
+        self.max_interval_seconds = max_interval_seconds
+        self.backoff_factor = backoff_factor
+        self.event_driven_max_interval_seconds = event_driven_max_interval_seconds or max_interval_seconds
+
+        self._lock = threading.Lock()
+        self._event_driven = False
+        # submitted runs minus completed runs, the completion of a short run may be reported before its submission.
+        self._runs_in_flight = 0
+        self._run_requested = False
+        self._next_delay_seconds = min_interval_seconds
+        self._run_started_at: datetime = None
+        self._statistics = {
+            "run_count": 0,
+            "outcome_counts": {outcome.value: 0 for outcome in JobRunOutcome},
+            "last_run_duration_seconds": None,
+            "max_run_duration_seconds": 0.0,
+            "total_run_duration_seconds": 0.0,
+            "last_lag_seconds": None,
+            "max_lag_seconds": 0.0,
+            "next_delay_seconds": min_interval_seconds,
+            "requested_run_count": 0,
+        }
+
+    def get_next_fire_time(self, previous_fire_time: datetime, now: datetime) -> datetime:
+        if previous_fire_time is None:
+            return now
+
+        # a run was submitted, it is rescheduled once it completes. The fallback only fires if no completion arrives.
+        with self._lock:
+            fallback_interval_seconds = self._get_max_interval_seconds()
+
+        return now + timedelta(seconds=fallback_interval_seconds)
+
+    def record_run_started(self, scheduled_at: datetime, started_at: datetime):
+        """
+        record_run_started marks a run as in progress and records its lag.
+
+        Args:
+            scheduled_at (datetime): time the run was scheduled for.
+            started_at (datetime): time the run was submitted to the executor.
+        """
+        with self._lock:
+            self._runs_in_flight += 1
+            if self._runs_in_flight <= 0:
+                # the run already completed and was rescheduled, requests made since scheduled their own run.
+                return
+
+            self._run_requested = False
+            self._run_started_at = started_at
+            lag_seconds = max((started_at - scheduled_at).total_seconds(), 0.0)
+            self._statistics["last_lag_seconds"] = lag_seconds
+            self._statistics["max_lag_seconds"] = max(self._statistics["max_lag_seconds"], lag_seconds)
+
+    def record_run(self, outcome: JobRunOutcome, finished_at: datetime) -> float:
+        """
+        record_run updates the run statistics and computes the delay before the next run.
+
+        Args:
+            outcome (JobRunOutcome): outcome of the completed run.
+            finished_at (datetime): completion time of the run.
+
+        Returns:
+            float: seconds to wait before the next run.
+        """
+        with self._lock:
+            self._runs_in_flight -= 1
+
+            if outcome == JobRunOutcome.BATCH_FULL or self._run_requested:
+                # a run requested while the last one was running may have work the last run did not see.
+                self._next_delay_seconds = 0
+            elif outcome == JobRunOutcome.PARTIAL:
+                self._next_delay_seconds = self.min_interval_seconds
+            else:
+                self._next_delay_seconds = min(
+                    max(self._next_delay_seconds * self.backoff_factor, self.min_interval_seconds),
+                    self._get_max_interval_seconds(),
+                )
+
+            statistics = self._statistics
+            statistics["run_count"] += 1
+            statistics["outcome_counts"][outcome.value] += 1
+            statistics["next_delay_seconds"] = self._next_delay_seconds
+
+            if self._run_started_at is not None:
+                run_duration_seconds = max((finished_at - self._run_started_at).total_seconds(), 0.0)
+                self._run_started_at = None
+                statistics["last_run_duration_seconds"] = run_duration_seconds
+                statistics["max_run_duration_seconds"] = max(
+                    statistics["max_run_duration_seconds"], run_duration_seconds
+                )
+                statistics["total_run_duration_seconds"] += run_duration_seconds
+
+            return self._next_delay_seconds
+
+    def request_run(self) -> bool:
+        """
+        request_run asks for a run as soon as possible, a request made while a run is in progress is served by
+        scheduling the next run right after it.
+
+        Returns:
+            bool: True if no run is in progress and the job needs to be scheduled now by the caller.
+        """
+        with self._lock:
+            self._statistics["requested_run_count"] += 1
+            if self._runs_in_flight > 0:
+                self._run_requested = True
+                return False
+
+            self._next_delay_seconds = self.min_interval_seconds
+            return True
+
+    def set_event_driven(self, event_driven: bool):
+        """
+        set_event_driven switches the idle backoff limit between max_interval_seconds and
+        event_driven_max_interval_seconds.
+        """
+        with self._lock:
+            if self._event_driven != event_driven:
+                logging.info("Job trigger %s is %s event driven.", self, "now" if event_driven else "no longer")
+            self._event_driven = event_driven
+            if not event_driven:
+                self._next_delay_seconds = min(self._next_delay_seconds, self.max_interval_seconds)
+
+    def wake(self, job):
+        """
+        wake requests a run of the job and schedules it right away if no run is in progress.
+        """
+        if self.request_run():
+            job.modify(next_run_time=datetime.now(timezone.utc))
+
+    def get_statistics(self) -> dict:
+        """
+        get_statistics returns a snapshot of the run duration, lag and outcome statistics of the job.
+        """
+        with self._lock:
+            statistics = dict(self._statistics, outcome_counts=dict(self._statistics["outcome_counts"]))
+
+        if statistics["run_count"]:
+            statistics["average_run_duration_seconds"] = (
+                statistics["total_run_duration_seconds"] / statistics["run_count"]
+            )
+        else:
+            statistics["average_run_duration_seconds"] = None
+
+        return statistics
+
+    def on_job_submitted(self, job, event: JobSubmissionEvent):
+        """
+        on_job_submitted records the start of a run submitted to the executor.
+        """
+        self.record_run_started(event.scheduled_run_times[-1], datetime.now(timezone.utc))
+
+    def on_job_completed(self, job, event: JobExecutionEvent):
+        """
+        on_job_completed records the outcome of a completed run and reschedules the job accordingly.
+        """
+        outcome = self.classify_run(event)
+        finished_at = datetime.now(timezone.utc)
+        next_delay_seconds = self.record_run(outcome, finished_at)
+
+        job.modify(next_run_time=finished_at + timedelta(seconds=next_delay_seconds))
+
+        statistics = self.get_statistics()
+        logging.info(
+            "Job %s run %s finished as %s in %.3f seconds (lag %.3f seconds), next run in %.2f seconds.",
+            job.name,
+            statistics["run_count"],
+            outcome.value,
+            statistics["last_run_duration_seconds"] or 0.0,
+            statistics["last_lag_seconds"] or 0.0,
+            next_delay_seconds,
+        )
+
+    def _get_max_interval_seconds(self) -> float:
+        return self.event_driven_max_interval_seconds if self._event_driven else self.max_interval_seconds
+
+    def __str__(self):
+        return f"adaptive[{self.min_interval_seconds}s..{self.max_interval_seconds}s]"
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} (min_interval_seconds={self.min_interval_seconds}, "
+            f"max_interval_seconds={self.max_interval_seconds}, backoff_factor={self.backoff_factor})>"
+        )
@@ -0,0 +1,90 @@
+import datetime
+import mongoengine as me
+from common import constants
+from bson import ObjectId
+from models.base_model import BaseModel
+from models.company_model import CompanyModel
+from models.input_blob_model import ResultJsonMetaData
+
+
+class AnalysisResultCacheModel(BaseModel):
+    """
+    AnalysisResultCacheModel points to the result json of an analyzed document, keyed by the company that uploaded
+    it, the content hash of the document and the form recognizer model it was analyzed with. Results are never
+    shared across companies, a result json holds the file name and the storage path of the company.
+    """
+
+    uploader_company = me.ReferenceField(CompanyModel, required=True)
+    content_md5 = me.StringField(required=True)
+    form_recognizer_model_id = me.StringField(required=True)
+    json_output = me.EmbeddedDocumentField(ResultJsonMetaData, required=True)
+    # the input blob the result was produced for.
+    source_blob_path = me.StringField()
+
+    meta = {
+        "collection": "analysis_result_cache",
+        "db_alias": constants.MONGODB_CONN_ALIAS,
+        "indexes": [
+            {
+                "name": "company_content_md5_model_id",
+                "fields": ["uploader_company", "content_md5", "form_recognizer_model_id"],
+                "unique": True,
+            },
+        ],
+    }
+
+    def __str__(self):
+        return (
+            "AnalysisResultCacheModel("
+            + f"_id='{str(self.pk)}'"
+            + f", uploader_company='{self.uploader_company.pk if self.uploader_company else None}'"
+            + f", content_md5='{self.content_md5}'"
+            + f", form_recognizer_model_id='{self.form_recognizer_model_id}'"
+            + f", json_output='{self.json_output.json_result_blob_path if self.json_output else None}'"
+            + f", source_blob_path='{self.source_blob_path}'"
+            + ")"
+        )
+
+
+def find_cached_json_output(
+    uploader_company: ObjectId, content_md5: str, form_recognizer_model_id: str
+) -> ResultJsonMetaData:
+    """
+    find_cached_json_output looks up the result json of a document the company already had analyzed with the model.
+
+    Returns:
+        ResultJsonMetaData: location of the cached result json, None on a cache miss.
+    """
+    cached_result = (
+        AnalysisResultCacheModel.objects(
+            uploader_company=uploader_company,
+            content_md5=content_md5,
+            form_recognizer_model_id=form_recognizer_model_id,
+        )
+        .only("json_output")
+        .first()
+    )
+
+    return cached_result.json_output if cached_result else None
+
+
+def store_json_output(
+    uploader_company: ObjectId,
+    content_md5: str,
+    form_recognizer_model_id: str,
+    json_output: ResultJsonMetaData,
+    source_blob_path: str,
+):
+    """
+    store_json_output caches the result json location, the first stored result of a document of a company is kept.
+    """
+    now = datetime.datetime.now()
+    AnalysisResultCacheModel.objects(
+        uploader_company=uploader_company, content_md5=content_md5, form_recognizer_model_id=form_recognizer_model_id
+    ).update_one(
+        upsert=True,
+        set_on_insert__json_output=json_output,
+        set_on_insert__source_blob_path=source_blob_path,
+        set_on_insert__date_created=now,
+        set__date_last_modified=now,
+    )
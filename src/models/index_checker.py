@@ -0,0 +1,98 @@
+"""
+Checks the planned indexes of the hot input blob queries against the mongodb query planner.
+
+Every planned query is run through explain() and its winning plan is expected to use the named index,
+a collection scan or a different index is reported as a finding.
+"""
+import datetime
+import logging
+
+from bson import ObjectId
+
+from models.input_blob_model import (
+    InputBlob,
+    get_claimable_input_blobs_filter,
+    get_stale_in_progress_input_blobs_filter,
+)
+
+
+class PlannedQuery(object):
+    """
+    PlannedQuery, a hot query and the index it is expected to be served by.
+    """
+
+    def __init__(self, name: str, raw_query: dict, order_by: list[str], expected_index_name: str):
+        self.name = name
+        self.raw_query = raw_query
+        self.order_by = order_by
+        self.expected_index_name = expected_index_name
+
+    def __repr__(self):
+        return f"PlannedQuery(name='{self.name}', expected_index_name='{self.expected_index_name}')"
+
+
+def get_planned_queries() -> list[PlannedQuery]:
+    now = datetime.datetime.now()
+    return [
+        PlannedQuery(
+            "pending-queue", get_claimable_input_blobs_filter(now), ["date_created"], "pending_processing_queue"
+        ),
+        PlannedQuery(
+            "stale-in-progress",
+            get_stale_in_progress_input_blobs_filter(now),
+            ["date_last_modified"],
+            "in_progress_lifecycle",
+        ),
+        PlannedQuery(
+            "pending-queue-by-company",
+            get_claimable_input_blobs_filter(now, ObjectId()),
+            ["date_created"],
+            "pending_processing_queue_by_company",
+        ),
+        PlannedQuery("failed-blobs", {"is_processed_failed": True}, ["-date_last_modified"], "processed_failed"),
+        PlannedQuery(
+            "company-history", {"uploader_company": ObjectId()}, ["-date_created"], "uploader_company_history"
+        ),
+    ]
+
+
+def get_winning_plan_stages(plan: dict) -> list[tuple[str, str]]:
+    """
+    get_winning_plan_stages flattens a query plan into (stage, index name) tuples, outermost stage first.
+    """
+    stages = [(plan.get("stage"), plan.get("indexName"))]
+
+    if "inputStage" in plan:
+        stages.extend(get_winning_plan_stages(plan["inputStage"]))
+
+    for input_stage in plan.get("inputStages", []):
+        stages.extend(get_winning_plan_stages(input_stage))
+
+    return stages
+
+
+def check_planned_indexes() -> list[str]:
+    """
+    check_planned_indexes makes sure the InputBlob indexes exist and explains every planned query.
+
+    Returns:
+        list[str]: findings, empty if every planned query is served by its expected index.
+    """
+    InputBlob.ensure_indexes()
+    findings = []
+
+    for planned_query in get_planned_queries():
+        explain_result = InputBlob.objects(__raw__=planned_query.raw_query).order_by(*planned_query.order_by).explain()
+        stages = get_winning_plan_stages(explain_result["queryPlanner"]["winningPlan"])
+        index_names = [index_name for _, index_name in stages if index_name]
+
+        logging.info("Query '%s' winning plan: %s", planned_query.name, stages)
+
+        if any(stage == "COLLSCAN" for stage, _ in stages):
+            findings.append(f"Query '{planned_query.name}' does a collection scan.")
+        elif planned_query.expected_index_name not in index_names:
+            findings.append(
+                f"Query '{planned_query.name}' uses {index_names} instead of '{planned_query.expected_index_name}'."
+            )
+
+    return findings
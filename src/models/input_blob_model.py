@@ -1,3 +1,7 @@
+import datetime
+import os
+import socket
+from bson import ObjectId
 from common import constants
 from models.base_model import BaseModel
 import mongoengine as me
@@ -9,6 +13,15 @@ from models.user_model import UserModel
 class ResultJsonMetaData(me.EmbeddedDocument):
     json_result_container_name = me.StringField()
     json_result_blob_path = me.StringField()
+    # Content-Encoding of the result blob, identity for results stored before compression was introduced.
+    json_result_codec = me.StringField(
+        default=constants.RESULT_JSON_CODEC_IDENTITY,
+        choices=(
+            constants.RESULT_JSON_CODEC_IDENTITY,
+            constants.RESULT_JSON_CODEC_GZIP,
+            constants.RESULT_JSON_CODEC_ZSTD,
+        ),
+    )
 
 
 class LifecycleStatusTypes(str, Enum):
@@ -17,6 +30,7 @@ class LifecycleStatusTypes(str, Enum):
     INITIAL_VALIDATED = "INITIAL_VALIDATED"
     PROCESSING = "PROCESSING"
     PROCESSED = "PROCESSED"
+    RETRY_SCHEDULED = "RETRY_SCHEDULED"
     SUCCESS = "SUCCESS"
     FAILED = "FAILED"
 
@@ -159,12 +173,54 @@ class InputBlob(BaseModel):
     #
     json_output = me.EmbeddedDocumentField(ResultJsonMetaData, required=False)
 
+    # lease_owner is the backend process that claimed the blob for processing, until lease_expires_at.
+    # A blob scheduled for a retry has no lease_owner and is not claimed before lease_expires_at.
+    lease_owner = me.StringField()
+    lease_expires_at = me.DateTimeField()
+
+    # processing attempts that failed with a transient error, the blob goes to Failed once it reaches
+    # Main.processing-max-attempts.
+    processing_attempts = me.IntField(required=True, default=0)
+
     meta = {
         "collection": "input_document_blobs",
         "db_alias": constants.MONGODB_CONN_ALIAS,
         "indexes": [
             "blob_name",
             "blob_container_name",
+            # processing queue, only the blobs waiting for processing are indexed, oldest first.
+            {
+                "name": "pending_processing_queue",
+                "fields": ["date_created"],
+                "partialFilterExpression": {"is_validation_successful": True, "is_processing_for_data": False},
+            },
+            # processing queue of each company, for the fair claiming across companies.
+            {
+                "name": "pending_processing_queue_by_company",
+                "fields": ["uploader_company", "date_created"],
+                "partialFilterExpression": {"is_validation_successful": True, "is_processing_for_data": False},
+            },
+            # blobs moved to Inprogress that never completed, by last lifecycle change.
+            {
+                "name": "in_progress_lifecycle",
+                "fields": ["date_last_modified"],
+                "partialFilterExpression": {
+                    "is_processing_for_data": True,
+                    "is_processed_success": False,
+                    "is_processed_failed": False,
+                },
+            },
+            # failed blobs, latest first.
+            {
+                "name": "processed_failed",
+                "fields": ["-date_last_modified"],
+                "partialFilterExpression": {"is_processed_failed": True},
+            },
+            # blobs of a company, latest first.
+            {
+                "name": "uploader_company_history",
+                "fields": ["uploader_company", "-date_created"],
+            },
         ],
     }
 
@@ -221,5 +277,156 @@ class InputBlob(BaseModel):
             + f", metadata: {self.metadata}"
             + f", lifecycle_status_list: '{', '.join([str(e) for e in self.lifecycle_status_list])}'"
             + f", json_output: {self.json_output}"
+            + f", lease_owner='{self.lease_owner}'"
+            + f", lease_expires_at='{self.lease_expires_at}'"
+            + f", processing_attempts='{self.processing_attempts}'"
             + ")"
         )
+
+
+# identifies this backend process as lease owner of the input blobs it claims.
+LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+# fields loaded for input blobs claimed for processing, the growing lifecycle_status_list is left out.
+INPUT_BLOB_PROCESSING_FIELDS = (
+    "blob_name",
+    "blob_container_name",
+    "blob_type",
+    "validation_successful_blob_path",
+    "form_recognizer_model_id",
+    "in_progress_blob_path",
+    "in_progress_blob_sas_url",
+    "success_blob_path",
+    "failed_blob_path",
+    "is_validation_successful",
+    "is_processing_for_data",
+    "is_processed_for_data",
+    "is_processed_success",
+    "is_processed_failed",
+    "uploader_user",
+    "uploader_company",
+    "metadata",
+    "json_output",
+    "lease_owner",
+    "lease_expires_at",
+    "processing_attempts",
+    "date_created",
+    "date_last_modified",
+)
+
+
+class ProcessedInputBlobs(list):
+    """
+    ProcessedInputBlobs is the list of input blobs processed by a run, with the number of input blobs the run
+    claimed. Input blobs scheduled for a retry or that could not be processed are claimed but not in the list.
+    """
+
+    def __init__(self, processed_input_blobs=(), claimed_count: int = 0):
+        super().__init__(processed_input_blobs)
+        self.claimed_count = claimed_count
+
+
+def get_uploader_company_id(input_blob: InputBlob) -> ObjectId:
+    """
+    get_uploader_company_id returns the id of the company that uploaded the input blob, without loading the company.
+    """
+    uploader_company = input_blob._data.get("uploader_company")
+
+    # a loaded company, the DBRef of a company not loaded yet, or its id.
+    return getattr(uploader_company, "pk", None) or getattr(uploader_company, "id", uploader_company)
+
+
+def get_claimable_input_blobs_filter(now: datetime.datetime, uploader_company: ObjectId = None) -> dict:
+    """
+    get_claimable_input_blobs_filter returns the raw query matching the input blobs waiting for processing
+    that are not leased, or whose lease expired, optionally only the ones of a company.
+    """
+    claimable_input_blobs_filter = {
+        "is_validation_successful": True,
+        "is_processing_for_data": False,
+        "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lte": now}}],
+    }
+    if uploader_company is not None:
+        claimable_input_blobs_filter["uploader_company"] = uploader_company
+
+    return claimable_input_blobs_filter
+
+
+def get_companies_with_claimable_input_blobs() -> list[ObjectId]:
+    """
+    get_companies_with_claimable_input_blobs returns the ids of the companies with input blobs waiting for
+    processing.
+    """
+    now = datetime.datetime.now()
+    return InputBlob._get_collection().distinct("uploader_company", get_claimable_input_blobs_filter(now))
+
+
+def get_stale_in_progress_input_blobs_filter(last_modified_before: datetime.datetime) -> dict:
+    """
+    get_stale_in_progress_input_blobs_filter returns the raw query matching the input blobs moved to Inprogress
+    that did not complete and did not change since last_modified_before.
+    """
+    return {
+        "is_processing_for_data": True,
+        "is_processed_success": False,
+        "is_processed_failed": False,
+        "date_last_modified": {"$lte": last_modified_before},
+    }
+
+
+def claim_input_blob(
+    lease_owner: str, lease_duration: datetime.timedelta, uploader_company: ObjectId = None
+) -> InputBlob:
+    """
+    claim_input_blob atomically leases the oldest claimable input blob to the lease owner.
+
+    Args:
+        lease_owner (str): identifier of the claiming process.
+        lease_duration (datetime.timedelta): how long the lease is held before other processes may reclaim it.
+        uploader_company (ObjectId, optional): only claim an input blob of this company.
+
+    Returns:
+        InputBlob: the claimed input blob with INPUT_BLOB_PROCESSING_FIELDS loaded, None if no input blob is
+        waiting for processing.
+    """
+    now = datetime.datetime.now()
+    return (
+        InputBlob.objects(__raw__=get_claimable_input_blobs_filter(now, uploader_company))
+        .only(*INPUT_BLOB_PROCESSING_FIELDS)
+        .order_by("date_created")
+        .modify(
+            new=True,
+            set__lease_owner=lease_owner,
+            set__lease_expires_at=now + lease_duration,
+            set__date_last_modified=now,
+        )
+    )
+
+
+def claim_stale_in_progress_input_blob(
+    lease_owner: str, lease_duration: datetime.timedelta, last_modified_before: datetime.datetime
+) -> InputBlob:
+    """
+    claim_stale_in_progress_input_blob atomically leases the oldest input blob stuck in Inprogress since
+    last_modified_before, whose lease expired, to the lease owner.
+
+    Returns:
+        InputBlob: the claimed input blob with INPUT_BLOB_PROCESSING_FIELDS loaded, None if no input blob is stuck.
+    """
+    now = datetime.datetime.now()
+    return (
+        InputBlob.objects(
+            __raw__={
+                **get_stale_in_progress_input_blobs_filter(last_modified_before),
+                "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lte": now}}],
+            }
+        )
+        .only(*INPUT_BLOB_PROCESSING_FIELDS)
+        .order_by("date_last_modified")
+        .modify(
+            new=True,
+            set__lease_owner=lease_owner,
+            set__lease_expires_at=now + lease_duration,
+            set__date_last_modified=now,
+        )
+    )
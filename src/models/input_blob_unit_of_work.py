@@ -0,0 +1,128 @@
+import datetime
+import logging
+import threading
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models.input_blob_model import InputBlob, LifecycleStatus, LifecycleStatusTypes
+
+
+class InputBlobUnitOfWork(object):
+    """
+    InputBlobUnitOfWork collects the lifecycle changes of a batch of input blobs and writes them with a single
+    bulk_write of targeted $set / $push updates, instead of a full document save per change.
+
+    The changes are applied to the in memory documents right away. Pending changes are flushed when
+    auto_flush_size documents have changes, and on every explicit flush. Safe to share between worker threads,
+    flushes run one at a time so the changes recorded before a flush are written once it returns.
+
+    """
+
+    def __init__(self, auto_flush_size: int = None):
+        self.auto_flush_size = auto_flush_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # document id -> {"$set": {...}, "$push": [...]}
+        self._pending_updates: dict = {}
+
+    def set(self, input_blob: InputBlob, **fields):
+        """
+        set assigns the fields on the input blob and records them for the next flush.
+        """
+        updates = {}
+        for name, value in fields.items():
+            field = InputBlob._fields[name]
+            if value is not None:
+                field.validate(value)
+            setattr(input_blob, name, value)
+            updates[field.db_field] = field.to_mongo(value) if value is not None else None
+
+        with self._lock:
+            self._pending_document_updates(input_blob)["$set"].update(updates)
+
+        input_blob._clear_changed_fields()
+        self._auto_flush()
+
+    def push_lifecycle_status(self, input_blob: InputBlob, status: LifecycleStatusTypes, message: str):
+        """
+        push_lifecycle_status appends a lifecycle status to the input blob and records it for the next flush.
+        """
+        lifecycle_status = LifecycleStatus(
+            status=status,
+            message=message,
+            updated_date_time=datetime.datetime.now(),
+        )
+        lifecycle_status.validate()
+        input_blob.lifecycle_status_list.append(lifecycle_status)
+
+        with self._lock:
+            self._pending_document_updates(input_blob)["$push"].append(lifecycle_status.to_mongo())
+
+        input_blob._clear_changed_fields()
+        self._auto_flush()
+
+    def flush(self) -> int:
+        """
+        flush writes every pending change with one unordered bulk_write.
+
+        If the bulk_write fails, the changes that were not written stay pending for the next flush.
+
+        Returns:
+            int: number of documents updated by the flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending_updates, self._pending_updates = self._pending_updates, {}
+
+            if not pending_updates:
+                return 0
+
+            now = datetime.datetime.now()
+            operations = []
+            for document_id, document_updates in pending_updates.items():
+                update = {"$set": {**document_updates["$set"], "date_last_modified": now}}
+                if document_updates["$push"]:
+                    update["$push"] = {"lifecycle_status_list": {"$each": document_updates["$push"]}}
+                operations.append(UpdateOne({"_id": document_id}, update))
+
+            try:
+                result = InputBlob._get_collection().bulk_write(operations, ordered=False)
+            except BulkWriteError as bwe:
+                # the other operations of an unordered bulk write were applied, pushing them again duplicates them.
+                document_ids = list(pending_updates)
+                failed_document_ids = {document_ids[error["index"]] for error in bwe.details["writeErrors"]}
+                self._restore_pending_updates(
+                    {
+                        document_id: document_updates
+                        for document_id, document_updates in pending_updates.items()
+                        if document_id in failed_document_ids
+                    }
+                )
+                raise
+            except Exception:
+                self._restore_pending_updates(pending_updates)
+                raise
+
+        logging.info("Flushed lifecycle changes of %s input_blobs in one bulk write.", len(operations))
+
+        return result.modified_count
+
+    def _restore_pending_updates(self, pending_updates: dict):
+        """
+        _restore_pending_updates puts back the updates of a failed flush, before the changes recorded since.
+        """
+        with self._lock:
+            for document_id, document_updates in pending_updates.items():
+                recorded_since = self._pending_updates.get(document_id, {"$set": {}, "$push": []})
+                self._pending_updates[document_id] = {
+                    "$set": {**document_updates["$set"], **recorded_since["$set"]},
+                    "$push": document_updates["$push"] + recorded_since["$push"],
+                }
+
+    def _pending_document_updates(self, input_blob: InputBlob) -> dict:
+        return self._pending_updates.setdefault(input_blob.pk, {"$set": {}, "$push": []})
+
+    def _auto_flush(self):
+        if self.auto_flush_size is not None and len(self._pending_updates) >= self.auto_flush_size:
+            self.flush()
@@ -0,0 +1,88 @@
+"""
+Deduplicates form recognizer analyses of documents that were uploaded before.
+
+Results are looked up by company, content hash and model id, first in a local LRU and then in the
+analysis_result_cache collection shared by all the backend processes. A result is only reused for documents of the
+company it was produced for, as the result json holds the file name and lives under the storage path of that company.
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+from bson import ObjectId
+
+from common import constants, utils
+from models.analysis_result_cache_model import find_cached_json_output, store_json_output
+from models.input_blob_model import ResultJsonMetaData
+
+_lock = threading.Lock()
+# (uploader_company, content_md5, form_recognizer_model_id) -> json_output son, most recently used last.
+_local_cache: OrderedDict = OrderedDict()
+
+
+def get_json_output(uploader_company: ObjectId, content_md5: str, form_recognizer_model_id: str) -> ResultJsonMetaData:
+    """
+    get_json_output returns the result json location of a document the company already had analyzed with the model.
+
+    Returns:
+        ResultJsonMetaData: a copy of the cached result json location, None on a cache miss or if
+        Main.analysis-result-cache is disabled.
+    """
+    if not utils.is_analysis_result_cache_enabled() or not content_md5:
+        return None
+
+    cache_key = (uploader_company, content_md5, form_recognizer_model_id)
+    with _lock:
+        json_output_son = _local_cache.get(cache_key)
+        if json_output_son is not None:
+            _local_cache.move_to_end(cache_key)
+
+    if json_output_son is None:
+        json_output = find_cached_json_output(uploader_company, content_md5, form_recognizer_model_id)
+        if json_output is None:
+            return None
+        json_output_son = json_output.to_mongo().to_dict()
+        remember_json_output(cache_key, json_output_son)
+
+    return ResultJsonMetaData._from_son(dict(json_output_son))
+
+
+def put_json_output(
+    uploader_company: ObjectId,
+    content_md5: str,
+    form_recognizer_model_id: str,
+    json_output: ResultJsonMetaData,
+    source_blob_path: str,
+):
+    """
+    put_json_output caches the result json location of an analyzed document, failures are only logged as the
+    cache is an optimization.
+    """
+    if not utils.is_analysis_result_cache_enabled() or not content_md5:
+        return
+
+    try:
+        store_json_output(uploader_company, content_md5, form_recognizer_model_id, json_output, source_blob_path)
+    except Exception:
+        logging.exception("Could not cache the result json of '%s'.", source_blob_path)
+        return
+
+    remember_json_output((uploader_company, content_md5, form_recognizer_model_id), json_output.to_mongo().to_dict())
+
+
+def remember_json_output(cache_key: tuple[ObjectId, str, str], json_output_son: dict):
+    local_cache_size = utils.get_positive_int_config(
+        "analysis-result-cache-local-size", constants.DEFAULT_ANALYSIS_RESULT_CACHE_LOCAL_SIZE
+    )
+
+    with _lock:
+        # the first cached result of a document wins, like in mongodb.
+        _local_cache.setdefault(cache_key, json_output_son)
+        _local_cache.move_to_end(cache_key)
+        while len(_local_cache) > local_cache_size:
+            _local_cache.popitem(last=False)
+
+
+def clear_local_cache():
+    with _lock:
+        _local_cache.clear()
@@ -0,0 +1,537 @@
+"""
+asyncio flavour of the input_blob handler, keeps many analyses and blob moves in flight from a single thread
+using the async azure sdk clients and the motor mongodb driver.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Awaitable
+
+from azure.core.credentials import AzureKeyCredential
+from azure.ai.formrecognizer.aio import DocumentAnalysisClient
+from azure.storage.blob.aio import BlobServiceClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import ASCENDING, ReturnDocument
+
+from common import azure_clients, blob_mover, constants, error_classifier, result_json_writer, sas_signer, utils
+from common.custom_exceptions import (
+    CitadelIDPBackendException,
+    NoInputBlobsForProcessingException,
+)
+from models.input_blob_model import (
+    InputBlob,
+    LifecycleStatusTypes,
+    INPUT_BLOB_PROCESSING_FIELDS,
+    LEASE_OWNER,
+    ProcessedInputBlobs,
+    ResultJsonMetaData,
+    get_claimable_input_blobs_filter,
+)
+from services import analysis_result_cache
+from services.input_blob_handler import should_retry
+
+
+def handle_input_blob_process() -> ProcessedInputBlobs:
+    """
+    Checks and processes the input_blob on an asyncio event loop.
+
+    Returns:
+        ProcessedInputBlobs: List of processed input blobs, with the number of claimed input blobs.
+    """
+    return asyncio.run(handle_input_blob_process_async())
+
+
+async def handle_input_blob_process_async() -> ProcessedInputBlobs:
+    """
+    Claims a batch of pending input_blobs and processes them concurrently, at most Main.async-analysis-concurrency at a time.
+
+    The companies take turns in the claims with weighted round-robin (Main.company-weights), and at most
+    Main.company-max-concurrency input blobs of one company are processed at a time.
+
+    Raises:
+        NoInputBlobsForProcessingException: Raised when no input_blobs are found in mongodb for processing.
+
+    Returns:
+        ProcessedInputBlobs: List of processed input blobs, with the number of claimed input blobs.
+    """
+    form_recognizer_endpoint, form_recognizer_key = utils.get_form_recognizer_endpoint_and_key()
+    analysis_concurrency = utils.get_positive_int_config(
+        "async-analysis-concurrency", constants.DEFAULT_ASYNC_ANALYSIS_CONCURRENCY
+    )
+
+    mongo_client = AsyncIOMotorClient(utils.get_mongodb_connection_string())
+    try:
+        collection = mongo_client.get_default_database()[InputBlob._get_collection_name()]
+
+        # Claiming the input_blobs from mongodb that are to be processed.
+        input_blob_documents = await claim_input_blob_documents(
+            collection,
+            utils.get_positive_int_config("queue-batch-size", constants.DEFAULT_QUEUE_BATCH_SIZE),
+            timedelta(
+                seconds=utils.get_positive_int_config("queue-lease-seconds", constants.DEFAULT_QUEUE_LEASE_SECONDS)
+            ),
+        )
+
+        if len(input_blob_documents) == 0:
+            raise NoInputBlobsForProcessingException("Zero input_blobs found in mongodb for processing")
+
+        logging.info(
+            "%s input_blobs found in mongodb, analyzing with async concurrency %s",
+            len(input_blob_documents),
+            analysis_concurrency,
+        )
+
+        semaphore = asyncio.Semaphore(analysis_concurrency)
+        max_in_flight_per_company = utils.get_positive_int_config("company-max-concurrency", None)
+        company_semaphores = {
+            uploader_company: asyncio.Semaphore(max_in_flight_per_company)
+            for uploader_company in {document.get("uploader_company") for document in input_blob_documents}
+            if max_in_flight_per_company is not None
+        }
+
+        async with BlobServiceClient.from_connection_string(
+            utils.get_blob_storage_connection_string()
+        ) as blob_service_client, DocumentAnalysisClient(
+            form_recognizer_endpoint,
+            credential=AzureKeyCredential(form_recognizer_key),
+            retry_policy=azure_clients.AsyncAnalysisRetryPolicy(),
+        ) as document_analysis_client:
+            # one failing input blob does not cancel the others, or close the clients under them.
+            processed_documents = await asyncio.gather(
+                *[
+                    process_company_input_blob(
+                        company_semaphores.get(input_blob_document.get("uploader_company")),
+                        process_input_blob(
+                            input_blob_document, collection, blob_service_client, document_analysis_client, semaphore
+                        ),
+                    )
+                    for input_blob_document in input_blob_documents
+                ],
+                return_exceptions=True,
+            )
+    finally:
+        mongo_client.close()
+
+    processed_input_blobs = ProcessedInputBlobs(claimed_count=len(input_blob_documents))
+    for input_blob_document, processed_document in zip(input_blob_documents, processed_documents):
+        if isinstance(processed_document, BaseException):
+            logging.error(
+                "Processing input_blob '%s' failed.",
+                input_blob_document.get("validation_successful_blob_path"),
+                exc_info=processed_document,
+            )
+        elif processed_document is not None:
+            processed_input_blobs.append(InputBlob._from_son(processed_document))
+
+    return processed_input_blobs
+
+
+async def claim_input_blob_documents(
+    collection: AsyncIOMotorCollection, batch_size: int, lease_duration: timedelta
+) -> list[dict]:
+    """
+    claim_input_blob_documents atomically leases up to batch_size claimable input blobs to this process, one
+    find_one_and_update per blob. The companies with claimable input blobs take turns, each turn claims up to the
+    weight of the company (Main.company-weights), oldest input blob first within a company.
+
+    Returns:
+        list[dict]: the claimed input_document_blobs documents, in the order they are processed.
+    """
+    input_blob_documents = []
+    company_weights = utils.get_company_weights()
+    uploader_companies = deque(
+        await collection.distinct("uploader_company", get_claimable_input_blobs_filter(datetime.now()))
+    )
+
+    while uploader_companies and len(input_blob_documents) < batch_size:
+        uploader_company = uploader_companies.popleft()
+        company_weight = company_weights.get(str(uploader_company), constants.DEFAULT_COMPANY_WEIGHT)
+
+        for _ in range(min(company_weight, batch_size - len(input_blob_documents))):
+            now = datetime.now()
+            input_blob_document = await collection.find_one_and_update(
+                get_claimable_input_blobs_filter(now, uploader_company),
+                {
+                    "$set": {
+                        "lease_owner": LEASE_OWNER,
+                        "lease_expires_at": now + lease_duration,
+                        "date_last_modified": now,
+                    }
+                },
+                projection=list(INPUT_BLOB_PROCESSING_FIELDS),
+                sort=[("date_created", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if input_blob_document is None:
+                break
+            input_blob_documents.append(input_blob_document)
+        else:
+            # the company may have more claimable input blobs, it takes its next turn.
+            uploader_companies.append(uploader_company)
+
+    return input_blob_documents
+
+
+async def process_company_input_blob(company_semaphore: asyncio.Semaphore, processing: Awaitable) -> dict:
+    """
+    process_company_input_blob awaits the processing of an input blob once its company is below
+    Main.company-max-concurrency, right away if there is no cap.
+    """
+    if company_semaphore is None:
+        return await processing
+
+    async with company_semaphore:
+        return await processing
+
+
+async def process_input_blob(
+    input_blob_document: dict,
+    collection: AsyncIOMotorCollection,
+    blob_service_client: BlobServiceClient,
+    document_analysis_client: DocumentAnalysisClient,
+    semaphore: asyncio.Semaphore,
+) -> dict:
+    """
+    process_input_blob moves a single input blob through Inprogress, analysis and Successful or Failed.
+
+    Args:
+        input_blob_document (dict): raw input_document_blobs document.
+        collection (AsyncIOMotorCollection): the input_document_blobs collection.
+        blob_service_client (BlobServiceClient): async blob service client.
+        document_analysis_client (DocumentAnalysisClient): async form recognizer client.
+        semaphore (asyncio.Semaphore): caps the number of input blobs in flight.
+
+    Returns:
+        dict: the updated document, None if the input blob could not be prepared for processing or is retried later.
+    """
+    async with semaphore:
+        try:
+            await prepare_input_blob(input_blob_document, collection, blob_service_client)
+        except Exception:
+            logging.exception(
+                "Could not prepare input_blob '%s' for processing.",
+                input_blob_document.get("validation_successful_blob_path"),
+            )
+            return None
+
+        analysis_error = None
+        try:
+            logging.info("Starting analysis for '%s' ....", input_blob_document["in_progress_blob_path"])
+            await analyze_blob(input_blob_document, collection, blob_service_client, document_analysis_client)
+            logging.info("Analysis completed successfully for '%s' ....", input_blob_document["in_progress_blob_path"])
+
+        except Exception as error:
+            logging.exception(
+                "An error occurred while analyzing the input_blob '%s'.", input_blob_document["in_progress_blob_path"]
+            )
+            analysis_error = error
+
+        try:
+            return await finalize_input_blob(input_blob_document, collection, blob_service_client, analysis_error)
+        except Exception:
+            # the input blob stays in the Inprogress folder until the recovery sweep picks it up.
+            logging.exception("Could not finalize input_blob '%s'.", input_blob_document["in_progress_blob_path"])
+            return None
+
+
+async def finalize_input_blob(
+    input_blob_document: dict,
+    collection: AsyncIOMotorCollection,
+    blob_service_client: BlobServiceClient,
+    processing_error: Exception = None,
+) -> dict:
+    """
+    finalize_input_blob moves an analyzed input blob to the Successful folder, or, if its analysis or the move
+    failed, schedules a retry or moves it to the Failed folder.
+
+    Returns:
+        dict: the updated document, None if the input blob is retried later.
+    """
+    if processing_error is None:
+        try:
+            await set_processing_status_and_move_completed_blobs(
+                input_blob_document, collection, blob_service_client, False
+            )
+            return input_blob_document
+        except Exception as error:
+            logging.exception(
+                "An error occurred while completing the input_blob '%s'.", input_blob_document["in_progress_blob_path"]
+            )
+            processing_error = error
+
+    if should_retry(
+        processing_error,
+        input_blob_document.get("processing_attempts"),
+        input_blob_document["in_progress_blob_path"],
+    ):
+        try:
+            await schedule_retry(input_blob_document, collection, blob_service_client)
+            return None
+        except Exception:
+            logging.exception(
+                "Could not schedule a retry of input_blob '%s'.", input_blob_document["in_progress_blob_path"]
+            )
+
+    await update_input_blob_document(
+        collection,
+        input_blob_document,
+        LifecycleStatusTypes.PROCESSED,
+        "Blob processed successfully",
+        is_processed_for_data=True,
+    )
+    await set_processing_status_and_move_completed_blobs(input_blob_document, collection, blob_service_client, True)
+
+    return input_blob_document
+
+
+async def prepare_input_blob(
+    input_blob_document: dict, collection: AsyncIOMotorCollection, blob_service_client: BlobServiceClient
+):
+    """
+    prepare_input_blob infers the document type, moves the blob to the Inprogress folder and signs its sas url.
+    """
+    validation_successful_blob_path = input_blob_document["validation_successful_blob_path"]
+    blob_type, form_recognizer_model_id = utils.get_document_type_from_file_name(validation_successful_blob_path)
+    in_progress_blob_path = validation_successful_blob_path.replace(
+        constants.VALIDATION_SUCCESSFUL_SUBFOLDER, constants.INPROGRESS_SUBFOLDER
+    )
+
+    await update_input_blob_document(
+        collection,
+        input_blob_document,
+        LifecycleStatusTypes.PROCESSING,
+        "Strating blob process",
+        blob_type=blob_type,
+        form_recognizer_model_id=form_recognizer_model_id,
+        in_progress_blob_path=in_progress_blob_path,
+    )
+
+    logging.info(
+        "Moving blob: %s from %s to %s folder in azure blob storage",
+        validation_successful_blob_path,
+        constants.VALIDATION_SUCCESSFUL_SUBFOLDER,
+        constants.INPROGRESS_SUBFOLDER,
+    )
+    await move_blob(blob_service_client, validation_successful_blob_path, in_progress_blob_path)
+
+    await update_input_blob_document(
+        collection,
+        input_blob_document,
+        is_processing_for_data=True,
+        in_progress_blob_sas_url=await get_sas_url(in_progress_blob_path, blob_service_client),
+    )
+
+
+async def get_sas_url(blob_path: str, blob_service_client: BlobServiceClient) -> str:
+    """
+    get_sas_url signs the sas_url of the blob with the async blob service client, a user delegation key is
+    awaited. The url stays valid for the lease of the claimed input blob.
+    """
+    expected_wait = timedelta(
+        seconds=utils.get_positive_int_config("queue-lease-seconds", constants.DEFAULT_QUEUE_LEASE_SECONDS)
+    )
+
+    return await sas_signer.get_async_blob_sas_signer(blob_service_client).get_sas_url(blob_path, expected_wait)
+
+
+async def analyze_blob(
+    input_blob_document: dict,
+    collection: AsyncIOMotorCollection,
+    blob_service_client: BlobServiceClient,
+    document_analysis_client: DocumentAnalysisClient,
+):
+    """
+    analyze_blob runs form recognizer on the input blob and uploads the result json to the output container.
+    An input blob keeps the result json of an earlier attempt, duplicate documents reuse the cached result json,
+    the blocking cache lookups run on a worker thread. Analyses
+    are paced by the rate limiter of the model, throttled analyses are retried.
+
+    Raises:
+        CitadelIDPBackendException: Raised if the in progress sas url of the input blob is empty.
+    """
+    if input_blob_document.get("json_output"):
+        # an earlier attempt uploaded the result json before it failed, e.g. while moving to Successful.
+        logging.info(
+            "Reusing result json '%s' of an earlier attempt of input_blob '%s'.",
+            input_blob_document["json_output"].get("json_result_blob_path"),
+            input_blob_document.get("in_progress_blob_path"),
+        )
+        return
+
+    in_progress_blob_sas_url = input_blob_document.get("in_progress_blob_sas_url")
+    if not in_progress_blob_sas_url:
+        raise CitadelIDPBackendException("input_blob.in_progress_blob_url should be non empty.")
+
+    uploader_company = input_blob_document["uploader_company"]
+    content_md5 = (input_blob_document.get("metadata") or {}).get("content_md5")
+    form_recognizer_model_id = input_blob_document["form_recognizer_model_id"]
+    cached_json_output = await asyncio.to_thread(
+        analysis_result_cache.get_json_output, uploader_company, content_md5, form_recognizer_model_id
+    )
+    if cached_json_output is not None:
+        logging.info(
+            "Reusing result json '%s' for duplicate input_blob '%s'.",
+            cached_json_output.json_result_blob_path,
+            input_blob_document["in_progress_blob_path"],
+        )
+        await update_input_blob_document(
+            collection, input_blob_document, json_output=cached_json_output.to_mongo().to_dict()
+        )
+        return
+
+    async def analyze_document():
+        poller = await document_analysis_client.begin_analyze_document_from_url(
+            form_recognizer_model_id, in_progress_blob_sas_url
+        )
+        return await poller.result()
+
+    # a 429 is not retried by the sdk, the rate limiter backs off and retries it.
+    result = await utils.get_analysis_rate_limiter(form_recognizer_model_id).run_async(analyze_document)
+
+    in_progress_blob_path = input_blob_document["in_progress_blob_path"]
+    result_json_codec = utils.get_result_json_codec()
+    result_json_path_in_azure_blob_storage = (
+        in_progress_blob_path.replace("/Inprogress/", "/")
+        + result_json_writer.RESULT_JSON_FILE_EXTENSIONS[result_json_codec]
+    )
+    blob_client = blob_service_client.get_blob_client(
+        container=constants.DEFAULT_JSON_OUTPUT_CONTAINER, blob=result_json_path_in_azure_blob_storage
+    )
+
+    # Streaming the formrecognizer output with the blob name to azure blob storage, block by block
+    await result_json_writer.upload_blocks_async(
+        blob_client,
+        result_json_writer.iter_encoded(
+            result_json_writer.iter_result_json(os.path.basename(in_progress_blob_path), result), result_json_codec
+        ),
+        content_settings=result_json_writer.get_result_json_content_settings(result_json_codec),
+    )
+
+    json_output = ResultJsonMetaData(
+        json_result_container_name=constants.DEFAULT_JSON_OUTPUT_CONTAINER,
+        json_result_blob_path=result_json_path_in_azure_blob_storage,
+        json_result_codec=result_json_codec,
+    )
+    await update_input_blob_document(collection, input_blob_document, json_output=json_output.to_mongo().to_dict())
+    await asyncio.to_thread(
+        analysis_result_cache.put_json_output,
+        uploader_company,
+        content_md5,
+        form_recognizer_model_id,
+        json_output,
+        in_progress_blob_path,
+    )
+
+
+async def set_processing_status_and_move_completed_blobs(
+    input_blob_document: dict,
+    collection: AsyncIOMotorCollection,
+    blob_service_client: BlobServiceClient,
+    is_error: bool,
+):
+    """
+    Sets the processing status and moves the completed blob to the Successful or Failed subfolder.
+    """
+    in_progress_blob_path = input_blob_document["in_progress_blob_path"]
+
+    if is_error:
+        logging.info("Moving blob '%s' to Failed folder.", in_progress_blob_path)
+        failed_blob_path = in_progress_blob_path.replace(constants.INPROGRESS_SUBFOLDER, constants.FAILED_SUBFOLDER)
+        await move_blob(blob_service_client, in_progress_blob_path, failed_blob_path)
+        await update_input_blob_document(
+            collection,
+            input_blob_document,
+            LifecycleStatusTypes.FAILED,
+            "Blob moved to Failed folder in azure blob storage",
+            failed_blob_path=failed_blob_path,
+            is_processed_success=False,
+            is_processed_failed=True,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+
+    else:
+        logging.info("Moving blob '%s' to Successful folder.", in_progress_blob_path)
+        success_blob_path = in_progress_blob_path.replace(
+            constants.INPROGRESS_SUBFOLDER, constants.SUCCESSFUL_SUBFOLDER
+        )
+        await move_blob(blob_service_client, in_progress_blob_path, success_blob_path)
+        await update_input_blob_document(
+            collection,
+            input_blob_document,
+            LifecycleStatusTypes.SUCCESS,
+            "Blob moved to Successful folder in azure blob storage",
+            success_blob_path=success_blob_path,
+            is_processed_success=True,
+            is_processed_failed=False,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+
+
+async def schedule_retry(
+    input_blob_document: dict, collection: AsyncIOMotorCollection, blob_service_client: BlobServiceClient
+):
+    """
+    schedule_retry moves the input blob back to the Validation-Successful folder and counts the failed attempt.
+    The input blob is claimable again once the backoff of error_classifier.get_retry_delay is over.
+    """
+    processing_attempts = (input_blob_document.get("processing_attempts") or 0) + 1
+    retry_delay = error_classifier.get_retry_delay(processing_attempts)
+
+    logging.info(
+        "Moving blob '%s' back to Validation-Successful folder, retrying in %s seconds.",
+        input_blob_document["in_progress_blob_path"],
+        int(retry_delay.total_seconds()),
+    )
+    await move_blob(
+        blob_service_client,
+        input_blob_document["in_progress_blob_path"],
+        input_blob_document["validation_successful_blob_path"],
+    )
+    await update_input_blob_document(
+        collection,
+        input_blob_document,
+        LifecycleStatusTypes.RETRY_SCHEDULED,
+        f"Processing attempt {processing_attempts} failed with a transient error, blob moved back to "
+        "Validation-Successful folder in azure blob storage",
+        is_processing_for_data=False,
+        in_progress_blob_sas_url=None,
+        processing_attempts=processing_attempts,
+        lease_owner=None,
+        lease_expires_at=datetime.now() + retry_delay,
+    )
+
+
+async def move_blob(blob_service_client: BlobServiceClient, source_blob_path: str, destination_blob_path: str):
+    # the source blob is only deleted once the copy is confirmed.
+    await blob_mover.move_blob_async(blob_service_client, source_blob_path, destination_blob_path)
+
+
+async def update_input_blob_document(
+    collection: AsyncIOMotorCollection,
+    input_blob_document: dict,
+    lifecycle_status: LifecycleStatusTypes = None,
+    lifecycle_message: str = None,
+    **fields,
+):
+    """
+    update_input_blob_document sets the given fields, and optionally appends a lifecycle status, in a single
+    targeted update. The in memory document is kept in sync with the stored one.
+    """
+    fields["date_last_modified"] = datetime.now()
+    update = {"$set": fields}
+    input_blob_document.update(fields)
+
+    if lifecycle_status is not None:
+        lifecycle = {
+            "status": lifecycle_status.value,
+            "message": lifecycle_message,
+            "updated_date_time": datetime.now(),
+        }
+        update["$push"] = {"lifecycle_status_list": lifecycle}
+        input_blob_document.setdefault("lifecycle_status_list", []).append(lifecycle)
+
+    await collection.update_one({"_id": input_blob_document["_id"]}, update)
@@ -2,8 +2,11 @@
 Blob handler module for reading and writing azure blob storage
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
+from azure.storage.blob import BlobProperties
 from common import constants, utils
+from common.blob_listing import BlobPrefixLister
 from common.custom_exceptions import (
     FolderMissingBusinessException,
     CitadelIDPBackendException,
@@ -14,11 +17,18 @@ from common.custom_exceptions import (
 from common.data_objects import InputBlob
 from services.blob_analysis_service import analyze_blob
 
+# remembers the continuation tokens of the Validation-Successful listings between polls.
+validation_successful_blob_lister = BlobPrefixLister()
+
 
 def check_and_process_blob_storage() -> list[InputBlob]:
     """
     Checks and processes the azure blob storage.
 
+    The input blobs are analyzed on a worker pool sized by Main.analysis-concurrency, the companies take turns
+    with weighted round-robin (Main.company-weights) and at most Main.company-max-concurrency input blobs of one
+    company are analyzed at a time.
+
     Returns:
         list[InputBlob]: List of processed input blobs.
     """
@@ -27,42 +37,86 @@ def check_and_process_blob_storage() -> list[InputBlob]:
     input_blobs_list = get_input_blobs_list()
     processed_blobs_list: list[InputBlob] = []
 
-    for input_blob in input_blobs_list:
-        try:
-            logging.info("Starting analysis for '%s' ....", input_blob.inprogress_blob_path)
-            processed_blob = analyze_blob(input_blob)
-            processed_blobs_list.append(processed_blob)
-            logging.info("Analysis completed successfully for '%s' ....", input_blob.inprogress_blob_path)
-            input_blob = set_processing_status_and_move_completed_blobs(input_blob, False)
-
-        except MissingConfigException:
-            logging.exception(
-                "A Missing Config error occurred while analyzing the document '%s'.",
-                input_blob.inprogress_blob_path,
-            )
-            input_blob = set_processing_status_and_move_completed_blobs(input_blob, True)
-            processed_blobs_list.append(input_blob)
-
-        except CitadelIDPBackendException:
-            logging.exception(
-                "A General Citadel IDP processing error occured while analyzing the document '%s'.",
-                input_blob.inprogress_blob_path,
-            )
-            input_blob = set_processing_status_and_move_completed_blobs(input_blob, True)
-            processed_blobs_list.append(input_blob)
-
-        except Exception:
-            logging.exception("An error occurred while analyzing the document '%s'.", input_blob.inprogress_blob_path)
-            input_blob = set_processing_status_and_move_completed_blobs(input_blob, True)
-            processed_blobs_list.append(input_blob)
+    company_fair_queue = utils.get_company_fair_queue()
+    for company_folder, company_input_blobs in group_input_blobs_by_company(input_blobs_list).items():
+        company_fair_queue.add_company(
+            company_folder, lambda company_input_blobs=iter(company_input_blobs): next(company_input_blobs, None)
+        )
+
+    with ThreadPoolExecutor(
+        max_workers=utils.get_analysis_concurrency(), thread_name_prefix="blob-analysis"
+    ) as analysis_executor:
+        analysis_futures = []
+        for input_blob in company_fair_queue:
+            analysis_future = analysis_executor.submit(process_input_blob, input_blob)
+            analysis_future.add_done_callback(lambda _, input_blob=input_blob: company_fair_queue.release(input_blob))
+            analysis_futures.append(analysis_future)
+
+        for analysis_future in analysis_futures:
+            processed_blobs_list.extend(analysis_future.result())
+
+    return processed_blobs_list
+
+
+def process_input_blob(input_blob: InputBlob) -> list[InputBlob]:
+    """
+    process_input_blob analyzes a single input blob and moves it to the Successful or Failed folder.
+
+    Returns:
+        list[InputBlob]: the processed input blobs to report for the input blob.
+    """
+    processed_blobs_list: list[InputBlob] = []
+
+    try:
+        logging.info("Starting analysis for '%s' ....", input_blob.inprogress_blob_path)
+        processed_blob = analyze_blob(input_blob)
+        processed_blobs_list.append(processed_blob)
+        logging.info("Analysis completed successfully for '%s' ....", input_blob.inprogress_blob_path)
+        input_blob = set_processing_status_and_move_completed_blobs(input_blob, False)
+
+    except MissingConfigException:
+        logging.exception(
+            "A Missing Config error occurred while analyzing the document '%s'.",
+            input_blob.inprogress_blob_path,
+        )
+        input_blob = set_processing_status_and_move_completed_blobs(input_blob, True)
+        processed_blobs_list.append(input_blob)
+
+    except CitadelIDPBackendException:
+        logging.exception(
+            "A General Citadel IDP processing error occured while analyzing the document '%s'.",
+            input_blob.inprogress_blob_path,
+        )
+        input_blob = set_processing_status_and_move_completed_blobs(input_blob, True)
+        processed_blobs_list.append(input_blob)
+
+    except Exception:
+        logging.exception("An error occurred while analyzing the document '%s'.", input_blob.inprogress_blob_path)
+        input_blob = set_processing_status_and_move_completed_blobs(input_blob, True)
+        processed_blobs_list.append(input_blob)
 
     return processed_blobs_list
 
 
+def group_input_blobs_by_company(input_blobs_list: list[InputBlob]) -> dict[str, list[InputBlob]]:
+    """
+    group_input_blobs_by_company groups the input blobs by company folder, e.g. Company-A, keeping their order.
+    """
+    company_input_blobs: dict[str, list[InputBlob]] = {}
+    for input_blob in input_blobs_list:
+        company_folder = input_blob.validation_successful_blob_path.split("/", 1)[0]
+        company_input_blobs.setdefault(company_folder, []).append(input_blob)
+
+    return company_input_blobs
+
+
 def get_input_blobs_list() -> list[InputBlob]:
     """
     get_input_blobs_list returns a list of input blobs.
 
+    Only the Validation-Successful folder of each company is listed, page by page and at most
+    Main.queue-batch-size blobs per call, see BlobPrefixLister.
+
     Raises:
         FolderMissingBusinessException: Raised if folers with prefix Company- do exist.
         FolderMissingBusinessException: Raised if Validation-Successful folers do exist.
@@ -72,46 +126,60 @@ def get_input_blobs_list() -> list[InputBlob]:
     """
 
     input_blobs_list = []
-    company_blobs_path_list = [
-        path.name
-        for path in utils.get_azure_container_client(constants.DEFAULT_BLOB_CONTAINER).list_blobs(
-            name_starts_with=constants.COMPANY_ROOT_FOLDER_PREFIX
-        )
-    ]
+    container_client = utils.get_azure_container_client(constants.DEFAULT_BLOB_CONTAINER)
 
-    if len(company_blobs_path_list) == 0:
+    company_prefixes = list(validation_successful_blob_lister.iter_company_prefixes(container_client))
+    if not company_prefixes:
         raise FolderMissingBusinessException(
             f"Folders with prefix '{constants.COMPANY_ROOT_FOLDER_PREFIX}' do not exist "
         )
 
-    validation_successful_blobs_path_list = [
-        item for item in company_blobs_path_list if constants.VALIDATION_SUCCESSFUL_SUBFOLDER in item
-    ]
+    # the listing returns the blob properties, they are kept for the metadata of every stage.
+    validation_successful_blobs_properties = list(
+        validation_successful_blob_lister.iter_validation_successful_blobs(
+            container_client,
+            utils.get_positive_int_config("queue-batch-size", constants.DEFAULT_QUEUE_BATCH_SIZE),
+            company_prefixes,
+        )
+    )
 
-    if len(validation_successful_blobs_path_list) == 0:
+    if len(validation_successful_blobs_properties) == 0:
         raise FolderMissingBusinessException(f"'{constants.VALIDATION_SUCCESSFUL_SUBFOLDER}' folders do not exist.")
     else:
-        validation_successful_blobs_path_list = [
-            item for item in validation_successful_blobs_path_list if "dummy" not in item.lower()
+        validation_successful_blobs_properties = [
+            blob_properties
+            for blob_properties in validation_successful_blobs_properties
+            if "dummy" not in blob_properties.name.lower()
         ]
 
-    if len(validation_successful_blobs_path_list) == 0:
+    if len(validation_successful_blobs_properties) == 0:
         raise BlobMissingException(f"'{constants.VALIDATION_SUCCESSFUL_SUBFOLDER}' folders are empty.")
 
-    for validation_successful_blob_path in validation_successful_blobs_path_list:
-        input_blobs_list.append(collect_input_blob(validation_successful_blob_path))
+    for blob_properties in validation_successful_blobs_properties:
+        input_blobs_list.append(collect_input_blob(blob_properties.name, blob_properties))
+
+    # the listed blobs are in the Inprogress folder now, the next poll starts at the first pages so it does not
+    # skip new blobs that sort before the continuation tokens.
+    validation_successful_blob_lister.forget_continuation_tokens()
+
+    # the Inprogress blobs of the batch are signed with one signing credential.
+    sas_urls = utils.get_sas_urls([input_blob.inprogress_blob_path for input_blob in input_blobs_list])
+    for input_blob in input_blobs_list:
+        input_blob.inprogress_blob_sas_url = sas_urls[input_blob.inprogress_blob_path]
 
     logging.info("Total actionable blobs found is/are %s", len(input_blobs_list))
 
     return input_blobs_list
 
 
-def collect_input_blob(validation_successful_blob_path: str) -> InputBlob:
+def collect_input_blob(validation_successful_blob_path: str, blob_properties: BlobProperties = None) -> InputBlob:
     """
-    Fetches the sas_url of blob and converts that to `InputBlob` object.
+    Moves the blob to the Inprogress folder and converts that to `InputBlob` object, get_input_blobs_list signs
+    the sas_urls of the batch.
 
     Args:
         blob_path (str): path of blob present in validation-successful folder.
+        blob_properties (BlobProperties, optional): properties of the blob from the listing.
 
     Returns:
         InputBlob: The collected input blob objet.
@@ -126,7 +194,8 @@ def collect_input_blob(validation_successful_blob_path: str) -> InputBlob:
     )
 
     # Adding Metadata
-    input_blob.metadata = utils.get_metadata("Validation", input_blob.validation_successful_blob_path)
+    input_blob.metadata = utils.get_metadata("Validation", input_blob.validation_successful_blob_path, blob_properties)
+    input_blob.blob_properties = blob_properties
 
     # Getting path to inprogress folder for this file path
     input_blob.inprogress_blob_path = input_blob.validation_successful_blob_path.replace(
@@ -138,6 +207,7 @@ def collect_input_blob(validation_successful_blob_path: str) -> InputBlob:
         input_blob.validation_successful_blob_path,
         constants.VALIDATION_SUCCESSFUL_SUBFOLDER,
         constants.INPROGRESS_SUBFOLDER,
+        get_content_length(input_blob),
     )
 
     # Path of blob present in inprogress folder
@@ -146,12 +216,12 @@ def collect_input_blob(validation_successful_blob_path: str) -> InputBlob:
     )
 
     # Adding Metadata
-    metadata = utils.get_metadata("Inprogress", input_blob.inprogress_blob_path)
+    input_blob.blob_properties = utils.get_moved_blob_properties(
+        input_blob.blob_properties, input_blob.inprogress_blob_path
+    )
+    metadata = utils.get_metadata("Inprogress", input_blob.inprogress_blob_path, input_blob.blob_properties)
     input_blob.metadata = f"{input_blob.metadata}\n{metadata}"
 
-    # generating sas_url
-    input_blob.inprogress_blob_sas_url = utils.get_sas_url(input_blob.inprogress_blob_path)
-
     return input_blob
 
 
@@ -169,14 +239,22 @@ def set_processing_status_and_move_completed_blobs(input_blob: InputBlob, is_err
     """
     if is_error:
         logging.info("Moving file '%s' to Failed folder.", input_blob.inprogress_blob_path)
-        utils.move_blob(input_blob.inprogress_blob_path, constants.INPROGRESS_SUBFOLDER, constants.FAILED_SUBFOLDER)
+        utils.move_blob(
+            input_blob.inprogress_blob_path,
+            constants.INPROGRESS_SUBFOLDER,
+            constants.FAILED_SUBFOLDER,
+            get_content_length(input_blob),
+        )
 
         input_blob.failed_blob_path = input_blob.inprogress_blob_path.replace(
             constants.INPROGRESS_SUBFOLDER, constants.FAILED_SUBFOLDER
         )
 
         # Adding Metadata
-        metadata = utils.get_metadata("Failed", input_blob.failed_blob_path)
+        input_blob.blob_properties = utils.get_moved_blob_properties(
+            input_blob.blob_properties, input_blob.failed_blob_path
+        )
+        metadata = utils.get_metadata("Failed", input_blob.failed_blob_path, input_blob.blob_properties)
         input_blob.metadata = f"{input_blob.metadata}\n{metadata}"
 
         input_blob.is_processed = True
@@ -185,14 +263,22 @@ def set_processing_status_and_move_completed_blobs(input_blob: InputBlob, is_err
 
     else:
         logging.info("Moving file '%s' to Successful folder.", input_blob.inprogress_blob_path)
-        utils.move_blob(input_blob.inprogress_blob_path, constants.INPROGRESS_SUBFOLDER, constants.SUCCESSFUL_SUBFOLDER)
+        utils.move_blob(
+            input_blob.inprogress_blob_path,
+            constants.INPROGRESS_SUBFOLDER,
+            constants.SUCCESSFUL_SUBFOLDER,
+            get_content_length(input_blob),
+        )
 
         input_blob.successful_blob_path = input_blob.inprogress_blob_path.replace(
             constants.INPROGRESS_SUBFOLDER, constants.SUCCESSFUL_SUBFOLDER
         )
 
         # Adding Metadata
-        metadata = utils.get_metadata("Successful", input_blob.successful_blob_path)
+        input_blob.blob_properties = utils.get_moved_blob_properties(
+            input_blob.blob_properties, input_blob.successful_blob_path
+        )
+        metadata = utils.get_metadata("Successful", input_blob.successful_blob_path, input_blob.blob_properties)
         input_blob.metadata = f"{input_blob.metadata}\n{metadata}"
 
         input_blob.is_processed = True
@@ -200,3 +286,10 @@ def set_processing_status_and_move_completed_blobs(input_blob: InputBlob, is_err
         input_blob.is_failed = False
 
     return input_blob
+
+
+def get_content_length(input_blob: InputBlob) -> int:
+    """
+    get_content_length returns the size of the input blob from its properties snapshot, None if unknown.
+    """
+    return input_blob.blob_properties.size if input_blob.blob_properties is not None else None
@@ -0,0 +1,62 @@
+"""
+Hot reload of the app config, without restarting the scheduler.
+
+The config is read again into a new settings snapshot when its ini file or .env file changes. Settings are read
+when they are used, not once per batch, so a batch running during a reload sees the new settings from then on:
+worker counts and batch sizes are read when a run starts and keep their values until it ends, while rate limits,
+document type mappings and the result json codec apply to the next blob. Cached clients are only dropped when
+their own settings changed: the form recognizer client of a previous endpoint or key is dropped, the blob service
+client and the rate limiters rebuild themselves on first use with new settings. The superseded clients are closed
+once the calls running on them finished, see azure_clients.
+"""
+import logging
+
+from common import azure_clients, config_reader
+from common.custom_exceptions import MissingConfigException
+from common.settings import Settings
+
+# settings that are only applied at startup.
+RESTART_REQUIRED_SETTINGS = ("app_base_dir", "mongodb_connection_string", "job_trigger_mode")
+
+
+def reload_config() -> Settings:
+    """
+    reload_config swaps in the settings of the changed config files and drops the clients of the previous ones.
+    An invalid config is logged and the previous settings stay in use.
+
+    Returns:
+        Settings: the new settings, None if the config did not change or is invalid.
+    """
+    previous_settings = config_reader.settings
+
+    try:
+        settings = config_reader.reload_config_if_changed()
+    except MissingConfigException:
+        logging.exception("Changed config is invalid, keeping the previous config.")
+        return None
+
+    if settings is None:
+        return None
+
+    drop_changed_clients(previous_settings, settings)
+
+    for setting in RESTART_REQUIRED_SETTINGS:
+        if getattr(settings, setting) != getattr(previous_settings, setting):
+            logging.warning("Config %s changed, it applies after a restart of the app.", setting)
+
+    logging.info("Config reloaded.")
+
+    return settings
+
+
+def drop_changed_clients(previous_settings: Settings, settings: Settings):
+    """
+    drop_changed_clients drops the cached clients built with settings that are no longer configured.
+    """
+    if (previous_settings.form_recognizer_endpoint, previous_settings.form_recognizer_key) != (
+        settings.form_recognizer_endpoint,
+        settings.form_recognizer_key,
+    ):
+        azure_clients.drop_document_analysis_client(
+            previous_settings.form_recognizer_endpoint, previous_settings.form_recognizer_key
+        )
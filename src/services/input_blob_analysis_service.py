@@ -1,28 +1,31 @@
-import json
+import logging
 import os
-from azure.core.credentials import AzureKeyCredential
-from azure.core.serialization import AzureJSONEncoder
-from azure.ai.formrecognizer import DocumentAnalysisClient
 from azure.storage.blob import BlobServiceClient
 
-from models.input_blob_model import InputBlob, ResultJsonMetaData
-from common import config_reader, utils, constants
-from common.custom_exceptions import (
-    MissingConfigException,
-    CitadelIDPBackendException,
-)
+from models.input_blob_model import InputBlob, ResultJsonMetaData, get_uploader_company_id
+from models.input_blob_unit_of_work import InputBlobUnitOfWork
+from common import utils, constants, result_json_writer
+from common.custom_exceptions import CitadelIDPBackendException
+from services import analysis_result_cache
 
 
-def analyze_blob(input_blob: InputBlob, blob_service_client: BlobServiceClient) -> InputBlob:
+def analyze_blob(
+    input_blob: InputBlob, blob_service_client: BlobServiceClient, unit_of_work: InputBlobUnitOfWork
+) -> InputBlob:
     """
     analyze_blob generates the output for blob
 
+    An input blob whose result json was uploaded by an earlier attempt keeps it. A document already analyzed with
+    the same model, going by its content_md5, reuses the existing result json and is not sent to form recognizer
+    again. Analyses are paced by the rate limiter of the model, throttled
+    analyses are retried.
+
     Args:
         input_blob (InputBlob): Blob that is going to be analyzed by form-recognizer
+        blob_service_client (BlobServiceClient): client used to upload the result json.
+        unit_of_work (InputBlobUnitOfWork): records the result json location on the input blob.
 
     Raises:
-        MissingConfigException: Raised if form-recognizer-key is missing in config file.
-        MissingConfigException: Raised if form-recognizer-key is empty
         CitadelIDPProcessingException:Raised if input_blob.inprogress_blob_url is empty
 
 
@@ -30,62 +33,72 @@ def analyze_blob(input_blob: InputBlob, blob_service_client: BlobServiceClient)
         InputBlob: The updated input blob
     """
     # TODO: first validate the values in the input blob arg are not empty or blanks
-    if not config_reader.config_data.has_option("Main", "form-recognizer-key"):
-        raise MissingConfigException("Main.form-recognizer-key is missing in config.")
-
-    form_recognizer_key = config_reader.config_data.get("Main", "form-recognizer-key")
-
-    if not utils.string_is_not_empty(form_recognizer_key):
-        raise MissingConfigException("Main.form-recognizer-key is present but has empty value.")
-
-    if not config_reader.config_data.has_option("Main", "form-recognizer-endpoint"):
-        raise MissingConfigException("Main.form_recognizer_endpoint is missing in config.")
-
-    form_recognizer_endpoint = config_reader.config_data.get("Main", "form-recognizer-endpoint")
-
-    if not utils.string_is_not_empty(form_recognizer_endpoint):
-        raise MissingConfigException("Main.form_recognizer_endpoint is present but has empty value.")
-
-    document_analysis_client = DocumentAnalysisClient(
-        form_recognizer_endpoint, credential=AzureKeyCredential(form_recognizer_key)
-    )
-
-    input_blob.save()
-
-    poller = None
+    if input_blob.json_output is not None:
+        # an earlier attempt uploaded the result json before it failed, e.g. while moving to Successful.
+        logging.info(
+            "Reusing result json '%s' of an earlier attempt of input_blob '%s'.",
+            input_blob.json_output.json_result_blob_path,
+            input_blob.in_progress_blob_path,
+        )
+        return input_blob
 
     if utils.string_is_not_empty(input_blob.in_progress_blob_sas_url):
-        poller = document_analysis_client.begin_analyze_document_from_url(
-            input_blob.form_recognizer_model_id, input_blob.in_progress_blob_sas_url
+        uploader_company = get_uploader_company_id(input_blob)
+        content_md5 = input_blob.metadata.content_md5 if input_blob.metadata else None
+        cached_json_output = analysis_result_cache.get_json_output(
+            uploader_company, content_md5, input_blob.form_recognizer_model_id
+        )
+        if cached_json_output is not None:
+            logging.info(
+                "Reusing result json '%s' for duplicate input_blob '%s'.",
+                cached_json_output.json_result_blob_path,
+                input_blob.in_progress_blob_path,
+            )
+            unit_of_work.set(input_blob, json_output=cached_json_output)
+            return input_blob
+
+        document_analysis_client = utils.get_document_analysis_client()
+        # a 429 is not retried by the sdk, the rate limiter backs off and retries it.
+        result = utils.get_analysis_rate_limiter(input_blob.form_recognizer_model_id).run(
+            lambda: document_analysis_client.begin_analyze_document_from_url(
+                input_blob.form_recognizer_model_id, input_blob.in_progress_blob_sas_url
+            ).result()
         )
     else:
         raise CitadelIDPBackendException("input_blob.in_progress_blob_url should be non empty.")
 
-    result = poller.result()
-    result_dict = [result.to_dict()]
-
-    # Creating a dictionary with the blob name and blob output data
-    final_result = {
-        "input_file_name": os.path.basename(input_blob.in_progress_blob_path),
-        "recognizer_result_data": result_dict,
-    }
-
-    result_json = json.dumps(final_result, cls=AzureJSONEncoder)
-
     result_json_path = input_blob.in_progress_blob_path.replace("/Inprogress/", "/")
-    result_json_path_in_azure_blob_storage = f"{result_json_path}.json"
+    result_json_codec = utils.get_result_json_codec()
+    result_json_path_in_azure_blob_storage = (
+        f"{result_json_path}{result_json_writer.RESULT_JSON_FILE_EXTENSIONS[result_json_codec]}"
+    )
 
     blob_client = blob_service_client.get_blob_client(
         container=constants.DEFAULT_JSON_OUTPUT_CONTAINER, blob=result_json_path_in_azure_blob_storage
     )
 
-    # Uploading the formrecognizer output to azure blob storage
-    blob_client.upload_blob(result_json, overwrite=False)
+    # Streaming the formrecognizer output with the blob name to azure blob storage, block by block
+    result_json_writer.upload_blocks(
+        blob_client,
+        result_json_writer.iter_encoded(
+            result_json_writer.iter_result_json(os.path.basename(input_blob.in_progress_blob_path), result),
+            result_json_codec,
+        ),
+        content_settings=result_json_writer.get_result_json_content_settings(result_json_codec),
+    )
 
-    input_blob.json_output = ResultJsonMetaData(
+    json_output = ResultJsonMetaData(
         json_result_container_name=constants.DEFAULT_JSON_OUTPUT_CONTAINER,
         json_result_blob_path=result_json_path_in_azure_blob_storage,
+        json_result_codec=result_json_codec,
+    )
+    unit_of_work.set(input_blob, json_output=json_output)
+    analysis_result_cache.put_json_output(
+        uploader_company,
+        content_md5,
+        input_blob.form_recognizer_model_id,
+        json_output,
+        input_blob.in_progress_blob_path,
     )
-    input_blob.save()
 
     return input_blob
@@ -0,0 +1,88 @@
+"""
+Watches input_document_blobs through a mongodb change stream for input blobs that become ready for processing.
+"""
+import logging
+import threading
+from typing import Callable
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from models.input_blob_model import InputBlob
+
+# error codes of servers that do not support change streams, e.g. a standalone mongod.
+CHANGE_STREAMS_UNSUPPORTED_ERROR_CODES = (40573, 40324)
+
+# matches inserted documents that are already validated and updates that validate a document.
+READY_INPUT_BLOBS_PIPELINE = [
+    {
+        "$match": {
+            "$or": [
+                {"operationType": {"$in": ["insert", "replace"]}, "fullDocument.is_validation_successful": True},
+                {"operationType": "update", "updateDescription.updatedFields.is_validation_successful": True},
+            ]
+        }
+    },
+    {"$project": {"_id": 1, "operationType": 1, "documentKey": 1}},
+]
+
+
+class InputBlobChangeStreamWatcher(threading.Thread):
+    """
+    InputBlobChangeStreamWatcher calls on_input_blob_ready for every input blob that becomes
+    is_validation_successful=True.
+
+    on_watching_changed is called with True once the change stream is open, and with False when it is lost, so
+    the caller can fall back to polling. A lost stream is resumed after retry_delay_seconds, a server without
+    change stream support stops the watcher for good.
+    """
+
+    def __init__(
+        self,
+        on_input_blob_ready: Callable[[], None],
+        on_watching_changed: Callable[[bool], None],
+        retry_delay_seconds: float = 30,
+    ):
+        super().__init__(name="input-blob-change-stream", daemon=True)
+        self.on_input_blob_ready = on_input_blob_ready
+        self.on_watching_changed = on_watching_changed
+        self.retry_delay_seconds = retry_delay_seconds
+        self._stopped = threading.Event()
+        self._resume_token = None
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.watch()
+            except OperationFailure as ex:
+                self.on_watching_changed(False)
+                if ex.code in CHANGE_STREAMS_UNSUPPORTED_ERROR_CODES:
+                    logging.warning("Change streams are not available, falling back to polling: %s", ex)
+                    return
+                logging.exception("Change stream on input_document_blobs failed, falling back to polling.")
+                # the resume token may be the cause, the next stream starts from now.
+                self._resume_token = None
+            except PyMongoError:
+                self.on_watching_changed(False)
+                logging.exception("Change stream on input_document_blobs was lost, falling back to polling.")
+
+            self._stopped.wait(self.retry_delay_seconds)
+
+    def watch(self):
+        """
+        watch opens the change stream and dispatches its events until the watcher is stopped.
+        """
+        with InputBlob._get_collection().watch(
+            READY_INPUT_BLOBS_PIPELINE, resume_after=self._resume_token, max_await_time_ms=1000
+        ) as change_stream:
+            logging.info("Watching input_document_blobs for input blobs ready for processing.")
+            self.on_watching_changed(True)
+
+            while not self._stopped.is_set() and change_stream.alive:
+                change = change_stream.try_next()
+                self._resume_token = change_stream.resume_token
+                if change is not None:
+                    logging.debug("Input blob %s is ready for processing.", change["documentKey"]["_id"])
+                    self.on_input_blob_ready()
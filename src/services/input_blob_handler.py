@@ -2,9 +2,11 @@
 input_blob handler module for reading and writing mongodb and azure blob storage
 """
 import logging
+import threading
 from datetime import datetime, timedelta
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
-from common import constants, utils
+from typing import NamedTuple
+from azure.storage.blob import BlobServiceClient
+from common import blob_mover, constants, error_classifier, sas_signer, utils
 from common.custom_exceptions import (
     MissingConfigException,
     NoInputBlobsForProcessingException,
@@ -12,147 +14,413 @@ from common.custom_exceptions import (
 )
 
 from services.input_blob_analysis_service import analyze_blob
-from models.input_blob_model import InputBlob, LifecycleStatus, LifecycleStatusTypes
+from common.fair_scheduling import CompanyFairQueue
+from common.staged_pipeline import PipelineStage, StagedPipeline
+from models.input_blob_model import (
+    InputBlob,
+    LifecycleStatusTypes,
+    LEASE_OWNER,
+    ProcessedInputBlobs,
+    claim_input_blob,
+    get_companies_with_claimable_input_blobs,
+)
+from models.input_blob_unit_of_work import InputBlobUnitOfWork
 
 
-def handle_input_blob_process() -> list[InputBlob]:
+def handle_input_blob_process() -> ProcessedInputBlobs:
     """
     Checks and processes the input_blob.
 
+    Pending input blobs are claimed from mongodb one company after the other, with weighted round-robin across
+    the companies with pending input blobs (Main.company-weights), and at most Main.company-max-concurrency input
+    blobs of one company are processed at a time.
+
+    Claimed input blobs go through three stages connected by bounded queues, each with its own workers:
+    prepare (classify, move to Inprogress and sign the SAS url, Main.prepare-concurrency workers), analyze
+    (form recognizer analysis and result json upload, Main.analysis-concurrency workers) and finalize (move to
+    Successful or Failed, or schedule a retry, Main.finalize-concurrency workers). The storage and mongodb I/O of
+    the prepare and finalize stages overlaps with the analyses, and input blobs are only claimed while the
+    prepare queue has room, so leases are not taken long before the work starts.
+
+    Lifecycle changes of the batch are collected in an InputBlobUnitOfWork and written with bulk writes.
+
+    Raises:
+        NoInputBlobsForProcessingException: Raised when no input_blobs are found in mongodb for processing.
+
     Returns:
-        list[InputBlob]: List of processed input blobs.
+        ProcessedInputBlobs: List of processed input blobs, with the number of claimed input blobs.
     """
     blob_service_client = utils.get_azure_storage_blob_service_client()
+    unit_of_work = InputBlobUnitOfWork(auto_flush_size=constants.UNIT_OF_WORK_AUTO_FLUSH_SIZE)
     processed_blobs_list: list[InputBlob] = []
+    processed_blobs_lock = threading.Lock()
+
+    analysis_concurrency = utils.get_analysis_concurrency()
+    company_fair_queue = utils.get_company_fair_queue()
+    claimed_count = 0
+
+    def on_input_blob_done(input_blob: InputBlob, processed_input_blob: InputBlob):
+        company_fair_queue.release(input_blob)
+        if processed_input_blob is not None:
+            with processed_blobs_lock:
+                processed_blobs_list.append(processed_input_blob)
+
+    stages = [
+        PipelineStage(
+            "input-blob-prepare",
+            lambda input_blob: prepare_input_blob(input_blob, blob_service_client, unit_of_work),
+            utils.get_positive_int_config("prepare-concurrency", constants.DEFAULT_PREPARE_CONCURRENCY),
+        ),
+        PipelineStage(
+            "input-blob-analysis",
+            lambda input_blob: analyze_input_blob(input_blob, blob_service_client, unit_of_work),
+            analysis_concurrency,
+        ),
+        PipelineStage(
+            "input-blob-finalize",
+            lambda analyzed_input_blob: finalize_input_blob(analyzed_input_blob, blob_service_client, unit_of_work),
+            utils.get_positive_int_config("finalize-concurrency", constants.DEFAULT_FINALIZE_CONCURRENCY),
+        ),
+    ]
+
+    try:
+        with StagedPipeline(stages, queue_size=analysis_concurrency, on_done=on_input_blob_done) as pipeline:
+            # Streaming the input_blobs from mongodb that are to be processed
+            for input_blob in get_input_blobs_from_mongodb(company_fair_queue):
+                claimed_count += 1
+                pipeline.submit(input_blob)
+    finally:
+        # the blobs already moved in storage are recorded even if claiming failed.
+        unit_of_work.flush()
+
+    if claimed_count == 0:
+        raise NoInputBlobsForProcessingException(f"Zero input_blobs found in mongodb for processing")
 
-    # Getting list of input_blobs from mongodb that are to be processed
-    input_blob_list = get_list_of_input_blobs_from_mongodb(blob_service_client)
+    logging.info("%s input_blobs claimed from mongodb by %s", claimed_count, LEASE_OWNER)
 
-    for input_blob in input_blob_list:
-        try:
-            logging.info("Starting analysis for '%s' ....", input_blob.in_progress_blob_path)
-            # start analyze the input blob
-            processed_blob = analyze_blob(input_blob, blob_service_client)
-            processed_blobs_list.append(processed_blob)
-            logging.info("Analysis completed successfully for '%s' ....", input_blob.in_progress_blob_path)
-            # update feilds of analyzed input blob in mongodb and move to success folder in azure storage
-            input_blob = set_processing_status_and_move_completed_blobs(input_blob, False)
+    return ProcessedInputBlobs(processed_blobs_list, claimed_count)
+
+
+class AnalyzedInputBlob(NamedTuple):
+    """
+    AnalyzedInputBlob is an input blob after its analysis, with the error the analysis failed with, if any.
+    """
+
+    input_blob: InputBlob
+    analysis_error: Exception = None
+
+
+def prepare_input_blob(
+    input_blob: InputBlob, blob_service_client: BlobServiceClient, unit_of_work: InputBlobUnitOfWork
+) -> InputBlob:
+    """
+    prepare_input_blob moves a claimed input blob to the Inprogress folder.
+
+    The Inprogress state is flushed right away, so it is persisted while the lease is still held. An input blob
+    that could not be prepared counts a failed attempt, see fail_preparation.
 
-        except MissingConfigException:
+    Returns:
+        InputBlob: The prepared input blob, None if the input blob could not be prepared.
+    """
+    try:
+        input_blob = update_input_blob(input_blob, blob_service_client, unit_of_work)
+        unit_of_work.flush()
+    except Exception as error:
+        logging.exception(
+            "Could not prepare input_blob '%s' for processing.", input_blob.validation_successful_blob_path
+        )
+        try:
+            fail_preparation(blob_service_client, input_blob, error, unit_of_work)
+            unit_of_work.flush()
+        except Exception:
+            # the blob is claimed again once its lease expires.
             logging.exception(
-                "A Missing Config error occurred while analyzing the input_blob '%s'.",
-                input_blob.in_progress_blob_path,
+                "Could not record the failed preparation of input_blob '%s'.",
+                input_blob.validation_successful_blob_path,
             )
-            # set feilds of processed input blob in monogdb
-            input_blob.is_processed_for_data = True
-            processed_lifecycle_status = LifecycleStatus(
-                status=LifecycleStatusTypes.PROCESSED,
-                message="Blob processed successfully",
-                updated_date_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            )
-            input_blob.lifecycle_status_list.append(processed_lifecycle_status)
-            input_blob.save()
-            # update feilds of analyzed input blob in mongodb and move the blob to failed folder in azure storage
-            input_blob = set_processing_status_and_move_completed_blobs(input_blob, True)
+        return None
+
+    return input_blob
+
 
-            processed_blobs_list.append(input_blob)
+def fail_preparation(
+    blob_service_client: BlobServiceClient,
+    input_blob: InputBlob,
+    preparation_error: Exception,
+    unit_of_work: InputBlobUnitOfWork,
+):
+    """
+    fail_preparation schedules a retry of an input blob whose preparation failed with preparation_error, or moves
+    it to the Failed folder, like finalize_input_blob does for a failed analysis. An input blob that was not moved
+    to the Inprogress folder yet is retried, or moved to the Failed folder, from the Validation-Successful folder.
+    """
+    if input_blob.is_processing_for_data:
+        # the blob is in the Inprogress folder, e.g. the flush of the Inprogress state failed.
+        fail_input_blob(blob_service_client, input_blob, preparation_error, unit_of_work)
+        return
 
-        except CitadelIDPBackendException:
+    if should_retry(preparation_error, input_blob.processing_attempts, input_blob.validation_successful_blob_path):
+        set_retry_scheduled(input_blob, unit_of_work)
+        return
+
+    unit_of_work.set(input_blob, is_processed_for_data=True)
+    unit_of_work.push_lifecycle_status(input_blob, LifecycleStatusTypes.PROCESSED, "Blob processed successfully")
+
+    logging.info("Moving blob '%s' to Failed folder.", input_blob.validation_successful_blob_path)
+    failed_blob_path = input_blob.validation_successful_blob_path.replace(
+        constants.VALIDATION_SUCCESSFUL_SUBFOLDER, constants.FAILED_SUBFOLDER
+    )
+    move_blob_from_source_folder_to_destination_folder_in_azure_blob_storage(
+        blob_service_client,
+        input_blob.validation_successful_blob_path,
+        failed_blob_path,
+        get_content_length(input_blob),
+    )
+
+    set_failed(input_blob, failed_blob_path, unit_of_work)
+
+
+def analyze_input_blob(
+    input_blob: InputBlob, blob_service_client: BlobServiceClient, unit_of_work: InputBlobUnitOfWork
+) -> AnalyzedInputBlob:
+    """
+    analyze_input_blob runs the analysis of an input blob in the Inprogress folder and uploads its result json.
+
+    Returns:
+        AnalyzedInputBlob: the input blob, with the error its analysis failed with, if any.
+    """
+    try:
+        logging.info("Starting analysis for '%s' ....", input_blob.in_progress_blob_path)
+        # start analyze the input blob
+        input_blob = analyze_blob(input_blob, blob_service_client, unit_of_work)
+        logging.info("Analysis completed successfully for '%s' ....", input_blob.in_progress_blob_path)
+        return AnalyzedInputBlob(input_blob)
+
+    except MissingConfigException as error:
+        logging.exception(
+            "A Missing Config error occurred while analyzing the input_blob '%s'.",
+            input_blob.in_progress_blob_path,
+        )
+        return AnalyzedInputBlob(input_blob, error)
+
+    except CitadelIDPBackendException as error:
+        logging.exception(
+            "A General Citadel IDP processing error occured while analyzing the document '%s'.",
+            input_blob.in_progress_blob_path,
+        )
+        return AnalyzedInputBlob(input_blob, error)
+
+    except Exception as error:
+        logging.exception("An error occurred while analyzing the input_blob '%s'.", input_blob.in_progress_blob_path)
+        return AnalyzedInputBlob(input_blob, error)
+
+
+def finalize_input_blob(
+    analyzed_input_blob: AnalyzedInputBlob, blob_service_client: BlobServiceClient, unit_of_work: InputBlobUnitOfWork
+) -> InputBlob:
+    """
+    finalize_input_blob moves an analyzed input blob to the Successful folder, or, if its analysis failed, schedules
+    a retry or moves it to the Failed folder.
+
+    An input blob that fails with a transient error is moved back to the Validation-Successful folder and retried
+    after a backoff, until Main.processing-max-attempts attempts failed.
+
+    Returns:
+        InputBlob: The processed input blob, None if it is retried later.
+    """
+    input_blob, processing_error = analyzed_input_blob
+
+    if processing_error is None:
+        try:
+            # update feilds of analyzed input blob in mongodb and move to success folder in azure storage
+            return set_processing_status_and_move_completed_blobs(blob_service_client, input_blob, False, unit_of_work)
+        except Exception as error:
             logging.exception(
-                "A General Citadel IDP processing error occured while analyzing the document '%s'.",
-                input_blob.in_progress_blob_path,
-            )
-            # set feilds of processed input blob in monogdb
-            input_blob.is_processed_for_data = True
-            processed_lifecycle_status = LifecycleStatus(
-                status=LifecycleStatusTypes.PROCESSED,
-                message="Blob processed successfully",
-                updated_date_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "An error occurred while completing the input_blob '%s'.", input_blob.in_progress_blob_path
             )
-            input_blob.lifecycle_status_list.append(processed_lifecycle_status)
-            input_blob.save()
-            # update feilds of analyzed input blob in mongodb and move the blob to failed folder in azure storage
-            input_blob = set_processing_status_and_move_completed_blobs(blob_service_client, input_blob, True)
-            processed_blobs_list.append(input_blob)
+            processing_error = error
+
+    return fail_input_blob(blob_service_client, input_blob, processing_error, unit_of_work)
+
 
+def fail_input_blob(
+    blob_service_client: BlobServiceClient,
+    input_blob: InputBlob,
+    processing_error: Exception,
+    unit_of_work: InputBlobUnitOfWork,
+) -> InputBlob:
+    """
+    fail_input_blob schedules a retry of an input blob in the Inprogress folder whose processing failed with
+    processing_error, or moves it to the Failed folder.
+
+    Returns:
+        InputBlob: The failed input blob, None if it is retried later.
+    """
+    if should_retry(processing_error, input_blob.processing_attempts, input_blob.in_progress_blob_path):
+        try:
+            schedule_retry(blob_service_client, input_blob, unit_of_work)
+            return None
         except Exception:
-            logging.exception(
-                "An error occurred while analyzing the input_blob '%s'.", input_blob.in_progress_blob_path
-            )
-            # set feilds of processed input blob in monogdb
-            input_blob.is_processed_for_data = True
-            processed_lifecycle_status = LifecycleStatus(
-                status=LifecycleStatusTypes.PROCESSED,
-                message="Blob processed successfully",
-                updated_date_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            )
-            input_blob.lifecycle_status_list.append(processed_lifecycle_status)
-            input_blob.save()
-            # update feilds of analyzed input blob in mongodb and move the blob to failed folder in azure storage
-            input_blob = set_processing_status_and_move_completed_blobs(blob_service_client, input_blob, True)
-            processed_blobs_list.append(input_blob)
+            logging.exception("Could not schedule a retry of input_blob '%s'.", input_blob.in_progress_blob_path)
 
-    return processed_blobs_list
+    # set feilds of processed input blob in monogdb
+    unit_of_work.set(input_blob, is_processed_for_data=True)
+    unit_of_work.push_lifecycle_status(input_blob, LifecycleStatusTypes.PROCESSED, "Blob processed successfully")
+    # update feilds of analyzed input blob in mongodb and move the blob to failed folder in azure storage
+    return set_processing_status_and_move_completed_blobs(blob_service_client, input_blob, True, unit_of_work)
 
 
-def get_list_of_input_blobs_from_mongodb(blob_service_client: BlobServiceClient) -> list[InputBlob]:
+def should_retry(processing_error: Exception, processing_attempts: int, in_progress_blob_path: str) -> bool:
     """
-    gets list 'input_input_blob_blobs' from mongodb where is_validation_successful=true and is_processing_for_data = false.
+    should_retry tells if an input blob is processed again after processing_error, which is the case for
+    transient errors while fewer than Main.processing-max-attempts attempts failed.
 
-    Raises:
-        NoInputBlobsForProcessingException: Raised when no input_blobs are found in mongodb for processing.
+    Args:
+        processing_error (Exception): the error the processing attempt failed with.
+        processing_attempts (int): processing attempts of the input blob that failed before this one.
+        in_progress_blob_path (str): path of the input blob, for logging.
+    """
+    return error_classifier.is_transient_error(processing_error) and has_processing_attempts_left(
+        processing_attempts, in_progress_blob_path
+    )
 
-    Returns:
-        list[InputBlob]: input_blob_list
 
+def has_processing_attempts_left(processing_attempts: int, in_progress_blob_path: str) -> bool:
     """
-    updated_input_blobs_list = []
+    has_processing_attempts_left tells if an input blob whose processing failed processing_attempts times before,
+    and failed once more, may be processed again.
+    """
+    processing_max_attempts = utils.get_positive_int_config(
+        "processing-max-attempts", constants.DEFAULT_PROCESSING_MAX_ATTEMPTS
+    )
+    if (processing_attempts or 0) + 1 >= processing_max_attempts:
+        logging.warning(
+            "input_blob '%s' failed %s processing attempts, giving up.", in_progress_blob_path, processing_max_attempts
+        )
+        return False
 
-    # TODO: Add datetime check
+    return True
 
-    # Collecting all the input_blobs from mongodb that are to be processed.
-    input_blobs_list: list[InputBlob] = InputBlob.objects(is_validation_successful=True, is_processing_for_data=False)
-    if len(input_blobs_list) == 0:
-        raise NoInputBlobsForProcessingException(f"Zero input_blobs found in mongodb for processing")
 
-    logging.info("%s input_blobs found in mongodb", len(input_blobs_list))
+def schedule_retry(
+    blob_service_client: BlobServiceClient,
+    input_blob: InputBlob,
+    unit_of_work: InputBlobUnitOfWork,
+    failure: str = "a transient error",
+):
+    """
+    schedule_retry moves the input blob back to the Validation-Successful folder and counts the failed attempt.
+    The input blob is claimable again once the backoff of error_classifier.get_retry_delay is over.
+
+    Args:
+        failure (str, optional): what the attempt failed with, for the lifecycle status.
+    """
+    logging.info("Moving blob '%s' back to Validation-Successful folder.", input_blob.in_progress_blob_path)
+    move_blob_from_source_folder_to_destination_folder_in_azure_blob_storage(
+        blob_service_client,
+        input_blob.in_progress_blob_path,
+        input_blob.validation_successful_blob_path,
+        get_content_length(input_blob),
+    )
+
+    set_retry_scheduled(input_blob, unit_of_work, failure)
+
 
-    for input_blob in input_blobs_list:
-        updated_input_blobs_list.append(update_input_blob(input_blob, blob_service_client))
+def set_retry_scheduled(input_blob: InputBlob, unit_of_work: InputBlobUnitOfWork, failure: str = "a transient error"):
+    """
+    set_retry_scheduled records the failed attempt of an input blob moved back to the Validation-Successful
+    folder, it is claimable again once the backoff of error_classifier.get_retry_delay is over.
+    """
+    processing_attempts = (input_blob.processing_attempts or 0) + 1
+    retry_delay = error_classifier.get_retry_delay(processing_attempts)
 
-    return updated_input_blobs_list
+    logging.info(
+        "Retrying input_blob '%s' in %s seconds.", input_blob.in_progress_blob_path, int(retry_delay.total_seconds())
+    )
+    unit_of_work.set(
+        input_blob,
+        is_processing_for_data=False,
+        in_progress_blob_sas_url=None,
+        processing_attempts=processing_attempts,
+        lease_owner=None,
+        lease_expires_at=datetime.now() + retry_delay,
+    )
+    unit_of_work.push_lifecycle_status(
+        input_blob,
+        LifecycleStatusTypes.RETRY_SCHEDULED,
+        f"Processing attempt {processing_attempts} failed with {failure}, blob moved back to "
+        "Validation-Successful folder in azure blob storage",
+    )
 
 
-def update_input_blob(input_blob: InputBlob, blob_service_client: BlobServiceClient) -> InputBlob:
+def get_input_blobs_from_mongodb(company_fair_queue: CompanyFairQueue):
     """
-    update_input_blob updates fields in mongodb
+    streams the 'input_document_blobs' from mongodb where is_validation_successful=true and
+    is_processing_for_data = false, claiming them as the consumer asks for more.
+
+    Input blobs are claimed atomically with a lease, so backend replicas and overlapping runs never pick up the
+    same input blob. Leases left by a crashed process are reclaimed once they expire. Only the fields needed
+    for processing are loaded.
+
+    Every company with pending input blobs is added to the company fair queue, which picks the company of the next
+    claim, oldest input blob first within a company. The caller releases the input blobs in the queue once they
+    are processed.
 
     Args:
-        input_blob (InputBlob): _description_
-        blob_service_client (BlobServiceClient): _description_
+        company_fair_queue (CompanyFairQueue): schedules the claims across the companies.
+
+    Yields:
+        InputBlob: claimed input blobs, at most Main.queue-batch-size per run.
+    """
+    max_input_blobs = utils.get_positive_int_config("queue-batch-size", constants.DEFAULT_QUEUE_BATCH_SIZE)
+    lease_duration = timedelta(
+        seconds=utils.get_positive_int_config("queue-lease-seconds", constants.DEFAULT_QUEUE_LEASE_SECONDS)
+    )
+
+    for uploader_company in get_companies_with_claimable_input_blobs():
+        company_fair_queue.add_company(
+            uploader_company,
+            lambda uploader_company=uploader_company: claim_input_blob(LEASE_OWNER, lease_duration, uploader_company),
+        )
+
+    for claimed_count, input_blob in enumerate(company_fair_queue, start=1):
+        yield input_blob
+
+        if claimed_count >= max_input_blobs:
+            break
+
+
+def update_input_blob(
+    input_blob: InputBlob, blob_service_client: BlobServiceClient, unit_of_work: InputBlobUnitOfWork
+) -> InputBlob:
+    """
+    update_input_blob moves the input blob to the Inprogress folder and records the changes in the unit of work.
+
+    Args:
+        input_blob (InputBlob): input blob found in the Validation-Successful folder.
+        blob_service_client (BlobServiceClient): client used for all the azure blob storage calls.
+        unit_of_work (InputBlobUnitOfWork): collects the lifecycle changes of the input blob.
 
     Returns:
-        InputBlob: _description_
+        InputBlob: the updated input blob.
     """
     # Updating lifecycle_status in mongodb
-    processing_lifecycle_status = LifecycleStatus(
-        status=LifecycleStatusTypes.PROCESSING,
-        message="Strating blob process",
-        updated_date_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    )
-    input_blob.lifecycle_status_list.append(processing_lifecycle_status)
+    unit_of_work.push_lifecycle_status(input_blob, LifecycleStatusTypes.PROCESSING, "Strating blob process")
 
     # Updating InputBlob fields in mongodb
-    input_blob.blob_type, input_blob.form_recognizer_model_id = utils.get_document_type_from_file_name(
+    blob_type, form_recognizer_model_id = utils.get_document_type_from_file_name(
         input_blob.validation_successful_blob_path
     )
 
-    input_blob.in_progress_blob_path = input_blob.validation_successful_blob_path.replace(
-        constants.VALIDATION_SUCCESSFUL_SUBFOLDER, constants.INPROGRESS_SUBFOLDER
+    unit_of_work.set(
+        input_blob,
+        blob_type=blob_type,
+        form_recognizer_model_id=form_recognizer_model_id,
+        in_progress_blob_path=input_blob.validation_successful_blob_path.replace(
+            constants.VALIDATION_SUCCESSFUL_SUBFOLDER, constants.INPROGRESS_SUBFOLDER
+        ),
     )
 
-    input_blob.save()
-
     logging.info(
         "Moving blob: %s from %s to %s folder in azure blob storage",
         input_blob.validation_successful_blob_path,
@@ -162,31 +430,45 @@ def update_input_blob(input_blob: InputBlob, blob_service_client: BlobServiceCli
 
     # Moving the blob from validation-successful folder to inprogress folder in azure_blob_storage
     move_blob_from_source_folder_to_destination_folder_in_azure_blob_storage(
-        blob_service_client, input_blob.validation_successful_blob_path, input_blob.in_progress_blob_path
+        blob_service_client,
+        input_blob.validation_successful_blob_path,
+        input_blob.in_progress_blob_path,
+        get_content_length(input_blob),
     )
     logging.info("Blob moved Successfully")
 
-    # Updating the processing status in Mongodb
-    input_blob.is_processing_for_data = True
-    input_blob.in_progress_blob_sas_url = get_sas_url(input_blob.in_progress_blob_path, blob_service_client)
-    input_blob.save()
+    # Updating the processing status in Mongodb, set right after the move, it tells where the blob is.
+    unit_of_work.set(input_blob, is_processing_for_data=True)
+    unit_of_work.set(
+        input_blob, in_progress_blob_sas_url=get_sas_url(input_blob.in_progress_blob_path, blob_service_client)
+    )
 
     return input_blob
 
 
 def move_blob_from_source_folder_to_destination_folder_in_azure_blob_storage(
-    blob_service_client: BlobServiceClient, source_blob_path: str, destination_blob_path: str
+    blob_service_client: BlobServiceClient,
+    source_blob_path: str,
+    destination_blob_path: str,
+    content_length: int = None,
 ):
-    source_blob_client = blob_service_client.get_blob_client(
-        container=constants.DEFAULT_BLOB_CONTAINER, blob=source_blob_path
-    )
+    """
+    Moves the blob and waits for the copy to complete before the source blob is deleted.
+
+    Args:
+        blob_service_client (BlobServiceClient): client of the storage account.
+        source_blob_path (str): path of the blob to move.
+        destination_blob_path (str): path the blob is moved to.
+        content_length (int, optional): size of the blob in bytes, small blobs are copied synchronously.
+    """
+    blob_mover.move_blob(blob_service_client, source_blob_path, destination_blob_path, content_length)
 
-    destination_blob_client = blob_service_client.get_blob_client(
-        container=constants.DEFAULT_BLOB_CONTAINER, blob=destination_blob_path
-    )
 
-    destination_blob_client.start_copy_from_url(source_blob_client.url)
-    source_blob_client.delete_blob()
+def get_content_length(input_blob: InputBlob) -> int:
+    """
+    get_content_length returns the blob size recorded in the input blob metadata, None if unknown.
+    """
+    return input_blob.metadata.content_length_bytes if input_blob.metadata else None
 
 
 def get_sas_url(blob_path: str, blob_service_client: BlobServiceClient) -> str:
@@ -197,29 +479,20 @@ def get_sas_url(blob_path: str, blob_service_client: BlobServiceClient) -> str:
         blob_path (str): path of blob in azure blob storage
         blob_service_client (BlobServiceClient):
 
+    The url stays valid for the lease of the claimed input blob, the longest it waits for its analysis.
+
     Returns:
         sas_url (str): returs sas_url of the blob.
     """
-
-    account_name = blob_service_client.get_container_client(constants.DEFAULT_BLOB_CONTAINER).account_name
-
-    sas_token = generate_blob_sas(
-        account_name,
-        constants.DEFAULT_BLOB_CONTAINER,
-        blob_path,
-        account_key=blob_service_client.credential.account_key,
-        permission=BlobSasPermissions(read=True),
-        expiry=datetime.utcnow() + timedelta(hours=1),
+    expected_wait = timedelta(
+        seconds=utils.get_positive_int_config("queue-lease-seconds", constants.DEFAULT_QUEUE_LEASE_SECONDS)
     )
 
-    # Constructing the full SAS URL for the blob
-    sas_url = f"https://{account_name}.blob.core.windows.net/{constants.DEFAULT_BLOB_CONTAINER}/{blob_path}?{sas_token}"
-
-    return sas_url
+    return sas_signer.get_blob_sas_signer(blob_service_client).get_sas_url(blob_path, expected_wait)
 
 
 def set_processing_status_and_move_completed_blobs(
-    blob_service_client: BlobServiceClient, input_blob: InputBlob, is_error: bool
+    blob_service_client: BlobServiceClient, input_blob: InputBlob, is_error: bool, unit_of_work: InputBlobUnitOfWork
 ) -> InputBlob:
     """
     Sets the processing status and moves the completed blobs to appropriate subfolders.
@@ -227,57 +500,69 @@ def set_processing_status_and_move_completed_blobs(
     Args:
         input_blob (InputBlob): The input blob.
         is_error (bool): True if an error occurred during analyzing.
+        unit_of_work (InputBlobUnitOfWork): collects the lifecycle changes of the input blob.
 
     Returns:
-        sas_url (str): returs sas_url of the blob.
+        InputBlob: The updated input blob.
     """
 
     if is_error:
         logging.info("Moving blob '%s' to Failed folder.", input_blob.in_progress_blob_path)
-        input_blob.failed_blob_path = input_blob.in_progress_blob_path.replace(
+        failed_blob_path = input_blob.in_progress_blob_path.replace(
             constants.INPROGRESS_SUBFOLDER, constants.FAILED_SUBFOLDER
         )
-        input_blob.save()
 
         move_blob_from_source_folder_to_destination_folder_in_azure_blob_storage(
-            blob_service_client, input_blob.in_progress_blob_path, input_blob.failed_blob_path
+            blob_service_client,
+            input_blob.in_progress_blob_path,
+            failed_blob_path,
+            get_content_length(input_blob),
         )
 
-        input_blob.is_processed_success = False
-        input_blob.is_processed_failed = True
-
-        processed_and_failed_lifecycle_status = LifecycleStatus(
-            status=LifecycleStatusTypes.FAILED,
-            message="Blob moved to Failed folder in azure blob storage",
-            updated_date_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        )
-
-        input_blob.lifecycle_status_list.append(processed_and_failed_lifecycle_status)
-        input_blob.save()
+        set_failed(input_blob, failed_blob_path, unit_of_work)
 
         return input_blob
 
     else:
         logging.info("Moving blob '%s' to Successful folder.", input_blob.in_progress_blob_path)
-        input_blob.success_blob_path = input_blob.in_progress_blob_path.replace(
+        success_blob_path = input_blob.in_progress_blob_path.replace(
             constants.INPROGRESS_SUBFOLDER, constants.SUCCESSFUL_SUBFOLDER
         )
-        input_blob.save()
 
         move_blob_from_source_folder_to_destination_folder_in_azure_blob_storage(
-            blob_service_client, input_blob.in_progress_blob_path, input_blob.success_blob_path
+            blob_service_client,
+            input_blob.in_progress_blob_path,
+            success_blob_path,
+            get_content_length(input_blob),
         )
 
-        input_blob.is_processed_success = True
-        input_blob.is_processed_failed = False
-
-        processed_and_success_lifecycle_status = LifecycleStatus(
-            status=LifecycleStatusTypes.SUCCESS,
-            message="Blob moved to Successful folder in azure blob storage",
-            updated_date_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        unit_of_work.set(
+            input_blob,
+            success_blob_path=success_blob_path,
+            is_processed_success=True,
+            is_processed_failed=False,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+        unit_of_work.push_lifecycle_status(
+            input_blob, LifecycleStatusTypes.SUCCESS, "Blob moved to Successful folder in azure blob storage"
         )
-
-        input_blob.lifecycle_status_list.append(processed_and_success_lifecycle_status)
-        input_blob.save()
 
         return input_blob
+
+
+def set_failed(input_blob: InputBlob, failed_blob_path: str, unit_of_work: InputBlobUnitOfWork):
+    """
+    set_failed records an input blob moved to the Failed folder.
+    """
+    unit_of_work.set(
+        input_blob,
+        failed_blob_path=failed_blob_path,
+        is_processed_success=False,
+        is_processed_failed=True,
+        lease_owner=None,
+        lease_expires_at=None,
+    )
+    unit_of_work.push_lifecycle_status(
+        input_blob, LifecycleStatusTypes.FAILED, "Blob moved to Failed folder in azure blob storage"
+    )
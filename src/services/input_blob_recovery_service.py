@@ -0,0 +1,212 @@
+"""
+Recovery of the input blobs left in Inprogress by a backend process that stopped in the middle of a batch.
+
+An input blob is stuck once it did not change for Main.stale-in-progress-seconds and its lease expired. The
+recovery looks up where the blob actually is in azure blob storage and finishes its lifecycle from there: blobs
+still in Inprogress, or back in Validation-Successful, are requeued, blobs already moved to Successful or Failed
+are completed. The blobs moved out of Inprogress by a sweep are moved together, their sources are deleted with
+blob batch deletes, and the changes of a sweep are written with bulk writes.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from azure.storage.blob import BlobServiceClient, ContainerClient
+
+from common import blob_mover, constants, utils
+from models.input_blob_model import (
+    InputBlob,
+    LifecycleStatusTypes,
+    LEASE_OWNER,
+    claim_stale_in_progress_input_blob,
+)
+from models.input_blob_unit_of_work import InputBlobUnitOfWork
+from services import input_blob_handler
+
+
+class RecoveryMove(NamedTuple):
+    """
+    RecoveryMove is the move of a stuck input blob out of Inprogress, back to Validation-Successful to retry it or
+    to Failed, recorded once the move succeeded.
+    """
+
+    input_blob: InputBlob
+    destination_blob_path: str
+    is_retry: bool
+
+
+def recover_stale_in_progress_input_blobs() -> list[InputBlob]:
+    """
+    recover_stale_in_progress_input_blobs claims up to Main.recovery-batch-size stuck input blobs and requeues
+    or completes them.
+
+    Returns:
+        list[InputBlob]: the recovered input blobs.
+    """
+    last_modified_before = datetime.now() - timedelta(
+        seconds=utils.get_positive_int_config(
+            "stale-in-progress-seconds", constants.DEFAULT_STALE_IN_PROGRESS_IN_SECONDS
+        )
+    )
+    lease_duration = timedelta(
+        seconds=utils.get_positive_int_config("queue-lease-seconds", constants.DEFAULT_QUEUE_LEASE_SECONDS)
+    )
+    recovery_batch_size = utils.get_positive_int_config("recovery-batch-size", constants.DEFAULT_RECOVERY_BATCH_SIZE)
+
+    blob_service_client = utils.get_azure_storage_blob_service_client()
+    container_client = utils.get_azure_container_client(constants.DEFAULT_BLOB_CONTAINER)
+    unit_of_work = InputBlobUnitOfWork(auto_flush_size=constants.UNIT_OF_WORK_AUTO_FLUSH_SIZE)
+    recovered_input_blobs: list[InputBlob] = []
+    recovery_moves: list[RecoveryMove] = []
+
+    for _ in range(recovery_batch_size):
+        input_blob = claim_stale_in_progress_input_blob(LEASE_OWNER, lease_duration, last_modified_before)
+        if input_blob is None:
+            break
+
+        try:
+            recovery_move = recover_input_blob(input_blob, container_client, unit_of_work)
+            if recovery_move is None:
+                recovered_input_blobs.append(input_blob)
+            else:
+                recovery_moves.append(recovery_move)
+        except Exception:
+            # the blob is claimed again by a later sweep once its lease expires.
+            logging.exception("Could not recover input_blob '%s'.", input_blob.in_progress_blob_path)
+
+    recovered_input_blobs.extend(move_recovered_input_blobs(blob_service_client, recovery_moves, unit_of_work))
+    unit_of_work.flush()
+
+    if recovered_input_blobs:
+        logging.info("Recovered %s input_blobs stuck in Inprogress.", len(recovered_input_blobs))
+
+    return recovered_input_blobs
+
+
+def recover_input_blob(
+    input_blob: InputBlob, container_client: ContainerClient, unit_of_work: InputBlobUnitOfWork
+) -> RecoveryMove:
+    """
+    recover_input_blob finishes the lifecycle of a stuck input blob, going by where the blob is in storage.
+
+    A blob still in Inprogress is moved back to Validation-Successful and retried like a transient failure, or
+    moved to Failed once Main.processing-max-attempts attempts failed, so a document that brings the process
+    down is not retried forever.
+
+    Returns:
+        RecoveryMove: the move of a blob still in Inprogress, left to the caller, None for the other blobs.
+    """
+    in_progress_blob_path = input_blob.in_progress_blob_path
+    success_blob_path = in_progress_blob_path.replace(constants.INPROGRESS_SUBFOLDER, constants.SUCCESSFUL_SUBFOLDER)
+    failed_blob_path = in_progress_blob_path.replace(constants.INPROGRESS_SUBFOLDER, constants.FAILED_SUBFOLDER)
+
+    if blob_exists(container_client, in_progress_blob_path):
+        if input_blob_handler.has_processing_attempts_left(input_blob.processing_attempts, in_progress_blob_path):
+            logging.info("Requeuing input_blob '%s' stuck in Inprogress.", in_progress_blob_path)
+            return RecoveryMove(input_blob, input_blob.validation_successful_blob_path, is_retry=True)
+
+        return RecoveryMove(input_blob, failed_blob_path, is_retry=False)
+
+    elif blob_exists(container_client, success_blob_path):
+        logging.info("Completing input_blob '%s' already moved to Successful folder.", in_progress_blob_path)
+        unit_of_work.set(
+            input_blob,
+            success_blob_path=success_blob_path,
+            is_processed_for_data=True,
+            is_processed_success=True,
+            is_processed_failed=False,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+        unit_of_work.push_lifecycle_status(
+            input_blob, LifecycleStatusTypes.SUCCESS, "Blob found in Successful folder in azure blob storage"
+        )
+
+    elif blob_exists(container_client, failed_blob_path):
+        logging.info("Completing input_blob '%s' already moved to Failed folder.", in_progress_blob_path)
+        unit_of_work.set(
+            input_blob,
+            failed_blob_path=failed_blob_path,
+            is_processed_for_data=True,
+            is_processed_success=False,
+            is_processed_failed=True,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+        unit_of_work.push_lifecycle_status(
+            input_blob, LifecycleStatusTypes.FAILED, "Blob found in Failed folder in azure blob storage"
+        )
+
+    elif blob_exists(container_client, input_blob.validation_successful_blob_path):
+        logging.info("Requeuing input_blob '%s' never moved to Inprogress.", in_progress_blob_path)
+        unit_of_work.set(
+            input_blob,
+            is_processing_for_data=False,
+            in_progress_blob_sas_url=None,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+        unit_of_work.push_lifecycle_status(
+            input_blob,
+            LifecycleStatusTypes.RETRY_SCHEDULED,
+            "Blob found in Validation-Successful folder in azure blob storage",
+        )
+
+    else:
+        logging.error("input_blob '%s' is not found in azure blob storage.", in_progress_blob_path)
+        unit_of_work.set(
+            input_blob,
+            is_processed_for_data=True,
+            is_processed_success=False,
+            is_processed_failed=True,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+        unit_of_work.push_lifecycle_status(
+            input_blob, LifecycleStatusTypes.FAILED, "Blob not found in azure blob storage"
+        )
+
+
+def move_recovered_input_blobs(
+    blob_service_client: BlobServiceClient, recovery_moves: list[RecoveryMove], unit_of_work: InputBlobUnitOfWork
+) -> list[InputBlob]:
+    """
+    move_recovered_input_blobs moves the stuck blobs of a sweep out of Inprogress and records the moved ones. The
+    input blobs whose move failed keep their state and are claimed again by a later sweep once their lease expires.
+
+    Returns:
+        list[InputBlob]: the moved input blobs.
+    """
+    if not recovery_moves:
+        return []
+
+    move_latencies = blob_mover.move_blobs(
+        blob_service_client,
+        [
+            (
+                recovery_move.input_blob.in_progress_blob_path,
+                recovery_move.destination_blob_path,
+                input_blob_handler.get_content_length(recovery_move.input_blob),
+            )
+            for recovery_move in recovery_moves
+        ],
+    )
+    moved_input_blobs = []
+
+    for input_blob, destination_blob_path, is_retry in recovery_moves:
+        if input_blob.in_progress_blob_path not in move_latencies:
+            continue
+
+        if is_retry:
+            input_blob_handler.set_retry_scheduled(input_blob, unit_of_work, failure="an interrupted backend process")
+        else:
+            unit_of_work.set(input_blob, is_processed_for_data=True)
+            input_blob_handler.set_failed(input_blob, destination_blob_path, unit_of_work)
+
+        moved_input_blobs.append(input_blob)
+
+    return moved_input_blobs
+
+
+def blob_exists(container_client: ContainerClient, blob_path: str) -> bool:
+    return container_client.get_blob_client(blob_path).exists()
@@ -1,6 +1,6 @@
 import logging
 
-from common import config_reader
+from common import constants, utils
 from common.custom_exceptions import (
     FolderMissingBusinessException,
     CitadelIDPBackendException,
@@ -8,29 +8,25 @@ from common.custom_exceptions import (
     BlobMissingException,
     NoInputBlobsForProcessingException,
 )
-from services import input_blob_handler
+from services import input_blob_handler, async_input_blob_handler
 
 
-def start_flow():
+def start_flow() -> list:
     logging.info("Starting main app flow....")
 
-    if config_reader.config_data.has_option("Main", "env"):
-        env = config_reader.config_data.get("Main", "env")
-    else:
-        env = "local"
+    settings = utils.get_settings()
+    env = settings.env or "local"
 
     logging.info("Environment is set as '%s'", env)
     processed_files_list = []
 
     if env.lower() == "local" or env.lower() == "prod":
-        if config_reader.config_data.has_option("Main", "use-azure-blog-storage"):
-            use_azure_blog_storage = config_reader.config_data.getboolean("Main", "use-azure-blog-storage")
-        else:
-            use_azure_blog_storage = True
-
-        if use_azure_blog_storage:
+        if settings.use_azure_blob_storage:
             try:
-                processed_files_list = input_blob_handler.handle_input_blob_process()
+                if utils.get_pipeline_mode() == constants.PIPELINE_MODE_ASYNC:
+                    processed_files_list = async_input_blob_handler.handle_input_blob_process()
+                else:
+                    processed_files_list = input_blob_handler.handle_input_blob_process()
             except NoInputBlobsForProcessingException as nibpe:
                 raise CitadelIDPBackendException(nibpe) from nibpe
             except ContainerMissingException as cme:
@@ -48,3 +44,5 @@ def start_flow():
     logging.info("Final processing status dump....")
     for processed_file in processed_files_list:
         logging.info("Processed file info is: %s", processed_file)
+
+    return processed_files_list
@@ -0,0 +1,70 @@
+import mongomock
+import mongoengine as me
+import pytest
+from common import constants
+from models.company_model import AddressCountry, CompanyAddress, CompanyModel
+from models.input_blob_model import InputBlob, LifecycleStatus, LifecycleStatusTypes, MetaData
+from models.user_model import UserModel
+
+
+@pytest.fixture
+def mongo_database():
+    me.connect("citadel-idp-db-test", alias=constants.MONGODB_CONN_ALIAS, mongo_client_class=mongomock.MongoClient)
+    yield
+    me.get_connection(constants.MONGODB_CONN_ALIAS).drop_database("citadel-idp-db-test")
+    me.disconnect(alias=constants.MONGODB_CONN_ALIAS)
+
+
+@pytest.fixture
+def make_input_blob(mongo_database):
+    company = CompanyModel(
+        full_name="Company A",
+        short_name="A",
+        address=CompanyAddress(
+            street_name_line_1="1 Main St",
+            address_city="Toronto",
+            address_country=AddressCountry.CA,
+            address_state="ON",
+            address_zip="M5V",
+        ),
+    )
+    company.save()
+    user = UserModel(
+        first_name="Jane", last_name="Doe", email="jane@a.com", password="x", company=company, roles=["CLIENT_NORMAL"]
+    )
+    user.save()
+
+    def make_input_blob(blob_name="1001-receipt.jpg", **fields) -> InputBlob:
+        input_blob = InputBlob(
+            blob_name=blob_name,
+            blob_container_name=constants.DEFAULT_BLOB_CONTAINER,
+            incoming_blob_path=f"Company-A/Incoming/{blob_name}",
+            incoming_blob_url=f"http://localhost/aarkglobal/Company-A/Incoming/{blob_name}",
+            validation_successful_blob_path=f"Company-A/Validation-Successful/{blob_name}",
+            uploader_user=fields.pop("uploader_user", user),
+            uploader_company=fields.pop("uploader_company", company),
+            metadata=MetaData(
+                blob_type="BlockBlob",
+                form_recognizer_model_type="prebuilt-receipt",
+                blob_azure_last_modified="2023-09-18 10:00:00",
+                blob_azure_created_on="2023-09-18 10:00:00",
+                content_md5="md5",
+                content_length_bytes=10,
+                content_type="image/jpeg",
+                blob_access_tier="Hot",
+                blob_lease_state="available",
+                blob_lease_status="unlocked",
+            ),
+            lifecycle_status_list=[
+                LifecycleStatus(
+                    status=LifecycleStatusTypes.UPLOADED,
+                    message="Blob uploaded",
+                    updated_date_time="2023-09-18 10:00:00",
+                )
+            ],
+            **fields,
+        )
+        input_blob.save()
+        return input_blob
+
+    return make_input_blob
@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from azure.core.exceptions import HttpResponseError
+from common import analysis_rate_limiter
+from common.analysis_rate_limiter import AnalysisRateLimiter
+
+
+def make_throttled_error(mocker, headers: dict) -> HttpResponseError:
+    return HttpResponseError(response=mocker.Mock(status_code=429, headers=headers, reason="Too Many Requests"))
+
+
+def test_rate_limiter_retries_throttled_analyses_after_retry_after(mocker):
+    rate_limiter = AnalysisRateLimiter(transactions_per_second=100, max_concurrency=8)
+    analysis = mocker.Mock(side_effect=[make_throttled_error(mocker, {"retry-after-ms": "10"}), "result"])
+
+    assert rate_limiter.run(analysis) == "result"
+    assert analysis.call_count == 2
+    assert rate_limiter.concurrency_limit == 4
+
+
+def test_rate_limiter_gives_up_after_max_throttled_retries(mocker):
+    rate_limiter = AnalysisRateLimiter(transactions_per_second=100, max_concurrency=2, max_throttled_retries=1)
+    analysis = mocker.Mock(side_effect=make_throttled_error(mocker, {"Retry-After": "0"}))
+
+    with pytest.raises(HttpResponseError):
+        rate_limiter.run(analysis)
+
+    assert analysis.call_count == 2
+    assert rate_limiter.try_acquire() == 0
+
+
+def test_rate_limiter_does_not_retry_other_errors(mocker):
+    rate_limiter = AnalysisRateLimiter(transactions_per_second=100, max_concurrency=1)
+    analysis = mocker.Mock(side_effect=RuntimeError("bad document"))
+
+    with pytest.raises(RuntimeError):
+        rate_limiter.run(analysis)
+
+    assert analysis.call_count == 1
+    assert rate_limiter.try_acquire() == 0
+
+
+def test_rate_limiter_raises_the_concurrency_limit_additively():
+    rate_limiter = AnalysisRateLimiter(transactions_per_second=1000, max_concurrency=4)
+    rate_limiter._concurrency_limit = 2.0
+
+    for _ in range(4):
+        rate_limiter.run(lambda: None)
+
+    assert rate_limiter.concurrency_limit == 3
+
+    for _ in range(100):
+        rate_limiter.run(lambda: None)
+
+    assert rate_limiter.concurrency_limit == 4
+
+
+def test_rate_limiter_paces_analyses_with_the_token_bucket():
+    rate_limiter = AnalysisRateLimiter(transactions_per_second=2, max_concurrency=10)
+
+    assert rate_limiter.try_acquire() == 0
+    assert rate_limiter.try_acquire() == 0
+    assert 0 < rate_limiter.try_acquire() <= 0.5
+
+
+def test_rate_limiter_caps_the_analyses_in_flight():
+    rate_limiter = AnalysisRateLimiter(transactions_per_second=100, max_concurrency=1)
+
+    assert rate_limiter.try_acquire() == 0
+    assert rate_limiter.try_acquire() > 0
+
+    rate_limiter.release()
+
+    assert rate_limiter.try_acquire() == 0
+
+
+def test_run_async_retries_throttled_analyses(mocker):
+    rate_limiter = AnalysisRateLimiter(transactions_per_second=100, max_concurrency=2)
+    analysis = mocker.AsyncMock(side_effect=[make_throttled_error(mocker, {"Retry-After": "0.01"}), "result"])
+
+    assert asyncio.run(rate_limiter.run_async(analysis)) == "result"
+    assert analysis.await_count == 2
+
+
+def test_rate_limiters_are_shared_per_endpoint_and_model():
+    rate_limiter = analysis_rate_limiter.get_rate_limiter("https://fr-1", "prebuilt-receipt", 15, 4)
+
+    assert analysis_rate_limiter.get_rate_limiter("https://fr-1", "prebuilt-receipt", 15, 4) is rate_limiter
+    assert analysis_rate_limiter.get_rate_limiter("https://fr-1", "prebuilt-invoice", 15, 4) is not rate_limiter
+    assert analysis_rate_limiter.get_rate_limiter("https://fr-1", "prebuilt-receipt", 5, 4) is not rate_limiter
@@ -0,0 +1,121 @@
+import pytest
+from bson import ObjectId
+from models.analysis_result_cache_model import AnalysisResultCacheModel
+from models.company_model import AddressCountry, CompanyAddress, CompanyModel
+from models.input_blob_model import ResultJsonMetaData, get_uploader_company_id
+from services import analysis_result_cache, input_blob_analysis_service
+
+
+@pytest.fixture
+def result_cache(mongo_database, mocker):
+    mocker.patch("common.utils.is_analysis_result_cache_enabled", return_value=True)
+    mocker.patch("common.utils.get_positive_int_config", return_value=2)
+    analysis_result_cache.clear_local_cache()
+    yield
+    analysis_result_cache.clear_local_cache()
+
+
+def make_json_output(blob_path: str) -> ResultJsonMetaData:
+    return ResultJsonMetaData(json_result_container_name="bloboutputcontainer", json_result_blob_path=blob_path)
+
+
+def test_result_cache_keeps_the_first_result_of_a_document(result_cache):
+    company = ObjectId()
+    analysis_result_cache.put_json_output(
+        company, "md5", "prebuilt-receipt", make_json_output("A/1.jpg.json"), "A/1.jpg"
+    )
+    analysis_result_cache.put_json_output(
+        company, "md5", "prebuilt-receipt", make_json_output("A/2.jpg.json"), "A/2.jpg"
+    )
+    analysis_result_cache.clear_local_cache()
+
+    json_output = analysis_result_cache.get_json_output(company, "md5", "prebuilt-receipt")
+
+    assert json_output.json_result_blob_path == "A/1.jpg.json"
+    assert AnalysisResultCacheModel.objects.count() == 1
+    assert analysis_result_cache.get_json_output(company, "md5", "prebuilt-invoice") is None
+    assert analysis_result_cache.get_json_output(company, None, "prebuilt-receipt") is None
+
+
+def test_analyze_blob_reuses_the_result_of_a_duplicate(result_cache, make_input_blob, mocker):
+    first_input_blob = make_input_blob("1001-receipt.jpg")
+    analysis_result_cache.put_json_output(
+        get_uploader_company_id(first_input_blob),
+        "md5",
+        "prebuilt-receipt",
+        make_json_output("A/1.jpg.json"),
+        "A/1.jpg",
+    )
+    input_blob = make_input_blob(
+        "1002-receipt.jpg",
+        form_recognizer_model_id="prebuilt-receipt",
+        in_progress_blob_path="Company-A/Inprogress/1002-receipt.jpg",
+        in_progress_blob_sas_url="http://localhost/aarkglobal/Company-A/Inprogress/1002-receipt.jpg?sig=x",
+    )
+    get_document_analysis_client = mocker.patch("common.utils.get_document_analysis_client")
+    unit_of_work = mocker.Mock()
+
+    input_blob_analysis_service.analyze_blob(input_blob, mocker.Mock(), unit_of_work)
+
+    get_document_analysis_client.assert_not_called()
+    json_output = unit_of_work.set.call_args.kwargs["json_output"]
+    assert json_output.json_result_blob_path == "A/1.jpg.json"
+
+
+def test_analyze_blob_does_not_reuse_the_result_of_another_company(result_cache, make_input_blob, mocker):
+    company_b = CompanyModel(
+        full_name="Company B",
+        short_name="B",
+        address=CompanyAddress(
+            street_name_line_1="2 Main St",
+            address_city="Toronto",
+            address_country=AddressCountry.CA,
+            address_state="ON",
+            address_zip="M5V",
+        ),
+    )
+    company_b.save()
+    company_a_input_blob = make_input_blob("1001-receipt.jpg")
+    analysis_result_cache.put_json_output(
+        get_uploader_company_id(company_a_input_blob),
+        "md5",
+        "prebuilt-receipt",
+        make_json_output("Company-A/1001-receipt.jpg.json"),
+        "Company-A/Inprogress/1001-receipt.jpg",
+    )
+    company_b_input_blob = make_input_blob(
+        "2001-receipt.jpg",
+        uploader_company=company_b,
+        form_recognizer_model_id="prebuilt-receipt",
+        in_progress_blob_path="Company-B/Inprogress/2001-receipt.jpg",
+        in_progress_blob_sas_url="http://localhost/aarkglobal/Company-B/Inprogress/2001-receipt.jpg?sig=x",
+    )
+    mocker.patch("common.utils.get_document_analysis_client")
+    mocker.patch("common.utils.get_analysis_rate_limiter").return_value.run.return_value = mocker.Mock()
+    mocker.patch("common.utils.get_result_json_codec", return_value="identity")
+    mocker.patch("common.result_json_writer.iter_result_json", return_value=iter([b"{}"]))
+    mocker.patch("common.result_json_writer.upload_blocks")
+    unit_of_work = mocker.Mock()
+
+    input_blob_analysis_service.analyze_blob(company_b_input_blob, mocker.Mock(), unit_of_work)
+
+    json_output = unit_of_work.set.call_args.kwargs["json_output"]
+    assert json_output.json_result_blob_path == "Company-B/2001-receipt.jpg.json"
+    assert AnalysisResultCacheModel.objects.count() == 2
+
+
+def test_analyze_blob_keeps_the_result_of_an_earlier_attempt(result_cache, make_input_blob, mocker):
+    input_blob = make_input_blob(
+        "1001-receipt.jpg",
+        form_recognizer_model_id="prebuilt-receipt",
+        in_progress_blob_path="Company-A/Inprogress/1001-receipt.jpg",
+        in_progress_blob_sas_url="http://localhost/aarkglobal/Company-A/Inprogress/1001-receipt.jpg?sig=x",
+        json_output=make_json_output("Company-A/1001-receipt.jpg.json"),
+    )
+    get_document_analysis_client = mocker.patch("common.utils.get_document_analysis_client")
+    unit_of_work = mocker.Mock()
+
+    assert input_blob_analysis_service.analyze_blob(input_blob, mocker.Mock(), unit_of_work) is input_blob
+
+    get_document_analysis_client.assert_not_called()
+    unit_of_work.set.assert_not_called()
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import timedelta
+import pytest
+from models.input_blob_model import LifecycleStatusTypes
+from services import async_input_blob_handler
+
+
+def test_update_input_blob_document_sets_fields_and_pushes_lifecycle(mocker):
+    collection = mocker.Mock()
+    collection.update_one = mocker.AsyncMock()
+    input_blob_document = {"_id": "65f0c0ffee", "lifecycle_status_list": []}
+
+    asyncio.run(
+        async_input_blob_handler.update_input_blob_document(
+            collection,
+            input_blob_document,
+            LifecycleStatusTypes.SUCCESS,
+            "Blob moved to Successful folder in azure blob storage",
+            is_processed_success=True,
+        )
+    )
+
+    query, update = collection.update_one.call_args[0]
+    assert query == {"_id": "65f0c0ffee"}
+    assert update["$set"]["is_processed_success"] is True
+    assert "date_last_modified" in update["$set"]
+    assert update["$push"]["lifecycle_status_list"]["status"] == "SUCCESS"
+    assert input_blob_document["is_processed_success"] is True
+    assert len(input_blob_document["lifecycle_status_list"]) == 1
+
+
+def test_process_input_blob_skips_blobs_that_cannot_be_prepared(mocker):
+    mocker.patch.object(async_input_blob_handler, "prepare_input_blob", side_effect=RuntimeError("copy failed"))
+    analyze_blob = mocker.patch.object(async_input_blob_handler, "analyze_blob")
+
+    processed_document = asyncio.run(
+        async_input_blob_handler.process_input_blob(
+            {"_id": "65f0c0ffee", "validation_successful_blob_path": "Company-A/Validation-Successful/1-receipt.jpg"},
+            mocker.Mock(),
+            mocker.Mock(),
+            mocker.Mock(),
+            asyncio.Semaphore(1),
+        )
+    )
+
+    assert processed_document is None
+    analyze_blob.assert_not_called()
+
+
+def test_process_input_blob_retries_blobs_whose_move_to_successful_failed(mocker):
+    input_blob_document = {"_id": "65f0c0ffee", "in_progress_blob_path": "Company-A/Inprogress/1-receipt.jpg"}
+    mocker.patch.object(async_input_blob_handler, "prepare_input_blob")
+    mocker.patch.object(async_input_blob_handler, "analyze_blob")
+    mocker.patch.object(
+        async_input_blob_handler,
+        "set_processing_status_and_move_completed_blobs",
+        side_effect=ConnectionError("connection reset"),
+    )
+    mocker.patch("common.utils.get_positive_int_config", return_value=3)
+    schedule_retry = mocker.patch.object(async_input_blob_handler, "schedule_retry")
+
+    processed_document = asyncio.run(
+        async_input_blob_handler.process_input_blob(
+            input_blob_document, mocker.Mock(), mocker.Mock(), mocker.Mock(), asyncio.Semaphore(1)
+        )
+    )
+
+    assert processed_document is None
+    schedule_retry.assert_awaited_once()
+
+
+def test_process_input_blob_keeps_going_when_finalizing_fails(mocker):
+    mocker.patch.object(async_input_blob_handler, "prepare_input_blob")
+    mocker.patch.object(async_input_blob_handler, "analyze_blob", side_effect=ValueError("bad document"))
+    mocker.patch.object(
+        async_input_blob_handler, "update_input_blob_document", side_effect=ConnectionError("mongodb unavailable")
+    )
+    mocker.patch("common.utils.get_positive_int_config", return_value=3)
+
+    processed_document = asyncio.run(
+        async_input_blob_handler.process_input_blob(
+            {"_id": "65f0c0ffee", "in_progress_blob_path": "Company-A/Inprogress/1-receipt.jpg"},
+            mocker.Mock(),
+            mocker.Mock(),
+            mocker.Mock(),
+            asyncio.Semaphore(1),
+        )
+    )
+
+    assert processed_document is None
+
+
+def test_claim_input_blob_documents_lets_the_companies_take_weighted_turns(mocker):
+    pending_documents = {
+        "company-a": [{"_id": f"a{number}", "uploader_company": "company-a"} for number in range(5)],
+        "company-b": [{"_id": f"b{number}", "uploader_company": "company-b"} for number in range(5)],
+    }
+
+    async def find_one_and_update(claimable_filter, update, **kwargs):
+        company_documents = pending_documents[claimable_filter["uploader_company"]]
+        return company_documents.pop(0) if company_documents else None
+
+    collection = mocker.Mock()
+    collection.distinct = mocker.AsyncMock(return_value=["company-a", "company-b"])
+    collection.find_one_and_update = find_one_and_update
+    mocker.patch("common.utils.get_company_weights", return_value={"company-a": 2})
+
+    input_blob_documents = asyncio.run(
+        async_input_blob_handler.claim_input_blob_documents(collection, 7, timedelta(minutes=10))
+    )
+
+    assert [document["_id"] for document in input_blob_documents] == ["a0", "a1", "b0", "a2", "a3", "b1", "a4"]
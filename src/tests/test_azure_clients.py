@@ -0,0 +1,96 @@
+import gc
+import pytest
+from common import azure_clients
+from common.custom_exceptions import ContainerMissingException
+
+CONNECTION_STRING_1 = "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey=a2V5;BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+CONNECTION_STRING_2 = "DefaultEndpointsProtocol=http;AccountName=devstoreaccount2;AccountKey=a2V5;BlobEndpoint=http://127.0.0.1:10000/devstoreaccount2;"
+
+
+@pytest.fixture(autouse=True)
+def reset_registry(mocker):
+    mocker.patch.object(azure_clients, "_blob_service_client", None)
+    mocker.patch.object(azure_clients, "_blob_service_client_connection_string", None)
+    mocker.patch.object(azure_clients, "_existing_containers", {})
+
+
+def test_get_blob_service_client_is_reused_for_same_connection_string():
+    assert azure_clients.get_blob_service_client(CONNECTION_STRING_1) is azure_clients.get_blob_service_client(
+        CONNECTION_STRING_1
+    )
+
+
+def test_get_blob_service_client_is_rebuilt_when_connection_string_changes():
+    first_client = azure_clients.get_blob_service_client(CONNECTION_STRING_1)
+    second_client = azure_clients.get_blob_service_client(CONNECTION_STRING_2)
+    assert first_client is not second_client
+    assert second_client.account_name == "devstoreaccount2"
+
+
+def test_container_exists_is_cached(mocker):
+    container_client = mocker.Mock(container_name="aarkglobal")
+    container_client.exists.return_value = True
+    assert azure_clients.container_exists(container_client)
+    assert azure_clients.container_exists(container_client)
+    container_client.exists.assert_called_once()
+
+
+def test_missing_container_is_not_cached(mocker):
+    mocker.patch("azure.storage.blob.ContainerClient.exists", return_value=False)
+    with pytest.raises(ContainerMissingException):
+        azure_clients.get_container_client("aarkglobal", CONNECTION_STRING_1)
+    with pytest.raises(ContainerMissingException):
+        azure_clients.get_container_client("aarkglobal", CONNECTION_STRING_1)
+
+
+def test_get_document_analysis_client_is_cached_per_endpoint_and_key(mocker):
+    mocker.patch.object(azure_clients, "_document_analysis_clients", {})
+    endpoint = "https://aarkformrecognizer.cognitiveservices.azure.com/"
+    first_client = azure_clients.get_document_analysis_client(endpoint, "key-1")
+    assert azure_clients.get_document_analysis_client(endpoint, "key-1") is first_client
+    assert azure_clients.get_document_analysis_client(endpoint, "key-2") is not first_client
+
+
+def test_drop_document_analysis_client_rebuilds_it_on_next_use(mocker):
+    mocker.patch.object(azure_clients, "_document_analysis_clients", {})
+    endpoint = "https://example.cognitiveservices.azure.com/"
+    first_client = azure_clients.get_document_analysis_client(endpoint, "key-1")
+
+    azure_clients.drop_document_analysis_client(endpoint, "key-1")
+
+    assert azure_clients.get_document_analysis_client(endpoint, "key-1") is not first_client
+
+
+@pytest.mark.parametrize(
+    "method, status_code, is_retry",
+    [("POST", 429, False), ("POST", 503, True), ("GET", 429, True), ("GET", 500, True)],
+)
+def test_analysis_retry_policy_leaves_throttled_analyze_requests_to_the_rate_limiter(
+    mocker, method, status_code, is_retry
+):
+    response = mocker.Mock()
+    response.http_request.method = method
+    response.http_response.status_code = status_code
+    response.http_response.headers = {"Retry-After": "1"}
+
+    for retry_policy in (azure_clients.AnalysisRetryPolicy(), azure_clients.AsyncAnalysisRetryPolicy()):
+        settings = retry_policy.configure_retries({})
+        assert bool(retry_policy.is_retry(settings, response)) is is_retry
+
+
+def test_superseded_blob_service_client_is_closed_once_released(mocker):
+    close = mocker.spy(azure_clients.requests.Session, "close")
+    first_client = azure_clients.get_blob_service_client(CONNECTION_STRING_1)
+    container_client = first_client.get_container_client("aarkglobal")
+
+    azure_clients.get_blob_service_client(CONNECTION_STRING_2)
+    del first_client
+    gc.collect()
+
+    # the container client still uses the transport of the superseded client.
+    close.assert_not_called()
+
+    del container_client
+    gc.collect()
+
+    close.assert_called_once()
@@ -0,0 +1,115 @@
+from azure.core.paging import ItemPaged
+from azure.storage.blob import BlobPrefix, BlobProperties
+from common.blob_listing import BlobPrefixLister
+
+
+class FakeContainerClient(object):
+    """
+    FakeContainerClient serves list_blobs from an in memory list of blob names, the continuation token is the
+    index of the next blob.
+    """
+
+    def __init__(self, blob_names: list[str]):
+        self.blob_names = sorted(blob_names)
+        self.listed_prefixes = []
+        self.walk_count = 0
+
+    def walk_blobs(self, name_starts_with, delimiter):
+        self.walk_count += 1
+        company_prefixes = sorted({name.split(delimiter)[0] + delimiter for name in self.blob_names})
+        return [BlobPrefix(prefix=prefix) for prefix in company_prefixes if prefix.startswith(name_starts_with)]
+
+    def list_blobs(self, name_starts_with, include, results_per_page):
+        self.listed_prefixes.append(name_starts_with)
+        names = [name for name in self.blob_names if name.startswith(name_starts_with)]
+
+        def get_next(continuation_token):
+            start = int(continuation_token or 0)
+            return names[start : start + results_per_page], start + results_per_page
+
+        def extract_data(response):
+            page, next_start = response
+            next_token = str(next_start) if next_start < len(names) else None
+            return next_token, iter([BlobProperties(name=name) for name in page])
+
+        return ItemPaged(get_next, extract_data)
+
+
+def test_lister_only_lists_the_validation_successful_folders():
+    container_client = FakeContainerClient(
+        [
+            "Company-A/Validation-Successful/1001-receipt.jpg",
+            "Company-A/Successful/1000-receipt.jpg",
+            "Company-B/Failed/2000-invoice.pdf",
+            "Company-B/Validation-Successful/2001-invoice.pdf",
+        ]
+    )
+
+    blob_names = [blob.name for blob in BlobPrefixLister().iter_validation_successful_blobs(container_client)]
+
+    assert blob_names == [
+        "Company-A/Validation-Successful/1001-receipt.jpg",
+        "Company-B/Validation-Successful/2001-invoice.pdf",
+    ]
+    assert container_client.listed_prefixes == ["Company-A/Validation-Successful/", "Company-B/Validation-Successful/"]
+
+
+def test_lister_resumes_from_the_remembered_continuation_token():
+    container_client = FakeContainerClient(
+        [f"Company-A/Validation-Successful/{number}-receipt.jpg" for number in range(5)]
+    )
+    lister = BlobPrefixLister(page_size=2)
+
+    first_poll = [blob.name[-13:] for blob in lister.iter_validation_successful_blobs(container_client, max_blobs=2)]
+    second_poll = [blob.name[-13:] for blob in lister.iter_validation_successful_blobs(container_client, max_blobs=2)]
+    third_poll = [blob.name[-13:] for blob in lister.iter_validation_successful_blobs(container_client, max_blobs=2)]
+    fourth_poll = [blob.name[-13:] for blob in lister.iter_validation_successful_blobs(container_client, max_blobs=2)]
+
+    assert first_poll == ["0-receipt.jpg", "1-receipt.jpg"]
+    assert second_poll == ["2-receipt.jpg", "3-receipt.jpg"]
+    assert third_poll == ["4-receipt.jpg"]
+    assert fourth_poll == ["0-receipt.jpg", "1-receipt.jpg"]
+
+
+def test_lister_interleaves_the_companies():
+    container_client = FakeContainerClient(
+        [f"Company-A/Validation-Successful/{number}-receipt.jpg" for number in range(6)]
+        + [f"Company-B/Validation-Successful/{number}-invoice.pdf" for number in range(2)]
+    )
+    lister = BlobPrefixLister(page_size=10)
+
+    first_poll = [blob.name[:9] for blob in lister.iter_validation_successful_blobs(container_client, max_blobs=4)]
+
+    assert first_poll == ["Company-A", "Company-A", "Company-B", "Company-B"]
+
+
+def test_lister_uses_the_company_prefixes_of_the_caller():
+    container_client = FakeContainerClient(
+        ["Company-A/Validation-Successful/1001-receipt.jpg", "Company-B/Validation-Successful/2001-invoice.pdf"]
+    )
+
+    blob_names = [
+        blob.name
+        for blob in BlobPrefixLister().iter_validation_successful_blobs(
+            container_client, company_prefixes=["Company-B/"]
+        )
+    ]
+
+    assert blob_names == ["Company-B/Validation-Successful/2001-invoice.pdf"]
+    assert container_client.walk_count == 0
+
+
+def test_lister_starts_at_the_first_page_once_the_continuation_tokens_are_forgotten():
+    container_client = FakeContainerClient(
+        [f"Company-A/Validation-Successful/{number}-receipt.jpg" for number in range(2, 5)]
+    )
+    lister = BlobPrefixLister(page_size=2)
+
+    first_poll = [blob.name[-13:] for blob in lister.iter_validation_successful_blobs(container_client, max_blobs=2)]
+    # the listed blobs are moved away and a new blob sorting before them arrives.
+    container_client.blob_names = ["Company-A/Validation-Successful/1-receipt.jpg"] + container_client.blob_names[2:]
+    lister.forget_continuation_tokens()
+    second_poll = [blob.name[-13:] for blob in lister.iter_validation_successful_blobs(container_client, max_blobs=2)]
+
+    assert first_poll == ["2-receipt.jpg", "3-receipt.jpg"]
+    assert second_poll == ["1-receipt.jpg", "4-receipt.jpg"]
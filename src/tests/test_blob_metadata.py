@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+from azure.storage.blob import BlobProperties, ContentSettings
+from common import utils
+
+
+def make_blob_properties(name: str) -> BlobProperties:
+    blob_properties = BlobProperties(name=name)
+    blob_properties.size = 10
+    blob_properties.blob_type = "BlockBlob"
+    blob_properties.creation_time = datetime(2023, 9, 18, 10, tzinfo=timezone.utc)
+    blob_properties.last_modified = datetime(2023, 9, 18, 10, tzinfo=timezone.utc)
+    blob_properties.content_settings = ContentSettings(content_type="image/jpeg", content_md5=bytearray(b"md5"))
+    return blob_properties
+
+
+def test_get_metadata_uses_the_listed_properties(mocker):
+    container_client = mocker.patch("common.utils.get_azure_container_client").return_value
+    container_client.container_name = "aarkglobal"
+    blob_properties = make_blob_properties("Company-A/Validation-Successful/1001-receipt.jpg")
+
+    metadata = utils.get_metadata("Validation", blob_properties.name, blob_properties)
+
+    container_client.get_blob_client.return_value.get_blob_properties.assert_not_called()
+    assert metadata.content_md5 == "bWQ1"
+    assert metadata.content_length == 10
+    assert metadata.created == "2023-09-18 10:00:00"
+
+
+def test_get_moved_blob_properties_carries_the_snapshot_over(mocker):
+    get_azure_container_client = mocker.patch("common.utils.get_azure_container_client")
+    blob_properties = make_blob_properties("Company-A/Validation-Successful/1001-receipt.jpg")
+
+    moved_blob_properties = utils.get_moved_blob_properties(blob_properties, "Company-A/Inprogress/1001-receipt.jpg")
+
+    get_azure_container_client.assert_not_called()
+    assert moved_blob_properties.name == "Company-A/Inprogress/1001-receipt.jpg"
+    assert moved_blob_properties.content_settings.content_md5 == bytearray(b"md5")
+    assert moved_blob_properties.last_modified > blob_properties.last_modified
+    assert blob_properties.name == "Company-A/Validation-Successful/1001-receipt.jpg"
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from azure.core.exceptions import HttpResponseError
+from common import blob_mover
+from common.custom_exceptions import BlobMoveException
+
+
+def test_move_blob_deletes_source_after_completed_copy(mocker):
+    blob_service_client = mocker.Mock()
+    blob_service_client.credential = None
+    source_blob_client = mocker.Mock(url="http://127.0.0.1:10000/devstoreaccount1/aarkglobal/a.jpg")
+    destination_blob_client = mocker.Mock()
+    destination_blob_client.start_copy_from_url.return_value = {"copy_status": "pending"}
+    destination_blob_client.get_blob_properties.return_value.copy.status = "success"
+    blob_service_client.get_blob_client.side_effect = [source_blob_client, destination_blob_client]
+    mocker.patch("time.sleep")
+
+    blob_mover.move_blob(blob_service_client, "Company-A/Inprogress/a.jpg", "Company-A/Successful/a.jpg")
+
+    destination_blob_client.get_blob_properties.assert_called_once()
+    source_blob_client.delete_blob.assert_called_once()
+
+
+def test_move_blob_keeps_source_when_copy_fails(mocker):
+    blob_service_client = mocker.Mock()
+    blob_service_client.credential = None
+    source_blob_client = mocker.Mock(url="http://127.0.0.1:10000/devstoreaccount1/aarkglobal/a.jpg")
+    destination_blob_client = mocker.Mock()
+    destination_blob_client.start_copy_from_url.return_value = {"copy_status": "failed"}
+    blob_service_client.get_blob_client.side_effect = [source_blob_client, destination_blob_client]
+
+    with pytest.raises(BlobMoveException):
+        blob_mover.move_blob(blob_service_client, "Company-A/Inprogress/a.jpg", "Company-A/Successful/a.jpg")
+
+    source_blob_client.delete_blob.assert_not_called()
+
+
+def test_move_blobs_falls_back_to_single_deletes(mocker):
+    blob_service_client = mocker.Mock()
+    mocker.patch.object(blob_mover, "copy_blob")
+    container_client = blob_service_client.get_container_client.return_value
+    container_client.delete_blobs.side_effect = RuntimeError("batch not supported")
+
+    move_latencies = blob_mover.move_blobs(
+        blob_service_client,
+        [
+            ("Company-A/Inprogress/a.jpg", "Company-A/Failed/a.jpg", None),
+            ("Company-A/Inprogress/b.jpg", "Company-A/Failed/b.jpg", None),
+        ],
+    )
+
+    assert sorted(move_latencies) == ["Company-A/Inprogress/a.jpg", "Company-A/Inprogress/b.jpg"]
+    assert container_client.delete_blob.call_count == 2
+
+
+def test_wait_for_copy_aborts_copies_that_do_not_complete_in_time(mocker):
+    destination_blob_client = mocker.Mock(blob_name="Company-A/Successful/a.jpg")
+    destination_blob_client.get_blob_properties.return_value.copy.status = "pending"
+    destination_blob_client.get_blob_properties.return_value.copy.id = "copy-id"
+    mocker.patch.object(blob_mover, "get_copy_poll_delays", return_value=iter([0, 0]))
+
+    with pytest.raises(BlobMoveException):
+        blob_mover.wait_for_copy(destination_blob_client, "pending")
+
+    destination_blob_client.abort_copy.assert_called_once_with("copy-id")
+
+
+def test_wait_for_copy_raises_a_blob_move_exception_when_the_abort_races_the_copy(mocker):
+    destination_blob_client = mocker.Mock(blob_name="Company-A/Successful/a.jpg")
+    destination_blob_client.get_blob_properties.return_value.copy.status = "pending"
+    destination_blob_client.abort_copy.side_effect = HttpResponseError("There is currently no pending copy operation.")
+    mocker.patch.object(blob_mover, "get_copy_poll_delays", return_value=iter([0]))
+
+    with pytest.raises(BlobMoveException):
+        blob_mover.wait_for_copy(destination_blob_client, "pending")
+
+
+def test_wait_for_copy_async_raises_a_blob_move_exception_when_the_abort_races_the_copy(mocker):
+    destination_blob_client = mocker.AsyncMock(blob_name="Company-A/Successful/a.jpg")
+    destination_blob_client.get_blob_properties.return_value.copy.status = "pending"
+    destination_blob_client.abort_copy.side_effect = HttpResponseError("There is currently no pending copy operation.")
+    mocker.patch.object(blob_mover, "get_copy_poll_delays", return_value=iter([0]))
+
+    with pytest.raises(BlobMoveException):
+        asyncio.run(blob_mover.wait_for_copy_async(destination_blob_client, "pending"))
+
+
+def test_move_blob_async_aborts_the_copy_and_keeps_the_source_on_timeout(mocker):
+    blob_service_client = mocker.Mock()
+    source_blob_client = mocker.AsyncMock(url="http://127.0.0.1:10000/devstoreaccount1/aarkglobal/a.jpg")
+    destination_blob_client = mocker.AsyncMock(blob_name="Company-A/Successful/a.jpg")
+    destination_blob_client.start_copy_from_url.return_value = {"copy_status": "pending"}
+    destination_blob_client.get_blob_properties.return_value.copy.status = "pending"
+    destination_blob_client.get_blob_properties.return_value.copy.id = "copy-id"
+    blob_service_client.get_blob_client.side_effect = [source_blob_client, destination_blob_client]
+    mocker.patch.object(blob_mover, "get_copy_poll_delays", return_value=iter([0]))
+
+    with pytest.raises(BlobMoveException):
+        asyncio.run(
+            blob_mover.move_blob_async(blob_service_client, "Company-A/Inprogress/a.jpg", "Company-A/Successful/a.jpg")
+        )
+
+    destination_blob_client.abort_copy.assert_awaited_once_with("copy-id")
+    source_blob_client.delete_blob.assert_not_awaited()
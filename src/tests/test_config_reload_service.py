@@ -0,0 +1,70 @@
+import os
+import pytest
+from common import config_reader
+from services import config_reload_service
+
+CONFIG = """[Main]
+form-recognizer-endpoint = {endpoint}
+form-recognizer-key = key
+form-recognizer-tps = $CITADEL_TEST_FORM_RECOGNIZER_TPS
+"""
+
+
+@pytest.fixture
+def config_folder(mocker, monkeypatch, tmp_path):
+    monkeypatch.setenv("CITADEL_TEST_FORM_RECOGNIZER_TPS", "15")
+    for attribute in ("config_data", "settings", "config_env", "config_app_base_dir"):
+        mocker.patch.object(config_reader, attribute, None)
+    mocker.patch.object(config_reader, "_config_file_stamps", {})
+
+    config_folder = tmp_path / "config-files" / "test"
+    config_folder.mkdir(parents=True)
+    (config_folder / "citadel-idp-backend-config.ini").write_text(CONFIG.format(endpoint="https://fr-1"))
+    config_reader.read_config("test", str(tmp_path))
+
+    return config_folder
+
+
+def touch(path, content: str):
+    # bumps the mtime, several writes may land in the same tick of the file system clock.
+    path.write_text(content)
+    stat_result = os.stat(path)
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_config_does_nothing_while_the_config_files_are_unchanged(config_folder):
+    settings = config_reader.settings
+
+    assert config_reload_service.reload_config() is None
+    assert config_reader.settings is settings
+
+
+def test_reload_config_swaps_the_settings_and_drops_the_previous_client(mocker, config_folder):
+    drop_document_analysis_client = mocker.patch("common.azure_clients.drop_document_analysis_client")
+
+    touch(config_folder / "citadel-idp-backend-config.ini", CONFIG.format(endpoint="https://fr-2"))
+    settings = config_reload_service.reload_config()
+
+    assert config_reader.settings is settings
+    assert settings.form_recognizer_endpoint == "https://fr-2"
+    drop_document_analysis_client.assert_called_once_with("https://fr-1", "key")
+
+
+def test_reload_config_reads_the_changed_dot_env_file(mocker, config_folder):
+    drop_document_analysis_client = mocker.patch("common.azure_clients.drop_document_analysis_client")
+
+    touch(config_folder / ".env", "CITADEL_TEST_FORM_RECOGNIZER_TPS=5\n")
+    settings = config_reload_service.reload_config()
+
+    assert settings.positive_ints["form-recognizer-tps"] == 5
+    drop_document_analysis_client.assert_not_called()
+
+
+def test_reload_config_keeps_the_previous_settings_if_the_config_is_invalid(config_folder):
+    settings = config_reader.settings
+
+    touch(config_folder / "citadel-idp-backend-config.ini", "[Main]\nform-recognizer-endpoint = https://fr-2\n")
+
+    assert config_reload_service.reload_config() is None
+    assert config_reader.settings is settings
+    assert config_reload_service.reload_config() is None
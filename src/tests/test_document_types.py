@@ -0,0 +1,32 @@
+import pytest
+from common import config_reader, utils
+from common.custom_exceptions import MissingDocumentTypeException
+from common.document_types import DocumentTypeIndex
+
+
+def test_document_type_index_prefers_the_longest_document_type():
+    document_type_index = DocumentTypeIndex(
+        {"invoice": "prebuilt-invoice", "vendor-invoice": "vendor-invoice-model", "receipt": "prebuilt-receipt"}
+    )
+
+    assert document_type_index.lookup("1001-vendor-invoice") == ("vendor-invoice", "vendor-invoice-model")
+    assert document_type_index.lookup("1001-acme-invoice") == ("invoice", "prebuilt-invoice")
+    assert document_type_index.lookup("1001-Receipt") == ("Receipt", "prebuilt-receipt")
+    assert document_type_index.lookup("vendor-invoice") == ("invoice", "prebuilt-invoice")
+    assert document_type_index.lookup("receipt") is None
+    assert document_type_index.lookup("1001-letter") is None
+
+
+def test_get_document_type_from_file_name_uses_the_settings_snapshot(mocker):
+    mocker.patch.object(
+        config_reader,
+        "settings",
+        mocker.Mock(document_types=DocumentTypeIndex({"receipt": "prebuilt-receipt"})),
+    )
+
+    assert utils.get_document_type_from_file_name("Company-A/Inprogress/1001-receipt.jpg") == (
+        "receipt",
+        "prebuilt-receipt",
+    )
+    with pytest.raises(MissingDocumentTypeException):
+        utils.get_document_type_from_file_name("1001-invoice.pdf")
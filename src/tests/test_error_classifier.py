@@ -0,0 +1,54 @@
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError, ServiceRequestError
+from pymongo.errors import AutoReconnect, DuplicateKeyError, OperationFailure
+from common import constants, error_classifier
+from common.custom_exceptions import BlobMoveException, CitadelIDPBackendException, MissingDocumentTypeException
+
+
+def make_http_response_error(mocker, status_code: int) -> HttpResponseError:
+    return HttpResponseError(response=mocker.Mock(status_code=status_code, headers={}, reason="reason"))
+
+
+def test_transient_errors(mocker):
+    assert error_classifier.is_transient_error(ServiceRequestError("connection reset"))
+    assert error_classifier.is_transient_error(make_http_response_error(mocker, 503))
+    assert error_classifier.is_transient_error(make_http_response_error(mocker, 429))
+    assert error_classifier.is_transient_error(AutoReconnect("primary stepped down"))
+    assert error_classifier.is_transient_error(
+        OperationFailure("write failed", details={"errorLabels": ["RetryableWriteError"]})
+    )
+    assert error_classifier.is_transient_error(BlobMoveException("copy aborted"))
+
+
+def test_permanent_errors(mocker):
+    assert not error_classifier.is_transient_error(make_http_response_error(mocker, 400))
+    assert not error_classifier.is_transient_error(ResourceNotFoundError("blob not found"))
+    assert not error_classifier.is_transient_error(DuplicateKeyError("duplicate key"))
+    assert not error_classifier.is_transient_error(MissingDocumentTypeException("no document type"))
+    assert not error_classifier.is_transient_error(ValueError("bad document"))
+
+
+def test_errors_are_classified_by_their_cause():
+    try:
+        try:
+            raise AutoReconnect("connection closed")
+        except AutoReconnect as error:
+            raise CitadelIDPBackendException("could not update input_blob") from error
+    except CitadelIDPBackendException as error:
+        assert error_classifier.is_transient_error(error)
+
+
+def test_errors_raised_while_handling_a_transient_error_are_not_transient():
+    try:
+        try:
+            raise ConnectionError("connection reset")
+        except ConnectionError:
+            raise MissingDocumentTypeException("no document type")
+    except MissingDocumentTypeException as error:
+        assert not error_classifier.is_transient_error(error)
+
+
+def test_retry_delay_backs_off_up_to_the_max_delay():
+    for processing_attempts in range(1, 20):
+        retry_delay = error_classifier.get_retry_delay(processing_attempts).total_seconds()
+
+        assert constants.RETRY_INITIAL_DELAY_IN_SECONDS / 2 <= retry_delay <= constants.RETRY_MAX_DELAY_IN_SECONDS
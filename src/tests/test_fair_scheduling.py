@@ -0,0 +1,47 @@
+import threading
+from common.fair_scheduling import CompanyFairQueue
+
+
+def add_company(company_fair_queue: CompanyFairQueue, company_key: str, item_count: int):
+    items = iter([f"{company_key}-{number}" for number in range(item_count)])
+    company_fair_queue.add_company(company_key, lambda: next(items, None))
+
+
+def test_company_fair_queue_serves_companies_by_weight():
+    company_fair_queue = CompanyFairQueue(company_weights={"Company-A": 2})
+    add_company(company_fair_queue, "Company-A", 5)
+    add_company(company_fair_queue, "Company-B", 2)
+
+    assert list(company_fair_queue) == [
+        "Company-A-0",
+        "Company-A-1",
+        "Company-B-0",
+        "Company-A-2",
+        "Company-A-3",
+        "Company-B-1",
+        "Company-A-4",
+    ]
+
+
+def test_company_fair_queue_skips_companies_at_their_cap():
+    company_fair_queue = CompanyFairQueue(max_in_flight_per_company=1)
+    add_company(company_fair_queue, "Company-A", 2)
+    add_company(company_fair_queue, "Company-B", 1)
+
+    first_item = company_fair_queue.take()
+    second_item = company_fair_queue.take()
+
+    assert (first_item, second_item) == ("Company-A-0", "Company-B-0")
+    assert company_fair_queue.get_in_flight_counts() == {"Company-A": 1, "Company-B": 1}
+
+    # every company is at its cap, take waits until an item of Company-A is released.
+    threading.Timer(0.05, company_fair_queue.release, args=[first_item]).start()
+
+    third_item = company_fair_queue.take()
+
+    assert third_item == "Company-A-1"
+
+    company_fair_queue.release(second_item)
+    company_fair_queue.release(third_item)
+
+    assert company_fair_queue.take() is None
@@ -0,0 +1,38 @@
+import pytest
+from models import index_checker
+
+
+def test_get_winning_plan_stages_flattens_nested_plans():
+    winning_plan = {
+        "stage": "FETCH",
+        "inputStage": {
+            "stage": "SORT_MERGE",
+            "inputStages": [
+                {"stage": "IXSCAN", "indexName": "pending_processing_queue"},
+                {"stage": "COLLSCAN"},
+            ],
+        },
+    }
+
+    assert index_checker.get_winning_plan_stages(winning_plan) == [
+        ("FETCH", None),
+        ("SORT_MERGE", None),
+        ("IXSCAN", "pending_processing_queue"),
+        ("COLLSCAN", None),
+    ]
+
+
+def test_check_planned_indexes_reports_collection_scans(mocker):
+    mocker.patch.object(index_checker.InputBlob, "ensure_indexes")
+    objects = mocker.patch.object(index_checker.InputBlob, "objects")
+    objects.return_value.order_by.return_value.explain.side_effect = [
+        {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": name}}}}
+        for name in [
+            "pending_processing_queue",
+            "in_progress_lifecycle",
+            "pending_processing_queue_by_company",
+            "processed_failed",
+        ]
+    ] + [{"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}]
+
+    assert index_checker.check_planned_indexes() == ["Query 'company-history' does a collection scan."]
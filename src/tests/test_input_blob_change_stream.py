@@ -0,0 +1,37 @@
+from pymongo.errors import OperationFailure
+from services import input_blob_change_stream
+from services.input_blob_change_stream import InputBlobChangeStreamWatcher
+
+
+def test_watcher_dispatches_ready_input_blobs(mocker):
+    ready_calls = []
+    watcher = InputBlobChangeStreamWatcher(lambda: ready_calls.append(True), mocker.Mock())
+    change_stream = mocker.MagicMock(alive=True)
+    change_stream.__enter__.return_value = change_stream
+
+    def try_next():
+        if len(ready_calls) == 2:
+            watcher.stop()
+            return None
+        return {"documentKey": {"_id": "blob-id"}}
+
+    change_stream.try_next.side_effect = try_next
+    collection = mocker.patch.object(input_blob_change_stream.InputBlob, "_get_collection").return_value
+    collection.watch.return_value = change_stream
+
+    watcher.run()
+
+    assert len(ready_calls) == 2
+    watcher.on_watching_changed.assert_called_once_with(True)
+
+
+def test_watcher_falls_back_to_polling_without_change_streams(mocker):
+    on_watching_changed = mocker.Mock()
+    watcher = InputBlobChangeStreamWatcher(mocker.Mock(), on_watching_changed)
+    collection = mocker.patch.object(input_blob_change_stream.InputBlob, "_get_collection").return_value
+    collection.watch.side_effect = OperationFailure("not a replica set", code=40573)
+
+    watcher.run()
+
+    on_watching_changed.assert_called_once_with(False)
+    watcher.on_input_blob_ready.assert_not_called()
@@ -0,0 +1,256 @@
+import pytest
+from datetime import datetime
+from azure.core.exceptions import ServiceRequestError
+from common.custom_exceptions import BlobMoveException, MissingDocumentTypeException
+from common.fair_scheduling import CompanyFairQueue
+from models.input_blob_model import LifecycleStatusTypes
+from models.input_blob_unit_of_work import InputBlobUnitOfWork
+from services import input_blob_handler
+
+
+@pytest.fixture
+def pipeline_config(mocker):
+    mocker.patch("common.utils.get_azure_storage_blob_service_client")
+    mocker.patch("common.utils.get_positive_int_config", side_effect=lambda option, default: default)
+    mocker.patch("common.utils.get_company_fair_queue", return_value=CompanyFairQueue())
+    mocker.patch.object(input_blob_handler, "InputBlobUnitOfWork")
+
+
+def test_handle_input_blob_process_collects_every_blob(mocker, pipeline_config):
+    input_blobs = [mocker.Mock(in_progress_blob_path=f"Company-A/Inprogress/{i}-receipt.jpg") for i in range(5)]
+    mocker.patch("common.utils.get_analysis_concurrency", return_value=3)
+    mocker.patch.object(input_blob_handler, "get_input_blobs_from_mongodb", return_value=iter(input_blobs))
+    mocker.patch.object(input_blob_handler, "prepare_input_blob", side_effect=lambda blob, client, unit_of_work: blob)
+    mocker.patch.object(
+        input_blob_handler,
+        "analyze_input_blob",
+        side_effect=lambda blob, client, unit_of_work: input_blob_handler.AnalyzedInputBlob(blob),
+    )
+    mocker.patch.object(
+        input_blob_handler,
+        "finalize_input_blob",
+        side_effect=lambda analyzed_blob, client, unit_of_work: analyzed_blob.input_blob,
+    )
+
+    processed_blobs = input_blob_handler.handle_input_blob_process()
+
+    assert sorted(processed_blobs, key=id) == sorted(input_blobs, key=id)
+
+
+def test_handle_input_blob_process_isolates_unexpected_failures(mocker, pipeline_config):
+    input_blobs = [mocker.Mock(in_progress_blob_path=f"Company-A/Inprogress/{i}-receipt.jpg") for i in range(3)]
+
+    def finalize_input_blob(analyzed_blob, client, unit_of_work):
+        if analyzed_blob.input_blob is input_blobs[1]:
+            raise RuntimeError("move failed")
+        return analyzed_blob.input_blob
+
+    mocker.patch("common.utils.get_analysis_concurrency", return_value=2)
+    mocker.patch.object(input_blob_handler, "get_input_blobs_from_mongodb", return_value=iter(input_blobs))
+    mocker.patch.object(input_blob_handler, "prepare_input_blob", side_effect=lambda blob, client, unit_of_work: blob)
+    mocker.patch.object(
+        input_blob_handler,
+        "analyze_input_blob",
+        side_effect=lambda blob, client, unit_of_work: input_blob_handler.AnalyzedInputBlob(blob),
+    )
+    mocker.patch.object(input_blob_handler, "finalize_input_blob", side_effect=finalize_input_blob)
+
+    processed_blobs = input_blob_handler.handle_input_blob_process()
+
+    assert len(processed_blobs) == 2
+    assert input_blobs[1] not in processed_blobs
+
+
+def test_handle_input_blob_process_skips_blobs_that_cannot_be_prepared(mocker, pipeline_config):
+    input_blobs = [mocker.Mock(in_progress_blob_path=f"Company-A/Inprogress/{i}-receipt.jpg") for i in range(3)]
+    mocker.patch("common.utils.get_analysis_concurrency", return_value=2)
+    mocker.patch.object(input_blob_handler, "get_input_blobs_from_mongodb", return_value=iter(input_blobs))
+    mocker.patch.object(
+        input_blob_handler,
+        "prepare_input_blob",
+        side_effect=lambda blob, client, unit_of_work: None if blob is input_blobs[0] else blob,
+    )
+    analyze_input_blob = mocker.patch.object(
+        input_blob_handler,
+        "analyze_input_blob",
+        side_effect=lambda blob, client, unit_of_work: input_blob_handler.AnalyzedInputBlob(blob),
+    )
+    mocker.patch.object(
+        input_blob_handler,
+        "finalize_input_blob",
+        side_effect=lambda analyzed_blob, client, unit_of_work: analyzed_blob.input_blob,
+    )
+
+    processed_blobs = input_blob_handler.handle_input_blob_process()
+
+    assert sorted(processed_blobs, key=id) == sorted(input_blobs[1:], key=id)
+    assert processed_blobs.claimed_count == 3
+    assert analyze_input_blob.call_count == 2
+
+
+def test_handle_input_blob_process_raises_without_pending_blobs(mocker, pipeline_config):
+    mocker.patch("common.utils.get_analysis_concurrency", return_value=2)
+    mocker.patch.object(input_blob_handler, "get_input_blobs_from_mongodb", return_value=iter([]))
+
+    with pytest.raises(input_blob_handler.NoInputBlobsForProcessingException):
+        input_blob_handler.handle_input_blob_process()
+
+
+def test_handle_input_blob_process_flushes_finished_blobs_when_claiming_fails(mocker, pipeline_config):
+    input_blob = mocker.Mock(in_progress_blob_path="Company-A/Inprogress/1-receipt.jpg")
+
+    def get_input_blobs_from_mongodb(company_fair_queue):
+        yield input_blob
+        raise RuntimeError("mongodb unavailable")
+
+    mocker.patch("common.utils.get_analysis_concurrency", return_value=2)
+    mocker.patch.object(input_blob_handler, "get_input_blobs_from_mongodb", side_effect=get_input_blobs_from_mongodb)
+    mocker.patch.object(input_blob_handler, "prepare_input_blob", side_effect=lambda blob, client, unit_of_work: blob)
+    mocker.patch.object(
+        input_blob_handler,
+        "analyze_input_blob",
+        side_effect=lambda blob, client, unit_of_work: input_blob_handler.AnalyzedInputBlob(blob),
+    )
+    finalize_input_blob = mocker.patch.object(
+        input_blob_handler,
+        "finalize_input_blob",
+        side_effect=lambda analyzed_blob, client, unit_of_work: analyzed_blob.input_blob,
+    )
+
+    with pytest.raises(RuntimeError):
+        input_blob_handler.handle_input_blob_process()
+
+    finalize_input_blob.assert_called_once()
+    input_blob_handler.InputBlobUnitOfWork.return_value.flush.assert_called_once()
+
+
+def test_prepare_input_blob_fails_blobs_with_a_permanent_error(mocker, make_input_blob):
+    input_blob = make_input_blob(is_validation_successful=True)
+    mocker.patch("common.utils.get_document_type_from_file_name", side_effect=MissingDocumentTypeException("no model"))
+    move_blob = mocker.patch.object(
+        input_blob_handler, "move_blob_from_source_folder_to_destination_folder_in_azure_blob_storage"
+    )
+
+    assert input_blob_handler.prepare_input_blob(input_blob, mocker.Mock(), InputBlobUnitOfWork()) is None
+
+    input_blob.reload()
+    assert move_blob.call_args[0][1:3] == (
+        "Company-A/Validation-Successful/1001-receipt.jpg",
+        "Company-A/Failed/1001-receipt.jpg",
+    )
+    assert input_blob.is_processed_failed is True
+    assert input_blob.lifecycle_status_list[-1].status == LifecycleStatusTypes.FAILED
+
+
+def test_prepare_input_blob_counts_transient_failures_as_attempts(mocker, make_input_blob):
+    input_blob = make_input_blob(is_validation_successful=True)
+    mocker.patch("common.utils.get_positive_int_config", return_value=3)
+    mocker.patch("common.utils.get_document_type_from_file_name", return_value=("receipt", "prebuilt-receipt"))
+    mocker.patch.object(
+        input_blob_handler,
+        "move_blob_from_source_folder_to_destination_folder_in_azure_blob_storage",
+        side_effect=BlobMoveException("copy failed"),
+    )
+
+    assert input_blob_handler.prepare_input_blob(input_blob, mocker.Mock(), InputBlobUnitOfWork()) is None
+
+    input_blob.reload()
+    assert input_blob.processing_attempts == 1
+    assert input_blob.is_processing_for_data is False
+    assert input_blob.lease_expires_at > datetime.now()
+    assert input_blob.lifecycle_status_list[-1].status == LifecycleStatusTypes.RETRY_SCHEDULED
+
+
+def test_prepare_input_blob_moves_back_blobs_whose_inprogress_state_was_not_flushed(mocker, make_input_blob):
+    input_blob = make_input_blob(is_validation_successful=True)
+    mocker.patch("common.utils.get_positive_int_config", return_value=3)
+    mocker.patch("common.utils.get_document_type_from_file_name", return_value=("receipt", "prebuilt-receipt"))
+    mocker.patch.object(input_blob_handler, "move_blob_from_source_folder_to_destination_folder_in_azure_blob_storage")
+    mocker.patch.object(input_blob_handler, "get_sas_url", return_value="http://localhost/aarkglobal/a.jpg?sig=x")
+    schedule_retry = mocker.patch.object(input_blob_handler, "schedule_retry")
+    unit_of_work = mocker.Mock(wraps=InputBlobUnitOfWork())
+    unit_of_work.flush.side_effect = [ServiceRequestError("connection reset"), 1]
+
+    assert input_blob_handler.prepare_input_blob(input_blob, mocker.Mock(), unit_of_work) is None
+
+    schedule_retry.assert_called_once()
+
+
+def test_finalize_input_blob_retries_failed_moves_to_successful_folder(mocker):
+    input_blob = mocker.Mock(in_progress_blob_path="Company-A/Inprogress/1-receipt.jpg", processing_attempts=0)
+    mocker.patch("common.utils.get_positive_int_config", return_value=3)
+    mocker.patch.object(
+        input_blob_handler,
+        "set_processing_status_and_move_completed_blobs",
+        side_effect=ServiceRequestError("connection reset"),
+    )
+    schedule_retry = mocker.patch.object(input_blob_handler, "schedule_retry")
+
+    analyzed_input_blob = input_blob_handler.AnalyzedInputBlob(input_blob)
+
+    assert input_blob_handler.finalize_input_blob(analyzed_input_blob, mocker.Mock(), mocker.Mock()) is None
+    schedule_retry.assert_called_once()
+
+
+def test_finalize_input_blob_moves_failed_analysis_to_failed_folder(mocker):
+    input_blob = mocker.Mock(in_progress_blob_path="Company-A/Inprogress/1-receipt.jpg")
+    blob_service_client = mocker.Mock()
+    unit_of_work = mocker.Mock()
+    mocker.patch.object(input_blob_handler, "analyze_blob", side_effect=RuntimeError("analysis failed"))
+    set_status = mocker.patch.object(
+        input_blob_handler, "set_processing_status_and_move_completed_blobs", return_value=input_blob
+    )
+
+    analyzed_input_blob = input_blob_handler.analyze_input_blob(input_blob, blob_service_client, unit_of_work)
+
+    assert analyzed_input_blob.analysis_error is not None
+    assert input_blob_handler.finalize_input_blob(analyzed_input_blob, blob_service_client, unit_of_work) is input_blob
+    unit_of_work.set.assert_called_once_with(input_blob, is_processed_for_data=True)
+    set_status.assert_called_once_with(blob_service_client, input_blob, True, unit_of_work)
+
+
+def test_finalize_input_blob_retries_transient_analysis_failures(mocker):
+    input_blob = mocker.Mock(
+        in_progress_blob_path="Company-A/Inprogress/1-receipt.jpg",
+        validation_successful_blob_path="Company-A/Validation-Successful/1-receipt.jpg",
+        processing_attempts=1,
+    )
+    blob_service_client = mocker.Mock()
+    unit_of_work = mocker.Mock()
+    mocker.patch("common.utils.get_positive_int_config", return_value=3)
+    mocker.patch.object(input_blob_handler, "analyze_blob", side_effect=ServiceRequestError("connection reset"))
+    move_blob = mocker.patch.object(
+        input_blob_handler, "move_blob_from_source_folder_to_destination_folder_in_azure_blob_storage"
+    )
+    set_status = mocker.patch.object(input_blob_handler, "set_processing_status_and_move_completed_blobs")
+
+    analyzed_input_blob = input_blob_handler.analyze_input_blob(input_blob, blob_service_client, unit_of_work)
+
+    assert analyzed_input_blob.analysis_error is not None
+    assert input_blob_handler.finalize_input_blob(analyzed_input_blob, blob_service_client, unit_of_work) is None
+    assert move_blob.call_args[0][1:3] == (
+        "Company-A/Inprogress/1-receipt.jpg",
+        "Company-A/Validation-Successful/1-receipt.jpg",
+    )
+    retry_fields = unit_of_work.set.call_args.kwargs
+    assert retry_fields["processing_attempts"] == 2
+    assert retry_fields["is_processing_for_data"] is False
+    assert retry_fields["lease_expires_at"] > datetime.now()
+    set_status.assert_not_called()
+
+
+def test_finalize_input_blob_fails_once_the_attempts_are_exhausted(mocker):
+    input_blob = mocker.Mock(in_progress_blob_path="Company-A/Inprogress/1-receipt.jpg", processing_attempts=2)
+    blob_service_client = mocker.Mock()
+    unit_of_work = mocker.Mock()
+    mocker.patch("common.utils.get_positive_int_config", return_value=3)
+    mocker.patch.object(input_blob_handler, "analyze_blob", side_effect=ServiceRequestError("connection reset"))
+    set_status = mocker.patch.object(
+        input_blob_handler, "set_processing_status_and_move_completed_blobs", return_value=input_blob
+    )
+
+    analyzed_input_blob = input_blob_handler.analyze_input_blob(input_blob, blob_service_client, unit_of_work)
+
+    assert analyzed_input_blob.analysis_error is not None
+    assert input_blob_handler.finalize_input_blob(analyzed_input_blob, blob_service_client, unit_of_work) is input_blob
+    set_status.assert_called_once_with(blob_service_client, input_blob, True, unit_of_work)
@@ -0,0 +1,44 @@
+import datetime
+import pytest
+from bson import ObjectId
+from models import input_blob_model
+
+
+def test_claim_input_blob_leases_each_blob_once(make_input_blob):
+    for number in range(2):
+        make_input_blob(f"100{number}-receipt.jpg", is_validation_successful=True)
+    make_input_blob("2000-receipt.jpg", is_validation_successful=False)
+
+    first_claim = input_blob_model.claim_input_blob("backend-1", datetime.timedelta(minutes=10))
+    second_claim = input_blob_model.claim_input_blob("backend-2", datetime.timedelta(minutes=10))
+
+    assert (first_claim.blob_name, first_claim.lease_owner) == ("1000-receipt.jpg", "backend-1")
+    assert (second_claim.blob_name, second_claim.lease_owner) == ("1001-receipt.jpg", "backend-2")
+    assert input_blob_model.claim_input_blob("backend-3", datetime.timedelta(minutes=10)) is None
+
+
+def test_claim_input_blob_reclaims_expired_leases(make_input_blob):
+    make_input_blob(
+        is_validation_successful=True,
+        lease_owner="crashed-backend",
+        lease_expires_at=datetime.datetime.now() - datetime.timedelta(seconds=1),
+    )
+
+    claimed_input_blob = input_blob_model.claim_input_blob("backend-1", datetime.timedelta(minutes=10))
+
+    assert claimed_input_blob.lease_owner == "backend-1"
+
+
+def test_claim_input_blob_of_a_company(make_input_blob):
+    input_blob = make_input_blob(is_validation_successful=True)
+    uploader_company_id = input_blob.uploader_company.pk
+
+    assert input_blob_model.get_companies_with_claimable_input_blobs() == [uploader_company_id]
+    assert input_blob_model.claim_input_blob("backend-1", datetime.timedelta(minutes=10), ObjectId()) is None
+
+    claimed_input_blob = input_blob_model.claim_input_blob(
+        "backend-1", datetime.timedelta(minutes=10), uploader_company_id
+    )
+
+    assert claimed_input_blob.pk == input_blob.pk
+    assert input_blob_model.get_companies_with_claimable_input_blobs() == []
@@ -0,0 +1,104 @@
+import datetime
+import pytest
+from models.input_blob_model import InputBlob, LifecycleStatusTypes
+from common import blob_mover
+from services import input_blob_recovery_service
+
+
+@pytest.fixture
+def make_stuck_input_blob(make_input_blob):
+    def make_stuck_input_blob(blob_name="1001-receipt.jpg", minutes_since_last_change=60, **fields) -> InputBlob:
+        input_blob = make_input_blob(
+            blob_name,
+            is_validation_successful=True,
+            is_processing_for_data=True,
+            in_progress_blob_path=f"Company-A/Inprogress/{blob_name}",
+            **fields,
+        )
+        InputBlob.objects(pk=input_blob.pk).update(
+            set__date_last_modified=datetime.datetime.now() - datetime.timedelta(minutes=minutes_since_last_change)
+        )
+        return input_blob
+
+    return make_stuck_input_blob
+
+
+@pytest.fixture
+def existing_blob_paths(mocker) -> set:
+    existing_blob_paths = set()
+    container_client = mocker.Mock()
+    container_client.get_blob_client.side_effect = lambda blob_path: mocker.Mock(
+        exists=mocker.Mock(return_value=blob_path in existing_blob_paths)
+    )
+    mocker.patch("common.utils.get_positive_int_config", side_effect=lambda option, default: default)
+    mocker.patch("common.utils.get_azure_storage_blob_service_client")
+    mocker.patch("common.utils.get_azure_container_client", return_value=container_client)
+    return existing_blob_paths
+
+
+def test_recovery_requeues_blobs_stuck_in_inprogress(make_stuck_input_blob, existing_blob_paths, mocker):
+    input_blob = make_stuck_input_blob()
+    existing_blob_paths.add("Company-A/Inprogress/1001-receipt.jpg")
+    move_blobs = mocker.patch.object(
+        blob_mover, "move_blobs", return_value={"Company-A/Inprogress/1001-receipt.jpg": 0.1}
+    )
+
+    recovered_input_blobs = input_blob_recovery_service.recover_stale_in_progress_input_blobs()
+
+    input_blob.reload()
+    assert [recovered_input_blob.pk for recovered_input_blob in recovered_input_blobs] == [input_blob.pk]
+    assert move_blobs.call_args[0][1] == [
+        ("Company-A/Inprogress/1001-receipt.jpg", "Company-A/Validation-Successful/1001-receipt.jpg", 10)
+    ]
+    assert input_blob.is_processing_for_data is False
+    assert input_blob.processing_attempts == 1
+    assert input_blob.lease_owner is None
+    assert input_blob.lifecycle_status_list[-1].status == LifecycleStatusTypes.RETRY_SCHEDULED
+
+
+def test_recovery_completes_blobs_already_moved_to_successful(make_stuck_input_blob, existing_blob_paths):
+    input_blob = make_stuck_input_blob()
+    existing_blob_paths.add("Company-A/Successful/1001-receipt.jpg")
+
+    input_blob_recovery_service.recover_stale_in_progress_input_blobs()
+
+    input_blob.reload()
+    assert input_blob.is_processed_success is True
+    assert input_blob.success_blob_path == "Company-A/Successful/1001-receipt.jpg"
+    assert input_blob.lifecycle_status_list[-1].status == LifecycleStatusTypes.SUCCESS
+
+
+def test_recovery_skips_recent_and_leased_blobs(make_stuck_input_blob, existing_blob_paths):
+    make_stuck_input_blob("1001-receipt.jpg", minutes_since_last_change=1)
+    make_stuck_input_blob(
+        "1002-receipt.jpg", lease_expires_at=datetime.datetime.now() + datetime.timedelta(minutes=10)
+    )
+
+    assert input_blob_recovery_service.recover_stale_in_progress_input_blobs() == []
+
+
+def test_recovery_moves_blobs_out_of_attempts_to_failed_in_one_batch(
+    make_stuck_input_blob, existing_blob_paths, mocker
+):
+    exhausted_input_blob = make_stuck_input_blob("1001-receipt.jpg", processing_attempts=4)
+    unmoved_input_blob = make_stuck_input_blob("1002-receipt.jpg")
+    existing_blob_paths.update({"Company-A/Inprogress/1001-receipt.jpg", "Company-A/Inprogress/1002-receipt.jpg"})
+    move_blobs = mocker.patch.object(
+        blob_mover, "move_blobs", return_value={"Company-A/Inprogress/1001-receipt.jpg": 0.1}
+    )
+
+    recovered_input_blobs = input_blob_recovery_service.recover_stale_in_progress_input_blobs()
+
+    exhausted_input_blob.reload()
+    unmoved_input_blob.reload()
+    move_blobs.assert_called_once()
+    assert sorted(move[1] for move in move_blobs.call_args[0][1]) == [
+        "Company-A/Failed/1001-receipt.jpg",
+        "Company-A/Validation-Successful/1002-receipt.jpg",
+    ]
+    assert [recovered_input_blob.pk for recovered_input_blob in recovered_input_blobs] == [exhausted_input_blob.pk]
+    assert exhausted_input_blob.is_processed_failed is True
+    assert exhausted_input_blob.failed_blob_path == "Company-A/Failed/1001-receipt.jpg"
+    assert exhausted_input_blob.lifecycle_status_list[-1].status == LifecycleStatusTypes.FAILED
+    assert unmoved_input_blob.is_processing_for_data is True
+    assert not unmoved_input_blob.processing_attempts
@@ -0,0 +1,110 @@
+import threading
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+from models.input_blob_model import InputBlob, LifecycleStatusTypes
+from models.input_blob_unit_of_work import InputBlobUnitOfWork
+
+
+def test_flush_writes_all_changes_of_a_blob_in_one_update(make_input_blob):
+    input_blob = make_input_blob()
+    unit_of_work = InputBlobUnitOfWork()
+    unit_of_work.push_lifecycle_status(input_blob, LifecycleStatusTypes.PROCESSING, "Strating blob process")
+    unit_of_work.set(input_blob, in_progress_blob_path="Company-A/Inprogress/1001-receipt.jpg")
+    unit_of_work.set(input_blob, is_processing_for_data=True)
+    unit_of_work.push_lifecycle_status(input_blob, LifecycleStatusTypes.SUCCESS, "Blob moved to Successful folder")
+
+    assert input_blob.is_processing_for_data is True
+    assert unit_of_work.flush() == 1
+
+    stored_input_blob = InputBlob.objects.get(pk=input_blob.pk)
+    assert stored_input_blob.in_progress_blob_path == "Company-A/Inprogress/1001-receipt.jpg"
+    assert stored_input_blob.is_processing_for_data is True
+    assert [lifecycle.status for lifecycle in stored_input_blob.lifecycle_status_list] == [
+        LifecycleStatusTypes.UPLOADED,
+        LifecycleStatusTypes.PROCESSING,
+        LifecycleStatusTypes.SUCCESS,
+    ]
+    assert unit_of_work.flush() == 0
+
+
+def test_auto_flush(make_input_blob):
+    input_blob = make_input_blob()
+    unit_of_work = InputBlobUnitOfWork(auto_flush_size=1)
+    unit_of_work.set(input_blob, is_processed_for_data=True)
+    assert InputBlob.objects.get(pk=input_blob.pk).is_processed_for_data is True
+
+
+def test_flush_keeps_the_changes_of_a_failed_write_pending(make_input_blob, mocker):
+    input_blob = make_input_blob()
+    unit_of_work = InputBlobUnitOfWork()
+    unit_of_work.set(input_blob, in_progress_blob_path="Company-A/Inprogress/1001-receipt.jpg")
+    unit_of_work.push_lifecycle_status(input_blob, LifecycleStatusTypes.PROCESSING, "Strating blob process")
+
+    collection = InputBlob._get_collection()
+    bulk_write = mocker.patch.object(collection, "bulk_write", side_effect=AutoReconnect("connection lost"))
+    with pytest.raises(AutoReconnect):
+        unit_of_work.flush()
+
+    unit_of_work.set(input_blob, is_processing_for_data=True)
+    unit_of_work.push_lifecycle_status(input_blob, LifecycleStatusTypes.SUCCESS, "Blob moved to Successful folder")
+    mocker.stopall()
+    assert unit_of_work.flush() == 1
+
+    stored_input_blob = InputBlob.objects.get(pk=input_blob.pk)
+    assert stored_input_blob.in_progress_blob_path == "Company-A/Inprogress/1001-receipt.jpg"
+    assert stored_input_blob.is_processing_for_data is True
+    assert [lifecycle.status for lifecycle in stored_input_blob.lifecycle_status_list] == [
+        LifecycleStatusTypes.UPLOADED,
+        LifecycleStatusTypes.PROCESSING,
+        LifecycleStatusTypes.SUCCESS,
+    ]
+    bulk_write.assert_called_once()
+
+
+def test_flush_keeps_only_the_failed_operations_of_a_partial_write_pending(make_input_blob, mocker):
+    input_blobs = [make_input_blob(), make_input_blob()]
+    unit_of_work = InputBlobUnitOfWork()
+    for input_blob in input_blobs:
+        unit_of_work.push_lifecycle_status(input_blob, LifecycleStatusTypes.PROCESSING, "Strating blob process")
+
+    collection = InputBlob._get_collection()
+    mocker.patch.object(
+        collection, "bulk_write", side_effect=BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "boom"}]})
+    )
+    with pytest.raises(BulkWriteError):
+        unit_of_work.flush()
+
+    mocker.stopall()
+    assert unit_of_work.flush() == 1
+    assert len(InputBlob.objects.get(pk=input_blobs[1].pk).lifecycle_status_list) == 2
+
+
+def test_flush_waits_for_a_flush_in_progress(make_input_blob, mocker):
+    input_blobs = [make_input_blob(), make_input_blob()]
+    unit_of_work = InputBlobUnitOfWork()
+    collection = InputBlob._get_collection()
+    bulk_write = collection.bulk_write
+    write_started, resume_write = threading.Event(), threading.Event()
+
+    def slow_bulk_write(operations, ordered):
+        write_started.set()
+        resume_write.wait(5)
+        return bulk_write(operations, ordered=ordered)
+
+    mocker.patch.object(collection, "bulk_write", side_effect=slow_bulk_write)
+
+    unit_of_work.set(input_blobs[0], is_processing_for_data=True)
+    first_flush = threading.Thread(target=unit_of_work.flush)
+    first_flush.start()
+    write_started.wait(5)
+
+    unit_of_work.set(input_blobs[1], is_processing_for_data=True)
+    second_flush = threading.Thread(target=unit_of_work.flush)
+    second_flush.start()
+    second_flush.join(0.2)
+    assert second_flush.is_alive()
+
+    resume_write.set()
+    first_flush.join(5)
+    second_flush.join(5)
+    assert all(InputBlob.objects.get(pk=input_blob.pk).is_processing_for_data for input_blob in input_blobs)
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, JobExecutionEvent
+from common.custom_exceptions import CitadelIDPBackendException, NoInputBlobsForProcessingException
+from jobs import job_document_processing
+from jobs.job_scheduler_triggers import AdaptiveIntervalTrigger, JobRunOutcome
+from models.input_blob_model import ProcessedInputBlobs
+
+
+def test_adaptive_trigger_follows_full_batches_and_backs_off_when_idle():
+    trigger = AdaptiveIntervalTrigger(lambda event: None, min_interval_seconds=4, max_interval_seconds=30)
+    now = datetime.now(timezone.utc)
+
+    assert trigger.get_next_fire_time(None, now) == now
+    assert trigger.record_run(JobRunOutcome.BATCH_FULL, now) == 0
+    assert trigger.record_run(JobRunOutcome.PARTIAL, now) == 4
+    assert [trigger.record_run(JobRunOutcome.EMPTY, now) for _ in range(4)] == [8, 16, 30, 30]
+    assert trigger.record_run(JobRunOutcome.BATCH_FULL, now) == 0
+
+
+def test_adaptive_trigger_records_run_duration_and_lag():
+    trigger = AdaptiveIntervalTrigger(lambda event: None, min_interval_seconds=4, max_interval_seconds=30)
+    scheduled_at = datetime.now(timezone.utc)
+    started_at = scheduled_at + timedelta(seconds=1)
+
+    trigger.record_run_started(scheduled_at, started_at)
+    fallback_fire_time = trigger.get_next_fire_time(scheduled_at, started_at)
+    trigger.record_run(JobRunOutcome.PARTIAL, started_at + timedelta(seconds=3))
+    statistics = trigger.get_statistics()
+
+    assert fallback_fire_time == started_at + timedelta(seconds=30)
+    assert statistics["last_lag_seconds"] == 1
+    assert statistics["last_run_duration_seconds"] == 3
+    assert statistics["average_run_duration_seconds"] == 3
+    assert statistics["outcome_counts"][JobRunOutcome.PARTIAL.value] == 1
+
+
+def test_classify_job_run_maps_the_document_processing_results(mocker):
+    mocker.patch("common.utils.get_positive_int_config", return_value=2)
+    scheduled_at = datetime.now(timezone.utc)
+
+    def event(code=EVENT_JOB_EXECUTED, retval=None, exception=None):
+        return JobExecutionEvent(code, "job-id", "default", scheduled_at, retval=retval, exception=exception)
+
+    try:
+        raise CitadelIDPBackendException("no blobs") from NoInputBlobsForProcessingException("no blobs")
+    except CitadelIDPBackendException as ex:
+        no_input_blobs_exception = ex
+
+    classify_job_run = job_document_processing.classify_job_run
+    assert classify_job_run(event(retval=["blob-1", "blob-2"])) == JobRunOutcome.BATCH_FULL
+    assert classify_job_run(event(retval=["blob-1"])) == JobRunOutcome.PARTIAL
+    assert classify_job_run(event(retval=[])) == JobRunOutcome.EMPTY
+    assert classify_job_run(event(retval=ProcessedInputBlobs(["blob-1"], claimed_count=2))) == JobRunOutcome.BATCH_FULL
+    assert classify_job_run(event(retval=ProcessedInputBlobs(claimed_count=1))) == JobRunOutcome.PARTIAL
+    assert classify_job_run(event(retval=ProcessedInputBlobs())) == JobRunOutcome.EMPTY
+    assert classify_job_run(event(EVENT_JOB_ERROR, exception=no_input_blobs_exception)) == JobRunOutcome.EMPTY
+    assert classify_job_run(event(EVENT_JOB_ERROR, exception=RuntimeError("boom"))) == JobRunOutcome.FAILED
+
+
+def test_adaptive_trigger_serves_run_requests_made_during_a_run(mocker):
+    trigger = AdaptiveIntervalTrigger(
+        lambda event: None, min_interval_seconds=4, max_interval_seconds=30, event_driven_max_interval_seconds=300
+    )
+    job = mocker.Mock()
+    now = datetime.now(timezone.utc)
+
+    trigger.wake(job)
+    trigger.record_run_started(now, now)
+    trigger.wake(job)
+
+    job.modify.assert_called_once()
+    assert trigger.record_run(JobRunOutcome.EMPTY, now) == 0
+
+
+def test_adaptive_trigger_is_idle_when_a_run_completes_before_its_submission_is_reported(mocker):
+    trigger = AdaptiveIntervalTrigger(lambda event: None, min_interval_seconds=4, max_interval_seconds=30)
+    job = mocker.Mock()
+    now = datetime.now(timezone.utc)
+
+    trigger.record_run(JobRunOutcome.EMPTY, now)
+    trigger.record_run_started(now, now)
+    trigger.wake(job)
+
+    job.modify.assert_called_once()
+
+
+def test_adaptive_trigger_polls_rarely_while_event_driven():
+    trigger = AdaptiveIntervalTrigger(
+        lambda event: None, min_interval_seconds=4, max_interval_seconds=30, event_driven_max_interval_seconds=300
+    )
+    now = datetime.now(timezone.utc)
+
+    trigger.set_event_driven(True)
+    assert [trigger.record_run(JobRunOutcome.EMPTY, now) for _ in range(7)][-1] == 300
+
+    trigger.set_event_driven(False)
+    assert trigger.record_run(JobRunOutcome.EMPTY, now) == 30
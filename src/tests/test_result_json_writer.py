@@ -0,0 +1,79 @@
+import json
+import pytest
+from azure.ai.formrecognizer import AnalyzeResult
+from azure.core.serialization import AzureJSONEncoder
+from common import result_json_writer
+from models.input_blob_model import ResultJsonMetaData
+
+
+def make_analyze_result(page_count: int) -> AnalyzeResult:
+    return AnalyzeResult.from_dict(
+        {
+            "api_version": "2023-07-31",
+            "model_id": "prebuilt-receipt",
+            "content": "Total 10.00 €",
+            "pages": [
+                {"page_number": number, "width": 8.5, "height": 11, "unit": "inch", "words": [], "lines": []}
+                for number in range(1, page_count + 1)
+            ],
+            "styles": [{"is_handwritten": False, "confidence": 0.9, "spans": [{"offset": 0, "length": 5}]}],
+        }
+    )
+
+
+def test_iter_result_json_matches_the_materialized_result_json():
+    result = make_analyze_result(3)
+
+    streamed_json = "".join(result_json_writer.iter_result_json("1001-receipt.jpg", result))
+
+    assert streamed_json == json.dumps(
+        {"input_file_name": "1001-receipt.jpg", "recognizer_result_data": [result.to_dict()]}, cls=AzureJSONEncoder
+    )
+
+
+def test_iter_blocks_regroups_chunks_into_fixed_size_blocks():
+    blocks = list(result_json_writer.iter_blocks(["abc", b"defg", "hij"], block_size=4))
+
+    assert blocks == [b"abcd", b"efgh", b"ij"]
+
+
+def test_upload_blocks_stages_and_commits_every_block(mocker):
+    blob_client = mocker.Mock()
+    iter_blocks = result_json_writer.iter_blocks
+    mocker.patch.object(result_json_writer, "iter_blocks", lambda chunks: iter_blocks(chunks, block_size=4))
+
+    uploaded_size = result_json_writer.upload_blocks(blob_client, [b"x" * 10])
+
+    staged_block_ids = [call.args[0] for call in blob_client.stage_block.call_args_list]
+    committed_block_ids = [block.id for block in blob_client.commit_block_list.call_args.args[0]]
+    assert uploaded_size == 10
+    assert len(staged_block_ids) == 3
+    assert staged_block_ids == committed_block_ids
+    # the result json of an earlier attempt of the input blob is replaced.
+    assert "match_condition" not in blob_client.commit_block_list.call_args.kwargs
+
+
+@pytest.mark.parametrize("codec", ["identity", "gzip", "zstd"])
+def test_read_result_json_decodes_every_codec(mocker, codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    result_json = "".join(result_json_writer.iter_result_json("1001-receipt.jpg", make_analyze_result(20)))
+    encoded_json = b"".join(result_json_writer.iter_encoded([result_json], codec))
+    blob_service_client = mocker.Mock()
+    blob_service_client.get_blob_client.return_value.download_blob.return_value.readall.return_value = encoded_json
+    json_output = ResultJsonMetaData(
+        json_result_container_name="bloboutputcontainer",
+        json_result_blob_path=f"Company-A/1001-receipt.jpg{result_json_writer.RESULT_JSON_FILE_EXTENSIONS[codec]}",
+        json_result_codec=codec,
+    )
+
+    assert result_json_writer.read_result_json(blob_service_client, json_output) == json.loads(result_json)
+    assert result_json_writer.get_result_json_content_settings(codec).content_encoding == (
+        None if codec == "identity" else codec
+    )
+    if codec != "identity":
+        assert len(encoded_json) < len(result_json)
+
+
+def test_decode_result_json_keeps_content_decoded_by_the_transport():
+    assert result_json_writer.decode_result_json(b'{"pages": []}', "gzip") == b'{"pages": []}'
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+from azure.storage.blob import BlobServiceClient
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+from common import sas_signer
+
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+
+def test_sas_urls_use_the_endpoint_of_the_client():
+    blob_service_client = BlobServiceClient.from_connection_string(AZURITE_CONNECTION_STRING)
+    signer = sas_signer.get_blob_sas_signer(blob_service_client)
+
+    sas_urls = signer.get_sas_urls(["Company-A/Inprogress/1001 receipt.jpg", "Company-A/Inprogress/1002-receipt.jpg"])
+    sas_url = urlparse(sas_urls["Company-A/Inprogress/1001 receipt.jpg"])
+
+    assert sas_signer.get_blob_sas_signer(blob_service_client) is signer
+    assert f"{sas_url.scheme}://{sas_url.netloc}{sas_url.path}" == (
+        "http://127.0.0.1:10000/devstoreaccount1/aarkglobal/Company-A/Inprogress/1001%20receipt.jpg"
+    )
+    assert parse_qs(sas_url.query)["sp"] == ["r"]
+    assert len({parse_qs(urlparse(url).query)["se"][0] for url in sas_urls.values()}) == 1
+
+
+def test_sas_expiry_covers_the_expected_wait():
+    blob_service_client = BlobServiceClient.from_connection_string(AZURITE_CONNECTION_STRING)
+    signer = sas_signer.BlobSasSigner(blob_service_client)
+
+    short_expiry = parse_qs(urlparse(signer.get_sas_url("a.jpg")).query)["se"][0]
+    long_expiry = parse_qs(urlparse(signer.get_sas_url("a.jpg", timedelta(hours=3))).query)["se"][0]
+    capped_expiry = parse_qs(urlparse(signer.get_sas_url("a.jpg", timedelta(days=30))).query)["se"][0]
+
+    assert short_expiry < long_expiry <= capped_expiry
+
+
+def test_sas_signer_reuses_the_user_delegation_key(mocker):
+    blob_service_client = mocker.Mock(account_name="account", url="https://account.blob.core.windows.net/")
+    blob_service_client.credential = object()
+    signer = sas_signer.BlobSasSigner(blob_service_client)
+    generate_blob_sas = mocker.patch.object(sas_signer, "generate_blob_sas", return_value="sig=x")
+
+    signer.get_sas_urls(["a.jpg", "b.jpg"])
+    signer.get_sas_url("c.jpg")
+
+    blob_service_client.get_user_delegation_key.assert_called_once()
+    assert generate_blob_sas.call_count == 3
+    assert generate_blob_sas.call_args.kwargs["user_delegation_key"] is (
+        blob_service_client.get_user_delegation_key.return_value
+    )
+
+
+def test_sync_and_async_clients_keep_their_own_signers():
+    blob_service_client = BlobServiceClient.from_connection_string(AZURITE_CONNECTION_STRING)
+    async_blob_service_client = AsyncBlobServiceClient.from_connection_string(AZURITE_CONNECTION_STRING)
+
+    signer = sas_signer.get_blob_sas_signer(blob_service_client)
+    async_signer = sas_signer.get_async_blob_sas_signer(async_blob_service_client)
+
+    assert isinstance(async_signer, sas_signer.AsyncBlobSasSigner)
+    assert sas_signer.get_blob_sas_signer(blob_service_client) is signer
+    assert sas_signer.get_async_blob_sas_signer(async_blob_service_client) is async_signer
+
+
+def test_async_sas_signer_awaits_the_user_delegation_key(mocker):
+    blob_service_client = mocker.Mock(account_name="account", url="https://account.blob.core.windows.net/")
+    blob_service_client.credential = object()
+    blob_service_client.get_user_delegation_key = mocker.AsyncMock(return_value="user delegation key")
+    signer = sas_signer.AsyncBlobSasSigner(blob_service_client)
+    generate_blob_sas = mocker.patch.object(sas_signer, "generate_blob_sas", return_value="sig=x")
+
+    async def sign():
+        await signer.get_sas_urls(["a.jpg", "b.jpg"])
+        return await signer.get_sas_url("c.jpg")
+
+    sas_url = asyncio.run(sign())
+
+    blob_service_client.get_user_delegation_key.assert_awaited_once()
+    assert sas_url == "https://account.blob.core.windows.net/aarkglobal/c.jpg?sig=x"
+    assert generate_blob_sas.call_args.kwargs["user_delegation_key"] == "user delegation key"
@@ -0,0 +1,115 @@
+import configparser
+import dataclasses
+import pytest
+from common import config_reader, utils
+from common.custom_exceptions import MissingConfigException
+from common.settings import Settings
+
+
+def make_config(**options) -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read_dict(
+        {
+            "Main": {
+                "app_base_dir": "/app",
+                "form-recognizer-endpoint": "https://fr-1",
+                "form-recognizer-key": "key",
+                **options,
+            },
+            "Form-Recognizer-Document-Types": {"receipt": "prebuilt-receipt"},
+        }
+    )
+    return config
+
+
+def test_settings_from_config_validates_and_normalizes_the_options():
+    settings = Settings.from_config(
+        make_config(
+            **{
+                "env": "local",
+                "azure-storage-account-connection-str": '"UseDevelopmentStorage=true"',
+                "pipeline-mode": " Async ",
+                "queue-batch-size": "10",
+                "company-weights": "Company-A:3, Company-B:1",
+            }
+        )
+    )
+
+    assert settings.env == "local"
+    assert settings.use_azure_blob_storage is True
+    assert settings.azure_storage_account_connection_str == "UseDevelopmentStorage=true"
+    assert settings.mongodb_connection_string is None
+    assert settings.pipeline_mode == "async"
+    assert settings.result_json_codec == "identity"
+    assert settings.positive_ints == {"queue-batch-size": 10}
+    assert settings.company_weights == {"Company-A": 3, "Company-B": 1}
+    assert settings.document_types.lookup("1001-receipt") == ("receipt", "prebuilt-receipt")
+    assert "key" not in repr(settings)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"form-recognizer-key": ""},
+        {"queue-batch-size": "0"},
+        {"queue-lease-seconds": "ten"},
+        {"pipeline-mode": "batch"},
+        {"analysis-result-cache": "maybe"},
+        {"form-recognizer-model-tps": "prebuilt-receipt"},
+        {"azure-storage-account-connection-str": ""},
+    ],
+)
+def test_settings_from_config_fails_fast_on_invalid_options(options):
+    with pytest.raises(MissingConfigException):
+        Settings.from_config(make_config(**options))
+
+
+def test_settings_are_immutable():
+    settings = Settings.from_config(make_config())
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        settings.env = "prod"
+
+    with pytest.raises(TypeError):
+        settings.positive_ints["queue-batch-size"] = 1
+
+
+def test_getters_read_the_settings_snapshot(mocker):
+    mocker.patch.object(
+        config_reader, "settings", Settings.from_config(make_config(**{"env": "prod", "queue-batch-size": "10"}))
+    )
+
+    assert not utils.is_env_local()
+    assert utils.get_positive_int_config("queue-batch-size", 50) == 10
+    assert utils.get_positive_int_config("queue-lease-seconds", 600) == 600
+    assert utils.get_form_recognizer_endpoint_and_key() == ("https://fr-1", "key")
+    with pytest.raises(MissingConfigException):
+        utils.get_blob_storage_connection_string()
+
+
+def test_get_positive_int_config_rejects_unregistered_options(mocker):
+    mocker.patch.object(config_reader, "settings", Settings.from_config(make_config(**{"queue-batch-sise": "10"})))
+
+    with pytest.raises(MissingConfigException):
+        utils.get_positive_int_config("queue-batch-sise", 50)
+
+
+def test_read_config_keeps_the_last_valid_settings(mocker, tmp_path):
+    config_folder = tmp_path / "config-files" / "test"
+    config_folder.mkdir(parents=True)
+    config_file = config_folder / "citadel-idp-backend-config.ini"
+    config_file.write_text("[Main]\nform-recognizer-endpoint = https://fr-1\nform-recognizer-key = key\n")
+    mocker.patch.object(config_reader, "config_data", None)
+    mocker.patch.object(config_reader, "settings", None)
+
+    settings = config_reader.read_config("test", str(tmp_path))
+
+    assert config_reader.settings is settings
+    assert settings.app_base_dir == str(tmp_path)
+
+    config_file.write_text("[Main]\nform-recognizer-endpoint = https://fr-1\n")
+
+    with pytest.raises(MissingConfigException):
+        config_reader.read_config("test", str(tmp_path))
+
+    assert config_reader.settings is settings
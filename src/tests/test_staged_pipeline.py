@@ -0,0 +1,56 @@
+import threading
+from common.staged_pipeline import PipelineStage, StagedPipeline
+
+
+def test_staged_pipeline_runs_every_item_through_every_stage():
+    done = {}
+    stages = [
+        PipelineStage("double", lambda value: value * 2, 2),
+        PipelineStage("increment", lambda value: value + 1, 3),
+    ]
+
+    with StagedPipeline(stages, queue_size=1, on_done=done.__setitem__) as pipeline:
+        for item in range(10):
+            pipeline.submit(item)
+
+    assert done == {item: item * 2 + 1 for item in range(10)}
+
+
+def test_staged_pipeline_completes_dropped_and_failed_items_early():
+    done = {}
+
+    def check(value):
+        if value == 1:
+            raise RuntimeError("bad item")
+        return None if value == 2 else value
+
+    stages = [PipelineStage("check", check, 1), PipelineStage("collect", lambda value: value, 1)]
+
+    with StagedPipeline(stages, queue_size=1, on_done=done.__setitem__) as pipeline:
+        for item in range(4):
+            pipeline.submit(item)
+
+    assert done == {0: 0, 1: None, 2: None, 3: 3}
+
+
+def test_staged_pipeline_overlaps_the_stages():
+    first_item_in_last_stage = threading.Event()
+
+    def wait_for_the_last_stage(value):
+        # the second item is only prepared once the first one reached the last stage.
+        if value == 1:
+            assert first_item_in_last_stage.wait(5)
+        return value
+
+    def last_stage(value):
+        first_item_in_last_stage.set()
+        return value
+
+    stages = [PipelineStage("first", wait_for_the_last_stage, 1), PipelineStage("last", last_stage, 1)]
+    done = {}
+
+    with StagedPipeline(stages, queue_size=1, on_done=done.__setitem__) as pipeline:
+        pipeline.submit(0)
+        pipeline.submit(1)
+
+    assert done == {0: 0, 1: 1}